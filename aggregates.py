@@ -0,0 +1,341 @@
+# aggregates.py
+
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Column, Date, Float, Integer, String, delete, func, insert, select, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Base, Match, MatchPerformance, Player
+from scoring import fantasy_points
+
+logger = logging.getLogger(__name__)
+
+RECENT_FORM_WINDOW = 5
+TOP_PERFORMERS_PER_MATCH = 5
+MAX_IN_CLAUSE = 500
+
+
+class PlayerCareerStats(Base):
+    __tablename__ = "player_career_stats"
+    player_id = Column(String, primary_key=True)
+    team = Column(String)
+    matches = Column(Integer, nullable=False, default=0)
+    runs = Column(Integer, nullable=False, default=0)
+    wickets = Column(Integer, nullable=False, default=0)
+    catches = Column(Integer, nullable=False, default=0)
+    fantasy_points = Column(Float, nullable=False, default=0.0, index=True)
+    best_points = Column(Float, nullable=False, default=0.0)
+    last_match_date = Column(Date)
+
+
+class PlayerRecentForm(Base):
+    __tablename__ = "player_recent_form"
+    player_id = Column(String, primary_key=True)
+    matches = Column(Integer, nullable=False, default=0)
+    runs = Column(Integer, nullable=False, default=0)
+    wickets = Column(Integer, nullable=False, default=0)
+    catches = Column(Integer, nullable=False, default=0)
+    fantasy_points = Column(Float, nullable=False, default=0.0)
+    avg_points = Column(Float, nullable=False, default=0.0)
+
+
+class TeamMatchTotals(Base):
+    __tablename__ = "team_match_totals"
+    team = Column(String, primary_key=True)
+    match_id = Column(String, primary_key=True)
+    runs = Column(Integer, nullable=False, default=0)
+    wickets = Column(Integer, nullable=False, default=0)
+    catches = Column(Integer, nullable=False, default=0)
+    fantasy_points = Column(Float, nullable=False, default=0.0)
+
+
+class TeamAggregate(Base):
+    __tablename__ = "team_aggregates"
+    team = Column(String, primary_key=True)
+    matches = Column(Integer, nullable=False, default=0)
+    runs = Column(Integer, nullable=False, default=0)
+    wickets = Column(Integer, nullable=False, default=0)
+    catches = Column(Integer, nullable=False, default=0)
+    fantasy_points = Column(Float, nullable=False, default=0.0)
+
+
+class MatchTopPerformer(Base):
+    __tablename__ = "match_top_performers"
+    match_id = Column(String, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    player_id = Column(String, nullable=False)
+    fantasy_points = Column(Float, nullable=False)
+
+
+STAT_FIELDS = ('runs', 'wickets', 'catches', 'fantasy_points')
+
+
+def _chunks(values: List[Any], size: int = MAX_IN_CLAUSE) -> Iterable[List[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _additive_upsert(model, rows: List[Dict[str, Any]], keys: Tuple[str, ...], replace=None):
+    """
+    INSERT ... ON CONFLICT DO UPDATE that adds the new values to the stored ones.
+
+    `replace(stmt)` may return column expressions that override the addition.
+    """
+    stmt = sqlite_insert(model).values(rows)
+    set_ = {c: getattr(model, c) + getattr(stmt.excluded, c) for c in rows[0] if c not in keys}
+    if replace is not None:
+        set_.update(replace(stmt))
+    return stmt.on_conflict_do_update(index_elements=list(keys), set_=set_)
+
+
+async def _load_performances(session: AsyncSession, performance_ids: List[int]) -> List[Dict[str, Any]]:
+    rows = []
+    for chunk in _chunks(performance_ids):
+        result = await session.execute(
+            select(
+                MatchPerformance.match_id,
+                MatchPerformance.player_id,
+                Player.team,
+                Match.date,
+                func.coalesce(MatchPerformance.runs_scored, 0).label('runs'),
+                func.coalesce(MatchPerformance.wickets_taken, 0).label('wickets'),
+                func.coalesce(MatchPerformance.catches, 0).label('catches'),
+            )
+            .join(Match, Match.id == MatchPerformance.match_id)
+            .outerjoin(Player, Player.id == MatchPerformance.player_id)
+            .where(MatchPerformance.id.in_(chunk))
+        )
+        for row in result:
+            record = dict(row._mapping)
+            record['fantasy_points'] = fantasy_points(record['runs'], record['wickets'], record['catches'])
+            rows.append(record)
+    return rows
+
+
+async def _update_career(session: AsyncSession, performances: List[Dict[str, Any]]) -> None:
+    totals: Dict[str, Dict[str, Any]] = {}
+    for perf in performances:
+        t = totals.setdefault(perf['player_id'], {
+            'player_id': perf['player_id'], 'team': perf['team'], 'matches': 0,
+            'runs': 0, 'wickets': 0, 'catches': 0, 'fantasy_points': 0.0,
+            'best_points': 0.0, 'last_match_date': perf['date'],
+        })
+        t['matches'] += 1
+        for field in STAT_FIELDS:
+            t[field] += perf[field]
+        t['best_points'] = max(t['best_points'], perf['fantasy_points'])
+        t['last_match_date'] = max(t['last_match_date'], perf['date'])
+
+    rows = list(totals.values())
+    for chunk in _chunks(rows, MAX_IN_CLAUSE // 10):
+        await session.execute(_additive_upsert(
+            PlayerCareerStats, chunk, ('player_id',),
+            replace=lambda stmt: {
+                'team': stmt.excluded.team,
+                'best_points': func.max(PlayerCareerStats.best_points, stmt.excluded.best_points),
+                'last_match_date': func.max(PlayerCareerStats.last_match_date, stmt.excluded.last_match_date),
+            },
+        ))
+
+
+async def _update_teams(session: AsyncSession, performances: List[Dict[str, Any]]) -> None:
+    per_match: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for perf in performances:
+        if perf['team'] is None:
+            continue
+        key = (perf['team'], perf['match_id'])
+        t = per_match.setdefault(key, {
+            'team': key[0], 'match_id': key[1],
+            'runs': 0, 'wickets': 0, 'catches': 0, 'fantasy_points': 0.0,
+        })
+        for field in STAT_FIELDS:
+            t[field] += perf[field]
+    if not per_match:
+        return
+
+    # A team's match count only grows the first time the (team, match) pair is seen
+    keys = list(per_match)
+    existing = set()
+    for chunk in _chunks(keys, MAX_IN_CLAUSE // 2):
+        result = await session.execute(
+            select(TeamMatchTotals.team, TeamMatchTotals.match_id)
+            .where(tuple_(TeamMatchTotals.team, TeamMatchTotals.match_id).in_(chunk))
+        )
+        existing.update((row.team, row.match_id) for row in result)
+
+    rows = list(per_match.values())
+    for chunk in _chunks(rows, MAX_IN_CLAUSE // 10):
+        await session.execute(_additive_upsert(TeamMatchTotals, chunk, ('team', 'match_id')))
+
+    team_rows: Dict[str, Dict[str, Any]] = {}
+    for key, t in per_match.items():
+        row = team_rows.setdefault(t['team'], {
+            'team': t['team'], 'matches': 0,
+            'runs': 0, 'wickets': 0, 'catches': 0, 'fantasy_points': 0.0,
+        })
+        row['matches'] += 0 if key in existing else 1
+        for field in STAT_FIELDS:
+            row[field] += t[field]
+    for chunk in _chunks(list(team_rows.values()), MAX_IN_CLAUSE // 10):
+        await session.execute(_additive_upsert(TeamAggregate, chunk, ('team',)))
+
+
+async def _refresh_recent_form(session: AsyncSession, player_ids: List[str]) -> None:
+    """Recent form is a sliding window, so it is recomputed for the affected players only"""
+    for chunk in _chunks(player_ids):
+        ranked = (
+            select(
+                MatchPerformance.player_id,
+                func.coalesce(MatchPerformance.runs_scored, 0).label('runs'),
+                func.coalesce(MatchPerformance.wickets_taken, 0).label('wickets'),
+                func.coalesce(MatchPerformance.catches, 0).label('catches'),
+                func.row_number().over(
+                    partition_by=MatchPerformance.player_id,
+                    order_by=(Match.date.desc(), Match.id.desc()),
+                ).label('rn'),
+            )
+            .join(Match, Match.id == MatchPerformance.match_id)
+            .where(MatchPerformance.player_id.in_(chunk))
+            .subquery()
+        )
+        result = await session.execute(select(ranked).where(ranked.c.rn <= RECENT_FORM_WINDOW))
+
+        form: Dict[str, Dict[str, Any]] = {}
+        for row in result:
+            f = form.setdefault(row.player_id, {
+                'player_id': row.player_id, 'matches': 0,
+                'runs': 0, 'wickets': 0, 'catches': 0, 'fantasy_points': 0.0,
+            })
+            f['matches'] += 1
+            f['runs'] += row.runs
+            f['wickets'] += row.wickets
+            f['catches'] += row.catches
+            f['fantasy_points'] += fantasy_points(row.runs, row.wickets, row.catches)
+        for f in form.values():
+            f['avg_points'] = f['fantasy_points'] / f['matches']
+
+        await session.execute(delete(PlayerRecentForm).where(PlayerRecentForm.player_id.in_(chunk)))
+        if form:
+            await session.execute(insert(PlayerRecentForm), list(form.values()))
+
+
+async def _refresh_top_performers(session: AsyncSession, match_ids: List[str]) -> None:
+    """Top performers depend only on the match's own rows, so only touched matches are redone"""
+    for chunk in _chunks(match_ids):
+        result = await session.execute(
+            select(
+                MatchPerformance.match_id,
+                MatchPerformance.player_id,
+                MatchPerformance.runs_scored,
+                MatchPerformance.wickets_taken,
+                MatchPerformance.catches,
+            ).where(MatchPerformance.match_id.in_(chunk))
+        )
+        by_match: Dict[str, List[Tuple[float, str]]] = defaultdict(list)
+        for row in result:
+            by_match[row.match_id].append(
+                (fantasy_points(row.runs_scored, row.wickets_taken, row.catches), row.player_id)
+            )
+
+        rows = []
+        for match_id, scored in by_match.items():
+            scored.sort(key=lambda s: (-s[0], s[1]))
+            for rank, (score, player_id) in enumerate(scored[:TOP_PERFORMERS_PER_MATCH], start=1):
+                rows.append({'match_id': match_id, 'rank': rank, 'player_id': player_id, 'fantasy_points': score})
+
+        await session.execute(delete(MatchTopPerformer).where(MatchTopPerformer.match_id.in_(chunk)))
+        if rows:
+            await session.execute(insert(MatchTopPerformer), rows)
+
+
+async def on_performances_inserted(session: AsyncSession, performances: Iterable[MatchPerformance]) -> int:
+    """
+    Fold newly inserted performance rows into the summary tables.
+
+    Career and team totals are updated by adding the new rows' values; recent
+    form and per-match top performers are recomputed only for the players and
+    matches the new rows touch. Call once per batch, after a flush, in the
+    same transaction as the insert.
+    """
+    ids = [p.id for p in performances if p.id is not None]
+    if not ids:
+        return 0
+
+    rows = await _load_performances(session, ids)
+    if not rows:
+        return 0
+
+    await _update_career(session, rows)
+    await _update_teams(session, rows)
+    await _refresh_recent_form(session, sorted({r['player_id'] for r in rows}))
+    await _refresh_top_performers(session, sorted({r['match_id'] for r in rows}))
+
+    logger.info("Aggregated %d performances", len(rows))
+    return len(rows)
+
+
+async def rebuild_aggregates(session: AsyncSession, batch_size: int = 10_000) -> int:
+    """Recompute every summary table from match_performances"""
+    for model in (PlayerCareerStats, PlayerRecentForm, TeamMatchTotals, TeamAggregate, MatchTopPerformer):
+        await session.execute(delete(model))
+
+    total = 0
+    last_id = 0
+    while True:
+        result = await session.execute(
+            select(MatchPerformance).where(MatchPerformance.id > last_id)
+            .order_by(MatchPerformance.id).limit(batch_size)
+        )
+        batch = result.scalars().all()
+        if not batch:
+            break
+        total += await on_performances_inserted(session, batch)
+        last_id = batch[-1].id
+    return total
+
+
+# --- Read side: every lookup is a single primary-key or index read ---
+async def get_player_summary(session: AsyncSession, player_id: str) -> Optional[Dict[str, Any]]:
+    result = await session.execute(
+        select(PlayerCareerStats, PlayerRecentForm)
+        .outerjoin(PlayerRecentForm, PlayerRecentForm.player_id == PlayerCareerStats.player_id)
+        .where(PlayerCareerStats.player_id == player_id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    career, form = row
+    return {
+        'player_id': career.player_id,
+        'team': career.team,
+        'career': {c: getattr(career, c) for c in ('matches', 'runs', 'wickets', 'catches', 'fantasy_points', 'best_points', 'last_match_date')},
+        'recent_form': {c: getattr(form, c) for c in ('matches', 'runs', 'wickets', 'catches', 'fantasy_points', 'avg_points')} if form else None,
+    }
+
+
+async def get_top_players(session: AsyncSession, limit: int = 10) -> List[Dict[str, Any]]:
+    result = await session.execute(
+        select(PlayerCareerStats.player_id, PlayerCareerStats.team, PlayerCareerStats.matches, PlayerCareerStats.fantasy_points)
+        .order_by(PlayerCareerStats.fantasy_points.desc())
+        .limit(limit)
+    )
+    return [dict(row._mapping) for row in result]
+
+
+async def get_team_summary(session: AsyncSession, team: str) -> Optional[Dict[str, Any]]:
+    team_row = await session.get(TeamAggregate, team)
+    if team_row is None:
+        return None
+    return {c: getattr(team_row, c) for c in ('team', 'matches', 'runs', 'wickets', 'catches', 'fantasy_points')}
+
+
+async def get_match_top_performers(session: AsyncSession, match_id: str) -> List[Dict[str, Any]]:
+    result = await session.execute(
+        select(MatchTopPerformer.rank, MatchTopPerformer.player_id, MatchTopPerformer.fantasy_points)
+        .where(MatchTopPerformer.match_id == match_id)
+        .order_by(MatchTopPerformer.rank)
+    )
+    return [dict(row._mapping) for row in result]
@@ -0,0 +1,226 @@
+"""
+Historical lineup backtesting.
+
+Replays matches from the database in date order. For each match the squad is
+scored with point-in-time features from the feature store (nothing on or
+after the match date is visible), lineups are generated with
+team_generator.generate_team, and each lineup is scored against the fantasy
+points the players actually earned. Database reads happen in the parent
+process; lineup generation and scoring fan out across a process pool.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from database import AsyncSessionLocal, Match, MatchPerformance, Player
+from feature_store import get_feature_vectors
+from scoring import fantasy_points, lineup_points
+from team_generator import generate_team
+
+DEFAULT_OUTPUT = "exports/backtest_results.parquet"
+MATCH_BATCH_SIZE = 16
+LINEUPS_PER_MATCH = 20
+
+
+def expected_points(features: Optional[Dict[str, float]]) -> float:
+    """Point-in-time fantasy point estimate from feature-store vectors"""
+    if not features:
+        return 0.0
+    return fantasy_points(
+        0.5 * features['runs_ewm'] + 0.5 * features['runs_avg_5'],
+        0.5 * features['wickets_ewm'] + 0.5 * features['wickets_avg_5'],
+        0.5 * features['catches_ewm'] + 0.5 * features['catches_avg_5'],
+    )
+
+
+async def load_match_batch(session, matches: List[Match]) -> List[Dict[str, Any]]:
+    """Squads, actual points and point-in-time predictions for a batch of matches"""
+    match_ids = [m.id for m in matches]
+    result = await session.execute(
+        select(
+            MatchPerformance.match_id,
+            MatchPerformance.player_id,
+            Player.team,
+            MatchPerformance.runs_scored,
+            MatchPerformance.wickets_taken,
+            MatchPerformance.catches,
+        )
+        .join(Player, Player.id == MatchPerformance.player_id)
+        .where(MatchPerformance.match_id.in_(match_ids))
+    )
+    squads: Dict[str, List[Dict[str, Any]]] = {}
+    for row in result:
+        squads.setdefault(row.match_id, []).append({
+            'id': row.player_id,
+            'team': row.team,
+            'actual': fantasy_points(row.runs_scored, row.wickets_taken, row.catches),
+        })
+
+    inputs = []
+    for match in matches:
+        started = time.perf_counter()
+        squad = squads.get(match.id, [])
+        vectors = await get_feature_vectors(session, [p['id'] for p in squad], match.date)
+        for player in squad:
+            player['predicted'] = expected_points(vectors.get(player['id']))
+        inputs.append({
+            'match_id': match.id,
+            'date': match.date,
+            'team1': match.team1,
+            'team2': match.team2,
+            'winner': match.winner,
+            'squad': squad,
+            'load_seconds': time.perf_counter() - started,
+        })
+    return inputs
+
+
+def backtest_match(match: Dict[str, Any], n_lineups: int = LINEUPS_PER_MATCH) -> Dict[str, Any]:
+    """Generate lineups for one match and score them against actual points"""
+    started = time.perf_counter()
+    team1, team2 = match['team1'], match['team2']
+    squad = [p for p in match['squad'] if p['team'] in (team1, team2)]
+    team1_players = [p['id'] for p in squad if p['team'] == team1]
+    team2_players = [p['id'] for p in squad if p['team'] == team2]
+    ranked = sorted(
+        ({'player': p['id'], 'score': p['predicted']} for p in squad),
+        key=lambda p: p['score'], reverse=True,
+    )
+    predicted = {p['id']: p['predicted'] for p in squad}
+    actual = {p['id']: p['actual'] for p in squad}
+
+    def strength(players):
+        return sum(sorted((predicted[p] for p in players), reverse=True)[:11])
+
+    predicted_winner = team1 if strength(team1_players) >= strength(team2_players) else team2
+
+    row = {
+        'match_id': match['match_id'],
+        'date': str(match['date']),
+        'team1': team1,
+        'team2': team2,
+        'predicted_winner': predicted_winner,
+        'actual_winner': match['winner'],
+        'winner_correct': match['winner'] == predicted_winner if match['winner'] else None,
+        'n_players': len(squad),
+        'n_lineups': 0,
+        'mean_points': np.nan,
+        'best_points': np.nan,
+        'worst_points': np.nan,
+        'dream_points': np.nan,
+        'best_pct_of_dream': np.nan,
+        'error': None,
+        'load_seconds': match['load_seconds'],
+    }
+
+    # Same match, same lineups, regardless of which worker runs it
+    random.seed(zlib.crc32(str(match['match_id']).encode()))
+    try:
+        lineups = generate_team(ranked, predicted_winner, team1, team2, team1_players, team2_players, n_lineups)
+    except ValueError as e:
+        row['error'] = f"lineup generation failed: {e}"
+        row['compute_seconds'] = time.perf_counter() - started
+        return row
+
+    scores = np.array([
+        lineup_points(lineup['players'], lineup['captain'], lineup['vice_captain'], actual)
+        for lineup in lineups
+    ])
+    dream = sorted(actual, key=actual.get, reverse=True)[:11]
+    dream_points = lineup_points(dream, dream[0], dream[1], actual) if len(dream) >= 2 else 0.0
+
+    row.update({
+        'n_lineups': len(lineups),
+        'mean_points': float(scores.mean()),
+        'best_points': float(scores.max()),
+        'worst_points': float(scores.min()),
+        'dream_points': dream_points,
+        'best_pct_of_dream': float(scores.max() / dream_points) if dream_points else np.nan,
+    })
+    row['compute_seconds'] = time.perf_counter() - started
+    return row
+
+
+def backtest_batch(batch: List[Dict[str, Any]], n_lineups: int) -> List[Dict[str, Any]]:
+    return [backtest_match(match, n_lineups) for match in batch]
+
+
+def write_results(rows: List[Dict[str, Any]], output: str) -> str:
+    """Write results as Parquet, or as a .npz of columns if no Parquet engine is installed"""
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    df = pd.DataFrame(rows)
+    try:
+        df.to_parquet(output, index=False)
+        return output
+    except ImportError:
+        fallback = os.path.splitext(output)[0] + ".npz"
+        np.savez(fallback, **{col: df[col].to_numpy() for col in df.columns})
+        return fallback
+
+
+async def run_backtest(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    output: str = DEFAULT_OUTPUT,
+    workers: Optional[int] = None,
+    n_lineups: int = LINEUPS_PER_MATCH,
+    batch_size: int = MATCH_BATCH_SIZE,
+    session_factory=AsyncSessionLocal,
+) -> pd.DataFrame:
+    """Backtest every match in [start, end) and write per-match results"""
+    query = select(Match).order_by(Match.date, Match.id)
+    if start is not None:
+        query = query.where(Match.date >= start)
+    if end is not None:
+        query = query.where(Match.date < end)
+
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    rows: List[Dict[str, Any]] = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        async with session_factory() as session:
+            matches = (await session.execute(query)).scalars().all()
+            print(f"🏏 Backtesting {len(matches)} matches")
+
+            # Workers generate lineups while the next batch is loaded
+            futures = []
+            for i in range(0, len(matches), batch_size):
+                batch = await load_match_batch(session, matches[i:i + batch_size])
+                futures.append(loop.run_in_executor(pool, backtest_batch, batch, n_lineups))
+
+        for batch_rows in await asyncio.gather(*futures):
+            rows.extend(batch_rows)
+
+    path = write_results(rows, output)
+    elapsed = time.perf_counter() - started
+    df = pd.DataFrame(rows)
+    errors = int(df['error'].notna().sum()) if not df.empty else 0
+    print(f"✅ Backtested {len(rows)} matches in {elapsed:.1f}s ({errors} errors), results in {path}")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest generated lineups on historical matches")
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--lineups", type=int, default=LINEUPS_PER_MATCH)
+    args = parser.parse_args()
+    asyncio.run(run_backtest(args.start, args.end, args.output, args.workers, args.lineups))
+
+
+if __name__ == "__main__":
+    main()
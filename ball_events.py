@@ -0,0 +1,229 @@
+# ball_events.py
+
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import APIRouter, Body, Depends
+
+from feature_schema import REQUIRED_FEATURES, DEFAULT_FEATURES
+from middleware import require_api_key
+
+logger = logging.getLogger(__name__)
+
+# Overs are 0-based in the feed, so 15 means overs 16-20 of a T20 innings
+DEATH_OVER_START = 15
+
+# Extras that are not legal deliveries for the bowler
+ILLEGAL_EXTRAS = {"wides", "noballs"}
+
+# Dismissals that are not credited to the bowler
+NON_BOWLER_DISMISSALS = {
+    "run out", "retired out", "obstructing the field", "timed out"
+}
+
+# Batter leaves the field but is not out, and may come back to bat
+NOT_OUT = {"retired hurt", "retired not out"}
+
+# Legal balls a player must have faced (or bowled) before live figures replace stored ones
+MIN_OBSERVED_BALLS = int(os.getenv("MIN_OBSERVED_BALLS", "12"))
+
+# Fields that identify a delivery, so a re-posted feed is not counted twice
+DELIVERY_KEY = ("match_id", "innings", "over", "ball")
+
+
+class PlayerAggregate:
+    """Running per-player counters, updated one delivery at a time"""
+    __slots__ = (
+        "balls_faced", "runs_scored", "dismissals",
+        "balls_bowled", "runs_conceded", "wickets",
+        "death_balls",
+    )
+
+    def __init__(self):
+        self.balls_faced = 0
+        self.runs_scored = 0
+        self.dismissals = 0
+        self.balls_bowled = 0
+        self.runs_conceded = 0
+        self.wickets = 0
+        self.death_balls = 0
+
+    def observed_features(self, min_balls: int = MIN_OBSERVED_BALLS) -> Dict[str, float]:
+        """Derive only the features the counters have enough data for, from at least `min_balls` balls"""
+        features = {}
+        min_balls = max(min_balls, 1)
+        if self.balls_faced >= min_balls:
+            if self.dismissals:
+                features['bat_avg'] = self.runs_scored / self.dismissals
+            features['bat_sr'] = self.runs_scored * 100.0 / self.balls_faced
+        if self.balls_bowled >= min_balls and self.wickets:
+            features['bowl_avg'] = self.runs_conceded / self.wickets
+            features['bowl_sr'] = self.balls_bowled / self.wickets
+        involved = self.balls_faced + self.balls_bowled
+        if involved >= min_balls:
+            features['death_overs_pct'] = self.death_balls / involved
+        return features
+
+    def features(self, min_balls: int = MIN_OBSERVED_BALLS) -> Dict[str, float]:
+        """Derive model features from the counters, falling back to defaults"""
+        features = dict(DEFAULT_FEATURES)
+        features.update(self.observed_features(min_balls))
+        return features
+
+    def as_dict(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class BallEventAggregator:
+    """
+    Consumes ball-by-ball deliveries and keeps per-player aggregates.
+
+    Each delivery is a dict with at least `batter`, `bowler` and `over`, plus
+    optional `runs`, `extras`, `extras_type`, `player_out` and `wicket_kind`.
+    Every delivery touches a constant number of counters, and features for a
+    player are computed from those counters without looking at past balls.
+
+    A delivery carrying match_id, innings, over and ball is applied once; the
+    same ball posted again is skipped. With require_key, deliveries without
+    those fields are rejected. Features only count once a player has faced or
+    bowled min_balls, so a single boundary is not a strike rate of 600.
+    """
+
+    def __init__(self, death_over_start: int = DEATH_OVER_START, min_balls: int = MIN_OBSERVED_BALLS,
+                 require_key: bool = False):
+        self.death_over_start = death_over_start
+        self.min_balls = min_balls
+        self.require_key = require_key
+        self.players: Dict[str, PlayerAggregate] = {}
+        self.deliveries_seen = 0
+        self.duplicates = 0
+        self._seen: Set[Tuple[str, ...]] = set()
+
+    def _player(self, player_id: Any) -> PlayerAggregate:
+        key = str(player_id)
+        aggregate = self.players.get(key)
+        if aggregate is None:
+            aggregate = self.players[key] = PlayerAggregate()
+        return aggregate
+
+    def ingest(self, delivery: Dict[str, Any]) -> bool:
+        """Apply a single delivery to the running aggregates; False if it was already applied"""
+        batter_id = delivery.get('batter')
+        bowler_id = delivery.get('bowler')
+        over = delivery.get('over')
+        if batter_id is None or bowler_id is None or over is None:
+            raise ValueError("Delivery must include batter, bowler and over")
+        parts = [delivery.get(field) for field in DELIVERY_KEY]
+        key = tuple(str(part) for part in parts) if all(part is not None for part in parts) else None
+        if key is None and self.require_key:
+            raise ValueError(f"Delivery must include {', '.join(DELIVERY_KEY)}")
+        if key is not None and key in self._seen:
+            self.duplicates += 1
+            return False
+
+        runs = int(delivery.get('runs') or 0)
+        extras = int(delivery.get('extras') or 0)
+        extras_type = delivery.get('extras_type')
+        is_death = int(over) >= self.death_over_start
+
+        batter = self._player(batter_id)
+        bowler = self._player(bowler_id)
+
+        # A wide is not faced by the batter; a no-ball is
+        if extras_type != "wides":
+            batter.balls_faced += 1
+            batter.runs_scored += runs
+            if is_death:
+                batter.death_balls += 1
+
+        if extras_type not in ILLEGAL_EXTRAS:
+            bowler.balls_bowled += 1
+            if is_death:
+                bowler.death_balls += 1
+
+        # Byes and leg-byes are not charged to the bowler
+        bowler.runs_conceded += runs
+        if extras_type in ILLEGAL_EXTRAS:
+            bowler.runs_conceded += extras
+
+        player_out = delivery.get('player_out')
+        wicket_kind = str(delivery.get('wicket_kind') or '').lower()
+        if player_out is not None and wicket_kind not in NOT_OUT:
+            self._player(player_out).dismissals += 1
+            if wicket_kind not in NON_BOWLER_DISMISSALS:
+                bowler.wickets += 1
+
+        if key is not None:
+            self._seen.add(key)
+        self.deliveries_seen += 1
+        return True
+
+    def ingest_many(self, deliveries: Iterable[Dict[str, Any]]) -> int:
+        """Ingest an iterable of deliveries, skipping malformed and already applied ones"""
+        count = 0
+        for delivery in deliveries:
+            try:
+                count += self.ingest(delivery)
+            except (ValueError, TypeError) as e:
+                logger.warning("Skipping malformed delivery %r: %s", delivery, e)
+        return count
+
+    async def consume(self, stream: AsyncIterator[Dict[str, Any]]) -> int:
+        """Ingest deliveries from an async stream until it is exhausted"""
+        count = 0
+        async for delivery in stream:
+            try:
+                count += self.ingest(delivery)
+            except (ValueError, TypeError) as e:
+                logger.warning("Skipping malformed delivery %r: %s", delivery, e)
+        logger.info("Consumed %d deliveries from stream", count)
+        return count
+
+    def features(self, player_id: Any) -> Dict[str, float]:
+        """Return the model features for a player, or defaults if unseen"""
+        aggregate = self.players.get(str(player_id))
+        if aggregate is None:
+            return dict(DEFAULT_FEATURES)
+        return aggregate.features(self.min_balls)
+
+    def observed_features(self, player_id: Any) -> Dict[str, float]:
+        """Return only the features backed by ingested deliveries"""
+        aggregate = self.players.get(str(player_id))
+        if aggregate is None:
+            return {}
+        return aggregate.observed_features(self.min_balls)
+
+    def feature_rows(self, player_ids: Iterable[Any]) -> List[Dict[str, float]]:
+        """Return feature dicts in REQUIRED_FEATURES order for several players"""
+        rows = []
+        for player_id in player_ids:
+            features = self.features(player_id)
+            rows.append({name: features[name] for name in REQUIRED_FEATURES})
+        return rows
+
+    def snapshot(self, player_id: Any) -> Optional[Dict[str, int]]:
+        """Return the raw counters for a player"""
+        aggregate = self.players.get(str(player_id))
+        return aggregate.as_dict() if aggregate is not None else None
+
+
+# Shared aggregator fed by the deliveries endpoint and read by predictions;
+# every posted delivery must be identifiable so a re-sent feed is not counted twice
+ball_aggregator = BallEventAggregator(require_key=True)
+
+router = APIRouter()
+
+
+@router.post("/deliveries", dependencies=[Depends(require_api_key)])
+async def ingest_deliveries(deliveries: List[Dict[str, Any]] = Body(...)):
+    """Ball-by-ball feed: apply deliveries, in order, to the shared aggregates"""
+    duplicates = ball_aggregator.duplicates
+    ingested = ball_aggregator.ingest_many(deliveries)
+    duplicates = ball_aggregator.duplicates - duplicates
+    return {
+        "ingested": ingested,
+        "duplicates": duplicates,
+        "skipped": len(deliveries) - ingested - duplicates,
+        "deliveries_seen": ball_aggregator.deliveries_seen,
+    }
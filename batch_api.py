@@ -0,0 +1,33 @@
+# batch_api.py
+
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from batch_predictions import MAX_BATCH_MATCHES, match_ids_between, stream_predictions
+
+router = APIRouter()
+
+
+class BatchPredictionRequest(BaseModel):
+    match_ids: Optional[List[str]] = Field(None, max_items=MAX_BATCH_MATCHES)
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+
+@router.post("/batch")
+async def batch_predictions(request: BatchPredictionRequest):
+    """Predictions for a whole slate, streamed as one NDJSON line per match"""
+    if request.match_ids:
+        match_ids = request.match_ids
+    elif request.date_from and request.date_to:
+        if request.date_from > request.date_to:
+            raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+        match_ids = await match_ids_between(request.date_from, request.date_to)
+    else:
+        raise HTTPException(status_code=400, detail="Provide match_ids or date_from and date_to")
+
+    return StreamingResponse(stream_predictions(match_ids), media_type="application/x-ndjson")
@@ -0,0 +1,190 @@
+# batch_predictions.py
+
+import asyncio
+import logging
+from datetime import date
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+
+from ball_events import ball_aggregator
+from database import Match, ReadSessionLocal
+from fast_json import dumps
+from feature_schema import DEFAULT_FEATURES, REQUIRED_FEATURES
+from feature_store import FEATURE_COLUMNS, feature_rows, get_feature_vectors
+from memory import tracked
+from prediction_writer import cache_predictions
+from queries import get_match_squad
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_MATCHES = 100
+# Squads are read concurrently, bounded by the read pool size
+SQUAD_CONCURRENCY = 8
+# Matches per model call when streaming; smaller chunks send the first lines sooner
+STREAM_CHUNK_MATCHES = 10
+DEFAULT_CONFIDENCE = 0.8
+
+
+class PredictedPlayer(NamedTuple):
+    id: str
+    name: str
+    team: str
+    role: str
+    fantasy_points: float
+    confidence: float = DEFAULT_CONFIDENCE
+
+
+def player_features(player: Dict[str, Any]) -> Dict[str, float]:
+    """Feature row for a squad player: ingested deliveries first, then stored averages, then defaults"""
+    derived = ball_aggregator.observed_features(player["id"])
+    stored = {"bat_avg": player.get("batting_average"), "bowl_avg": player.get("bowling_average")}
+    features = {}
+    for name in REQUIRED_FEATURES:
+        value = derived.get(name, stored.get(name))
+        features[name] = float(value) if value is not None and value >= 0 else DEFAULT_FEATURES[name]
+    return features
+
+
+async def match_ids_between(date_from: date, date_to: date, limit: int = MAX_BATCH_MATCHES,
+                            session_factory=ReadSessionLocal) -> List[str]:
+    """Matches in a date range, in date order (an index range scan on ix_matches_date_id)"""
+    async with session_factory() as session:
+        result = await session.execute(
+            select(Match.id).where(Match.date >= date_from, Match.date <= date_to)
+            .order_by(Match.date, Match.id).limit(limit)
+        )
+        return list(result.scalars())
+
+
+async def _load_squad(match_id: str, semaphore: asyncio.Semaphore,
+                      session_factory) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    async with semaphore:
+        try:
+            async with session_factory() as session:
+                squad = await get_match_squad(session, match_id, recent=0)
+        except Exception as e:
+            logger.warning("Failed to load squad for match %s: %s", match_id, e)
+            return match_id, None, "Failed to load squad"
+    if squad is None:
+        return match_id, None, "Match not found"
+    if not any(squad["squads"].values()):
+        return match_id, None, "No player data available for prediction"
+    return match_id, squad, None
+
+
+def _default_predictor() -> Tuple[Callable[["pd.DataFrame"], "np.ndarray"], List[str]]:
+    # Imported lazily: loading the model module is expensive
+    from predict_model import MLModelWrapper
+    model = MLModelWrapper.get_instance()
+    return model.predict, model.features
+
+
+async def _feature_matrix(squads: List[Tuple[str, Dict[str, Any]]], owners: List[Tuple[str, Dict[str, Any]]],
+                          features: Sequence[str], session_factory) -> List[List[float]]:
+    """
+    Model input rows for `owners`, in order, in the model's feature schema.
+
+    A model trained on the feature store gets the same point-in-time vectors
+    as single-match prediction, as of each match's date; other models get
+    player_features rows.
+    """
+    if list(features) != FEATURE_COLUMNS:
+        rows = [player_features(player) for _, player in owners]
+        return [[row[name] for name in features] for row in rows]
+    vectors: Dict[str, Dict[str, Dict[str, float]]] = {}
+    async with session_factory() as session:
+        for match_id, squad in squads:
+            player_ids = [player["id"] for players in squad["squads"].values() for player in players]
+            vectors[match_id] = await get_feature_vectors(session, player_ids, squad["match"]["date"] or date.today())
+    return [feature_rows(vectors[match_id], [player["id"]])[0] for match_id, player in owners]
+
+
+@tracked()
+async def predict_matches(
+    match_ids: List[str],
+    predict: Optional[Callable[["pd.DataFrame"], "np.ndarray"]] = None,
+    persist: bool = True,
+    session_factory=ReadSessionLocal,
+    features: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Predict every squad player of many matches with one model call.
+
+    Squads are read concurrently; the feature rows of all matches are stacked
+    into one DataFrame so the model runs once for the whole slate. Returns one
+    entry per match, in input order, with either `players` or `error`.
+
+    Without `predict`, the loaded model is used with its own feature schema;
+    an injected `predict` gets `features` (REQUIRED_FEATURES by default).
+    """
+    match_ids = list(dict.fromkeys(match_ids))[:MAX_BATCH_MATCHES]
+    semaphore = asyncio.Semaphore(SQUAD_CONCURRENCY)
+    loaded = await asyncio.gather(*(_load_squad(match_id, semaphore, session_factory) for match_id in match_ids))
+
+    results: Dict[str, Dict[str, Any]] = {}
+    squads: List[Tuple[str, Dict[str, Any]]] = []
+    owners: List[Tuple[str, Dict[str, Any]]] = []
+    for match_id, squad, error in loaded:
+        if error is not None:
+            results[match_id] = {"match_id": match_id, "error": error}
+            continue
+        squads.append((match_id, squad))
+        for players in squad["squads"].values():
+            for player in players:
+                owners.append((match_id, player))
+
+    if owners:
+        # Deferred so importing the router does not load pandas
+        import pandas as pd
+        try:
+            if predict is None:
+                predict, model_features = _default_predictor()
+                features = features or model_features
+            features = list(features or REQUIRED_FEATURES)
+            rows = await _feature_matrix(squads, owners, features, session_factory)
+            frame = pd.DataFrame(rows, columns=features)
+            # Off the event loop: inference is CPU-bound
+            scores = await asyncio.get_running_loop().run_in_executor(None, predict, frame)
+        except Exception as e:
+            logger.error("Batch prediction failed for %d matches: %s", len(match_ids), e)
+            for match_id, _ in owners:
+                results[match_id] = {"match_id": match_id, "error": "Prediction failed"}
+            scores = None
+
+        if scores is not None:
+            by_match: Dict[str, List[PredictedPlayer]] = {}
+            for (match_id, player), score in zip(owners, scores):
+                by_match.setdefault(match_id, []).append(PredictedPlayer(
+                    id=str(player["id"]),
+                    name=player["name"],
+                    team=player["team"],
+                    role="Unknown",
+                    fantasy_points=round(max(float(score), 0.0), 3),
+                ))
+            for match_id, players in by_match.items():
+                players.sort(key=lambda p: p.fantasy_points, reverse=True)
+                if persist:
+                    try:
+                        await cache_predictions(match_id, players)
+                    except Exception as e:
+                        logger.warning("Failed to cache predictions for match %s: %s", match_id, e)
+                results[match_id] = {"match_id": match_id, "players": [p._asdict() for p in players]}
+
+    logger.info("Batch predicted %d players across %d matches", len(owners), len(match_ids))
+    return [results[match_id] for match_id in match_ids]
+
+
+async def stream_predictions(match_ids: List[str], chunk_size: int = STREAM_CHUNK_MATCHES,
+                             **kwargs) -> AsyncIterator[bytes]:
+    """
+    NDJSON: one line per match, result or error, in input order.
+
+    Matches are predicted chunk_size at a time, one model call per chunk, and
+    each chunk's lines are sent as soon as it is done, so the first results
+    leave after one chunk's work instead of the whole slate's.
+    """
+    match_ids = list(dict.fromkeys(match_ids))[:MAX_BATCH_MATCHES]
+    for start in range(0, len(match_ids), chunk_size):
+        for entry in await predict_matches(match_ids[start:start + chunk_size], **kwargs):
+            yield dumps(entry) + b"\n"
@@ -0,0 +1,133 @@
+"""
+Concurrent read throughput: default engine vs the production SQLite profile.
+
+Seeds a throwaway database, then runs the same concurrent read workload
+(optionally with a writer inserting rows in the background) against:
+  - legacy:      create_async_engine(url, echo=True), as database.py used to
+  - production:  database.create_engine_for_profile(url, "production", read_only=True)
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Iterator
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database import create_engine_for_profile
+
+READ_QUERY = text(
+    "SELECT id, team1, team2, date FROM matches WHERE date >= :since ORDER BY date, id LIMIT 50"
+)
+
+
+async def seed(url: str, n_matches: int) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TABLE matches (id VARCHAR PRIMARY KEY, team1 VARCHAR NOT NULL, "
+            "team2 VARCHAR NOT NULL, date DATE NOT NULL, winner TEXT)"
+        ))
+        await conn.execute(text("CREATE INDEX ix_matches_date ON matches (date)"))
+        start = date(2008, 4, 18)
+        rows = [
+            {"id": f"m{i}", "team1": f"T{i % 10}", "team2": f"T{(i + 3) % 10}",
+             "date": (start + timedelta(days=i % 6000)).isoformat()}
+            for i in range(n_matches)
+        ]
+        await conn.execute(
+            text("INSERT INTO matches (id, team1, team2, date) VALUES (:id, :team1, :team2, :date)"),
+            rows,
+        )
+    await engine.dispose()
+
+
+async def run_workload(engine, write_engine, concurrency: int, queries: int, with_writer: bool) -> dict:
+    stop = asyncio.Event()
+    writes = 0
+
+    async def reader():
+        for _ in range(queries):
+            since = (date(2008, 4, 18) + timedelta(days=random.randint(0, 6000))).isoformat()
+            async with engine.connect() as conn:
+                await conn.execute(READ_QUERY, {"since": since})
+
+    async def writer():
+        nonlocal writes
+        while not stop.is_set():
+            async with write_engine.begin() as conn:
+                await conn.execute(
+                    text("INSERT INTO matches (id, team1, team2, date) VALUES (:id, 'W1', 'W2', '2030-01-01')"),
+                    {"id": f"w{time.perf_counter_ns()}"},
+                )
+            writes += 1
+            await asyncio.sleep(0)
+
+    writer_task = asyncio.create_task(writer()) if with_writer else None
+    started = time.perf_counter()
+    await asyncio.gather(*(reader() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    if writer_task:
+        await writer_task
+
+    total = concurrency * queries
+    return {"queries": total, "seconds": round(elapsed, 3), "qps": round(total / elapsed, 1), "writes": writes}
+
+
+@contextmanager
+def _silence_echo() -> Iterator[None]:
+    # echo=True installs a stdout handler; keep its cost but not its output
+    handlers = [h for h in logging.getLogger("sqlalchemy.engine.Engine").handlers
+                if isinstance(h, logging.StreamHandler)]
+    with open(os.devnull, "w") as devnull:
+        previous = [handler.setStream(devnull) for handler in handlers]
+        try:
+            yield
+        finally:
+            for handler, stream in zip(handlers, previous):
+                handler.setStream(stream)
+
+
+async def main(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        await seed(url, args.matches)
+
+        legacy = create_async_engine(url, echo=True)
+        with _silence_echo():
+            legacy_result = await run_workload(legacy, legacy, args.concurrency, args.queries, args.with_writer)
+        await legacy.dispose()
+
+        read_engine = create_engine_for_profile(url, "production", read_only=True, echo=False)
+        write_engine = create_engine_for_profile(url, "production", echo=False)
+        production_result = await run_workload(read_engine, write_engine, args.concurrency, args.queries, args.with_writer)
+        await read_engine.dispose()
+        await write_engine.dispose()
+
+    return {
+        "matches": args.matches,
+        "concurrency": args.concurrency,
+        "with_writer": args.with_writer,
+        "legacy": legacy_result,
+        "production": production_result,
+        "speedup": round(production_result["qps"] / legacy_result["qps"], 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=50_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--with-writer", action="store_true")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args)), indent=2))
@@ -0,0 +1,580 @@
+"""
+Benchmark suite for prediction, team generation, export and database reads.
+
+Every benchmark runs on synthetic data built from a fixed seed: squads of
+22-30 players, a slate of matches, a portfolio of lineups and a history of
+performance rows in a throwaway SQLite database. Results are written as JSON;
+--baseline compares them with an earlier run and exits non-zero when a
+benchmark got slower than the threshold allows.
+
+Benchmarks that need something this environment does not have (the model
+module, a loadable model file) are reported as skipped with the reason.
+
+    python benchmark.py --scale quick
+    python benchmark.py --output exports/bench_new.json --baseline exports/benchmark_results.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import inspect
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+DEFAULT_OUTPUT = "exports/benchmark_results.json"
+DEFAULT_MODEL = "gl_model.pkl"
+# Relative slowdown of the median that counts as a regression
+DEFAULT_THRESHOLD = 0.10
+# Differences below this are timer noise, whatever the ratio
+NOISE_FLOOR_SECONDS = 0.001
+
+SCALES: Dict[str, Dict[str, int]] = {
+    "full": {"slate": 50, "lineups": 100_000, "history": 1_000_000},
+    "quick": {"slate": 10, "lineups": 5_000, "history": 50_000},
+}
+
+TEAMS = [f"Team {n}" for n in range(10)]
+PLAYERS_PER_TEAM = 30
+
+
+class SkipBenchmark(Exception):
+    """Raised by a setup function when the benchmark cannot run here"""
+
+
+class Benchmark(NamedTuple):
+    name: str
+    # setup(context) -> (function to time, items processed per call)
+    setup: Callable[["Context"], Any]
+    repeat: int = 5
+
+
+# --- Synthetic data ---
+def make_squad(rng: random.Random, team1: str, team2: str, size: Optional[int] = None) -> List[Dict[str, Any]]:
+    """22-30 players split across both teams, with model features"""
+    size = size or rng.randint(22, 30)
+    squad = []
+    for n in range(size):
+        team = team1 if n % 2 == 0 else team2
+        squad.append({
+            "id": f"{team}:{n // 2}".replace(" ", "_"),
+            "name": f"{team} Player {n // 2}",
+            "team": team,
+            "role": rng.choice(["Batsman", "Bowler", "All-rounder", "Wicket-keeper"]),
+            "batting_average": round(rng.uniform(5, 55), 2),
+            "strike_rate": round(rng.uniform(80, 190), 2),
+            "bowling_average": round(rng.uniform(15, 60), 2),
+            "bowling_strike_rate": round(rng.uniform(12, 40), 2),
+            "death_overs_percentage": round(rng.uniform(0, 1), 3),
+        })
+    return squad
+
+
+def make_slate(rng: random.Random, matches: int) -> List[Dict[str, Any]]:
+    slate = []
+    for n in range(matches):
+        team1, team2 = rng.sample(TEAMS, 2)
+        slate.append({"match_id": f"slate{n}", "team1": team1, "team2": team2,
+                      "squad": make_squad(rng, team1, team2)})
+    return slate
+
+
+def feature_rows(squad: List[Dict[str, Any]]) -> List[Dict[str, float]]:
+    return [{
+        "bat_avg": p["batting_average"],
+        "bat_sr": p["strike_rate"],
+        "bowl_avg": p["bowling_average"],
+        "bowl_sr": p["bowling_strike_rate"],
+        "death_overs_pct": p["death_overs_percentage"],
+    } for p in squad]
+
+
+def make_lineups(rng: random.Random, squad: List[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    """Lineups in team_generator's output format"""
+    names = [p["name"] for p in squad]
+    lineups = []
+    for _ in range(count):
+        players = rng.sample(names, 11)
+        lineups.append({"players": players, "captain": players[0], "vice_captain": players[1]})
+    return lineups
+
+
+def make_history(rng: random.Random, rows: int) -> Tuple[List[tuple], List[tuple], List[tuple]]:
+    """Players, matches and performance rows (22 per match) for the matches schema"""
+    players = [
+        (f"p{t}_{n}", f"Player {t}-{n}", team, round(rng.uniform(5, 55), 2), round(rng.uniform(15, 60), 2))
+        for t, team in enumerate(TEAMS) for n in range(PLAYERS_PER_TEAM)
+    ]
+    by_team = {team: [p[0] for p in players if p[2] == team] for team in TEAMS}
+    start = date(2008, 4, 18)
+    matches, performances = [], []
+    for m in range(max(1, rows // 22)):
+        team1, team2 = rng.sample(TEAMS, 2)
+        match_id = f"m{m}"
+        matches.append((match_id, team1, team2, (start + timedelta(days=m // 4)).isoformat(), team1))
+        for team in (team1, team2):
+            for player_id in rng.sample(by_team[team], 11):
+                performances.append((match_id, player_id, rng.randint(0, 100), rng.randint(0, 4), rng.randint(0, 2)))
+    return players, matches, performances
+
+
+def seed_sqlite(path: str, players: List[tuple], matches: List[tuple], performances: List[tuple]) -> None:
+    """Create the application schema at `path` and bulk-load make_history() output"""
+    from sqlalchemy import create_engine
+
+    import aggregates  # noqa: F401 - registers the summary tables on Base
+    from database import Base
+    from schema_indexes import create_missing_indexes, sqlite3_executor
+
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(sync_engine)
+    sync_engine.dispose()
+
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.executemany("INSERT INTO players (id, name, team, batting_average, bowling_average) "
+                             "VALUES (?, ?, ?, ?, ?)", players)
+            conn.executemany("INSERT INTO matches (id, team1, team2, date, winner) VALUES (?, ?, ?, ?, ?)", matches)
+            dates = {match[0]: match[3] for match in matches}
+            conn.executemany("INSERT INTO match_performances (match_id, player_id, match_date, runs_scored, "
+                             "wickets_taken, catches) VALUES (?, ?, ?, ?, ?, ?)",
+                             [(row[0], row[1], dates[row[0]], *row[2:]) for row in performances])
+        create_missing_indexes(sqlite3_executor(conn))
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+
+class Context:
+    """Data shared by the benchmarks of one run, built lazily"""
+
+    def __init__(self, scale: Dict[str, int], seed: int, workdir: str, model_path: str):
+        self.scale = scale
+        self.seed = seed
+        self.workdir = workdir
+        self.model_path = model_path
+        self.notes: Dict[str, Any] = {}
+        self._cache: Dict[str, Any] = {}
+
+    def rng(self, name: str) -> random.Random:
+        return random.Random(f"{self.seed}:{name}")
+
+    def once(self, name: str, build: Callable[[], Any]) -> Any:
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def squad(self) -> List[Dict[str, Any]]:
+        return self.once("squad", lambda: make_squad(self.rng("squad"), TEAMS[0], TEAMS[1], 26))
+
+    @property
+    def slate(self) -> List[Dict[str, Any]]:
+        return self.once("slate", lambda: make_slate(self.rng("slate"), self.scale["slate"]))
+
+    @property
+    def lineups(self) -> List[Dict[str, Any]]:
+        return self.once("lineups", lambda: make_lineups(self.rng("lineups"), self.squad, self.scale["lineups"]))
+
+    @property
+    def model(self) -> Any:
+        return self.once("model", self._load_model)
+
+    def _load_model(self) -> Any:
+        """The trained artifact if it loads, otherwise a model fitted on synthetic rows"""
+        import joblib
+        try:
+            loaded = joblib.load(self.model_path)
+            self.notes["model"] = self.model_path
+            return loaded["model"] if isinstance(loaded, dict) else loaded
+        except Exception as e:
+            self.notes["model"] = f"synthetic (could not load {self.model_path}: {type(e).__name__})"
+        import pandas as pd
+        from sklearn.ensemble import RandomForestRegressor
+        rng = self.rng("model")
+        X = pd.DataFrame(feature_rows(make_squad(rng, "A", "B", 2000)))
+        y = X["bat_avg"] * 0.8 + X["bat_sr"] * 0.1 - X["bowl_avg"] * 0.3 + [rng.gauss(0, 5) for _ in range(len(X))]
+        return RandomForestRegressor(n_estimators=100, random_state=self.seed, n_jobs=1).fit(X, y)
+
+    async def database(self) -> Any:
+        """Session factory for a seeded SQLite database"""
+        if "database" not in self._cache:
+            self._cache["database"] = await self._seed_database()
+        return self._cache["database"]
+
+    async def aggregated_database(self) -> Any:
+        """database(), with the summary tables rebuilt from the history"""
+        Session = await self.database()
+        if "aggregates" not in self._cache:
+            import aggregates
+            started = time.perf_counter()
+            async with Session() as session:
+                await aggregates.rebuild_aggregates(session)
+                await session.commit()
+            self.notes["aggregates_rebuild_s"] = round(time.perf_counter() - started, 2)
+            self._cache["aggregates"] = True
+        return Session
+
+    async def _seed_database(self) -> Any:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        path = os.path.join(self.workdir, "bench.db")
+        started = time.perf_counter()
+        players, matches, performances = make_history(self.rng("history"), self.scale["history"])
+        seed_sqlite(path, players, matches, performances)
+
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+        self.notes["database_rows"] = len(performances)
+        self.notes["database_setup_s"] = round(time.perf_counter() - started, 2)
+        self.notes["match_ids"] = [m[0] for m in matches]
+        self.notes["player_ids"] = [p[0] for p in players]
+        self._cache["engine"] = engine
+        return Session
+
+    async def close(self) -> None:
+        engine = self._cache.get("engine")
+        if engine is not None:
+            await engine.dispose()
+
+
+def _predict_model():
+    try:
+        import predict_model
+    except Exception as e:
+        raise SkipBenchmark(f"predict_model is not importable: {type(e).__name__}: {e}")
+    return predict_model
+
+
+@contextlib.contextmanager
+def stub_cricket_api(squad: List[Dict[str, Any]]) -> Iterator[None]:
+    """Answer the match-info request made through httpx with a synthetic squad"""
+    import httpx
+
+    teams: Dict[str, List[Dict[str, Any]]] = {}
+    for player in squad:
+        teams.setdefault(player["team"], []).append(player)
+    payload = {"data": {"teams": [{"name": name, "players": players} for name, players in teams.items()]}}
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json=payload))
+    real_client = httpx.AsyncClient
+
+    class StubClient(real_client):
+        def __init__(self, *args, **kwargs):
+            kwargs["transport"] = transport
+            super().__init__(*args, **kwargs)
+
+    httpx.AsyncClient = StubClient
+    try:
+        yield
+    finally:
+        httpx.AsyncClient = real_client
+
+
+@contextlib.contextmanager
+def working_directory(path: str) -> Iterator[None]:
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+# --- Benchmarks ---
+def bench_model_wrapper_predict(ctx: Context):
+    import pandas as pd
+    predict_model = _predict_model()
+    wrapper = predict_model.MLModelWrapper.get_instance()
+    wrapper._model = ctx.model
+    features = pd.DataFrame([row for match in ctx.slate for row in feature_rows(match["squad"])])
+    return (lambda: wrapper.predict(features)), len(features)
+
+
+def bench_model_predict_raw(ctx: Context):
+    import pandas as pd
+    model = ctx.model
+    X = pd.DataFrame([row for match in ctx.slate for row in feature_rows(match["squad"])])
+    return (lambda: model.predict(X)), len(X)
+
+
+def bench_predict_top_players(ctx: Context):
+    predict_model = _predict_model()
+    predict_model.MLModelWrapper.get_instance()._model = ctx.model
+    squad = ctx.squad
+
+    async def run():
+        with stub_cricket_api(squad):
+            return await predict_model.predict_top_players("bench-match")
+    return run, len(squad)
+
+
+def bench_batch_predict_slate(ctx: Context):
+    from batch_predictions import predict_matches
+    model = ctx.model
+    slate = ctx.slate
+
+    async def run():
+        Session = await ctx.database()
+        match_ids = ctx.notes["match_ids"][-len(slate):]
+        return await predict_matches(match_ids, predict=model.predict, persist=False, session_factory=Session)
+    return run, len(slate)
+
+
+def _ranked(squad: List[Dict[str, Any]], rng: random.Random) -> List[Dict[str, Any]]:
+    return sorted(({"player": p["name"], "score": rng.random()} for p in squad), key=lambda p: -p["score"])
+
+
+def bench_team_generator(ctx: Context):
+    import team_generator
+    squad, count = ctx.squad, ctx.scale["lineups"]
+    ranked = _ranked(squad, ctx.rng("ranked"))
+    team1 = [p["name"] for p in squad if p["team"] == TEAMS[0]]
+    team2 = [p["name"] for p in squad if p["team"] == TEAMS[1]]
+    return (lambda: team_generator.generate_team(ranked, TEAMS[0], TEAMS[0], TEAMS[1], team1, team2,
+                                                 max_combinations=count)), count
+
+
+def bench_lineup_batch(ctx: Context):
+    from lineups import generate_lineups
+    squad, count = ctx.squad, ctx.scale["lineups"]
+    ranked = _ranked(squad, ctx.rng("ranked"))
+    team1 = [p["name"] for p in squad if p["team"] == TEAMS[0]]
+    team2 = [p["name"] for p in squad if p["team"] == TEAMS[1]]
+    return (lambda: generate_lineups(ranked, TEAMS[0], TEAMS[0], TEAMS[1], team1, team2, count, seed=ctx.seed)), count
+
+
+def bench_predict_model_generate_team(ctx: Context):
+    predict_model = _predict_model()
+    rng = ctx.rng("ranked")
+    ranked = [
+        predict_model.Player(id=p["id"], name=p["name"], team=p["team"], role=p["role"],
+                             stats=predict_model.PlayerStats(), fantasy_points=rng.uniform(0, 100))
+        for p in ctx.squad
+    ]
+    ranked.sort(key=lambda p: p.fantasy_points, reverse=True)
+    team1 = [p.name for p in ranked if p.team == TEAMS[0]]
+    team2 = [p.name for p in ranked if p.team == TEAMS[1]]
+    return (lambda: predict_model.generate_team(ranked, TEAMS[0], TEAMS[0], TEAMS[1], team1, team2,
+                                                max_combinations=15)), 15
+
+
+def bench_export_team_csv(ctx: Context):
+    from export_csv import export_team_csv
+    lineups = ctx.lineups
+
+    def run():
+        with working_directory(ctx.workdir):
+            return export_team_csv(lineups, "bench")
+    return run, len(lineups)
+
+
+def bench_db_match_squad(ctx: Context):
+    from queries import get_match_squad
+
+    async def run():
+        Session = await ctx.database()
+        match_ids = ctx.notes["match_ids"]
+        async with Session() as session:
+            for match_id in match_ids[-20:]:
+                await get_match_squad(session, match_id)
+    return run, 20
+
+
+def bench_db_list_matches(ctx: Context):
+    from queries import list_matches
+
+    async def run():
+        Session = await ctx.database()
+        async with Session() as session:
+            cursor = None
+            for _ in range(20):
+                page = await list_matches(session, cursor=cursor, limit=50)
+                cursor = page["next_cursor"]
+    return run, 20
+
+
+def bench_db_aggregates(ctx: Context):
+    import aggregates
+
+    async def run():
+        Session = await ctx.aggregated_database()
+        player_ids = ctx.notes["player_ids"]
+        async with Session() as session:
+            await aggregates.get_top_players(session, limit=50)
+            for player_id in player_ids[:50]:
+                await aggregates.get_player_summary(session, player_id)
+            for team in TEAMS:
+                await aggregates.get_team_summary(session, team)
+    return run, 1 + 50 + len(TEAMS)
+
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark("model.predict_raw", bench_model_predict_raw),
+    Benchmark("model.wrapper_predict", bench_model_wrapper_predict),
+    Benchmark("model.predict_top_players", bench_predict_top_players),
+    Benchmark("batch.predict_slate", bench_batch_predict_slate),
+    Benchmark("generate.team_generator", bench_team_generator, repeat=3),
+    Benchmark("generate.lineup_batch", bench_lineup_batch),
+    Benchmark("generate.predict_model", bench_predict_model_generate_team),
+    Benchmark("export.team_csv", bench_export_team_csv, repeat=3),
+    Benchmark("db.match_squad", bench_db_match_squad),
+    Benchmark("db.list_matches", bench_db_list_matches),
+    Benchmark("db.aggregates", bench_db_aggregates),
+]
+
+
+# --- Runner ---
+async def _call(fn: Callable[[], Any]) -> None:
+    result = fn()
+    if inspect.isawaitable(result):
+        await result
+
+
+async def run_benchmark(benchmark: Benchmark, ctx: Context, repeat: Optional[int] = None) -> Dict[str, Any]:
+    try:
+        fn, items = benchmark.setup(ctx)
+        # The first call warms caches and builds lazy data; it is not timed
+        await _call(fn)
+    except SkipBenchmark as e:
+        return {"status": "skipped", "reason": str(e)}
+    except Exception as e:
+        return {"status": "error", "reason": f"{type(e).__name__}: {e}"}
+
+    timings = []
+    for _ in range(repeat or benchmark.repeat):
+        start = time.perf_counter()
+        await _call(fn)
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    return {
+        "status": "ok",
+        "items": items,
+        "runs": len(timings),
+        "min_s": round(min(timings), 6),
+        "median_s": round(median, 6),
+        "max_s": round(max(timings), 6),
+        "items_per_s": round(items / median, 1) if median else None,
+    }
+
+
+async def run_suite(scale: str = "quick", seed: int = 42, only: Optional[List[str]] = None,
+                    repeat: Optional[int] = None, model_path: str = DEFAULT_MODEL) -> Dict[str, Any]:
+    selected = [b for b in BENCHMARKS if not only or any(b.name.startswith(prefix) for prefix in only)]
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        ctx = Context(SCALES[scale], seed, workdir, model_path)
+        try:
+            for benchmark in selected:
+                results[benchmark.name] = await run_benchmark(benchmark, ctx, repeat)
+                print(_format_result(benchmark.name, results[benchmark.name]), flush=True)
+        finally:
+            await ctx.close()
+    notes = {key: value for key, value in ctx.notes.items() if key not in ("match_ids", "player_ids")}
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "scale": scale,
+            "sizes": SCALES[scale],
+            "seed": seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            **notes,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Per-benchmark median ratio against the baseline, with regressions flagged.
+
+    A benchmark that ran in the baseline but errored or was skipped this time
+    is a regression too: it measured nothing, so it cannot be shown not to
+    have slowed down. Benchmarks without a usable baseline are left out.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before or before.get("status") != "ok":
+            continue
+        if result.get("status") != "ok":
+            rows.append({
+                "name": name,
+                "baseline_s": before["median_s"],
+                "current_s": None,
+                "ratio": None,
+                "status": result.get("status"),
+                "reason": result.get("reason"),
+                "regression": True,
+            })
+            continue
+        ratio = result["median_s"] / before["median_s"] if before["median_s"] else float("inf")
+        slower = result["median_s"] - before["median_s"]
+        rows.append({
+            "name": name,
+            "baseline_s": before["median_s"],
+            "current_s": result["median_s"],
+            "ratio": round(ratio, 3),
+            "status": "ok",
+            "regression": ratio > 1 + threshold and slower > NOISE_FLOOR_SECONDS,
+        })
+    return rows
+
+
+def _format_result(name: str, result: Dict[str, Any]) -> str:
+    if result["status"] != "ok":
+        return f"⏭️  {name:<28} {result['status']}: {result['reason']}"
+    return f"⏱️  {name:<28} {result['median_s'] * 1000:>10.2f} ms  ({result['items_per_s']:,.0f} items/s)"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="full")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="*", help="Run benchmarks whose name starts with one of these")
+    parser.add_argument("--repeat", type=int, help="Timed runs per benchmark (default: per benchmark)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Model artifact; a synthetic model is used if it does not load")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_suite(args.scale, args.seed, args.only, args.repeat, args.model))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("scale") != args.scale:
+            print(f"⚠️  Baseline was run at scale '{baseline['meta'].get('scale')}', this run at '{args.scale}'")
+        report["comparison"] = compare(report, baseline, args.threshold)
+        for row in report["comparison"]:
+            mark = "❌" if row["regression"] else "✅"
+            if row["status"] != "ok":
+                print(f"{mark} {row['name']:<28} {row['baseline_s'] * 1000:>10.2f} ms -> {row['status']}: {row['reason']}")
+                continue
+            print(f"{mark} {row['name']:<28} {row['baseline_s'] * 1000:>10.2f} ms -> {row['current_s'] * 1000:>10.2f} ms  (x{row['ratio']})")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Results written to {args.output}")
+
+    regressions = [row["name"] for row in report.get("comparison", []) if row["regression"]]
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) (over {args.threshold:.0%} slower, or no longer running): "
+              f"{', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -24,7 +24,10 @@ export const API_ENDPOINTS = {
     // Team generation and prediction
     generateTeam: (matchId) => `${API_PREFIX}/teams/generate/${matchId}`,
     updateData: `${API_PREFIX}/data/update`,
-    predictTeam: `${API_PREFIX}/teams/predict`
+    predictTeam: `${API_PREFIX}/teams/predict`,
+
+    // Server-sent prediction updates (use with EventSource instead of polling)
+    liveMatch: (matchId) => `${API_PREFIX}/live/matches/${matchId}/stream`
 };
 
 // Development helpers
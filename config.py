@@ -17,6 +17,10 @@ DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite+aiosqlite:///{DB_PATH}")
 # API Keys
 CRICKET_API_KEY = os.getenv("CRICKET_API_KEY", "8146b4df-00b4-4c17-a5b5-567658087a66")
 
+# Cricket data API; point it at a local stub for load tests
+CRICKET_API_URL = os.getenv("CRICKET_API_URL", "https://api.cricapi.com/v1").rstrip("/")
+API_URL_MATCH_INFO = f"{CRICKET_API_URL}/match_info"
+
 # Migration Settings
 RUN_MIGRATION = os.getenv("RUN_MIGRATION", "true").lower() == "true"
 
@@ -1,19 +1,159 @@
 # utils/database.py
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.engine import make_url
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Text, event, text
+from typing import Any, Dict
 import os
+import logging
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_PROFILE = os.getenv("DB_PROFILE", "production")
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+
+# Engine profiles. SQLite allows one writer at a time, so the production
+# profile uses a single-connection write pool and a separate read-only pool.
+# Foreign keys stay unenforced: predictions reference upstream and fallback
+# player ids that usually have no players row.
+ENGINE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "development": {
+        "pragmas": {},
+        "write_pool_size": 5,
+        "read_pool_size": None,
+        "pool_timeout": 30,
+    },
+    "production": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+            "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")),
+            "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+            "temp_store": "MEMORY",
+        },
+        "write_pool_size": 1,
+        "read_pool_size": int(os.getenv("DB_READ_POOL_SIZE", "8")),
+        "pool_timeout": 30,
+    },
+}
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def _is_memory_sqlite(url: str) -> bool:
+    database = make_url(url).database
+    return not database or database == ":memory:"
+
+def _apply_pragmas(engine: AsyncEngine, pragmas: Dict[str, Any]) -> None:
+    """Run PRAGMA statements on every new DBAPI connection"""
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def create_engine_for_profile(
+    url: str,
+    profile: str = DB_PROFILE,
+    read_only: bool = False,
+    echo: bool = DB_ECHO,
+) -> AsyncEngine:
+    """Create an async engine with the pool size and SQLite pragmas of a profile"""
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown database profile '{profile}'. Choose from {sorted(ENGINE_PROFILES)}")
+    settings = ENGINE_PROFILES[profile]
+
+    kwargs: Dict[str, Any] = {"echo": echo}
+    pool_size = settings["read_pool_size"] if read_only else settings["write_pool_size"]
+    if not (_is_sqlite(url) and _is_memory_sqlite(url)):
+        kwargs.update(
+            pool_size=pool_size or settings["write_pool_size"],
+            max_overflow=0,
+            pool_timeout=settings["pool_timeout"],
+        )
+
+    new_engine = create_async_engine(url, **kwargs)
+
+    if _is_sqlite(url):
+        pragmas = dict(settings["pragmas"])
+        if read_only:
+            pragmas["query_only"] = "ON"
+        _apply_pragmas(new_engine, pragmas)
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+    return new_engine
+
+engine = create_engine_for_profile(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+AsyncSessionLocal = SessionLocal
+
+# Read-only sessions go to their own pool when the profile has one, so reads
+# never queue behind the single writer connection
+if ENGINE_PROFILES[DB_PROFILE]["read_pool_size"] and not _is_memory_sqlite(DATABASE_URL):
+    read_engine = create_engine_for_profile(DATABASE_URL, read_only=True)
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(bind=read_engine, class_=AsyncSession, expire_on_commit=False)
 
 Base = declarative_base()
 
+class Match(Base):
+    __tablename__ = "matches"
+    id = Column(String, primary_key=True)
+    team1 = Column(String, nullable=False)
+    team2 = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    winner = Column(Text)
+
+class Player(Base):
+    __tablename__ = "players"
+    id = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    team = Column(String, nullable=False)
+    batting_average = Column(Float)
+    bowling_average = Column(Float)
+
+class MatchPerformance(Base):
+    __tablename__ = "match_performances"
+    id = Column(Integer, primary_key=True)
+    match_id = Column(String, ForeignKey("matches.id"))
+    player_id = Column(String, ForeignKey("players.id"))
+    # Copy of matches.date, so a player's recent form is one index range scan
+    match_date = Column(Date)
+    runs_scored = Column(Integer)
+    wickets_taken = Column(Integer)
+    catches = Column(Integer)
+
+class Prediction(Base):
+    __tablename__ = "predictions"
+    id = Column(Integer, primary_key=True)
+    player_id = Column(String, ForeignKey("players.id"), index=True)
+    predicted_score = Column(Float, nullable=False)
+    ownership_percent = Column(Float)
+    mindset = Column(String)
+
 async def get_db():
     async with SessionLocal() as session:
         yield session
+
+async def get_read_db():
+    async with ReadSessionLocal() as session:
+        yield session
+
+async def health_check() -> bool:
+    """Return True if the database answers a trivial query"""
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        logger.error(f"Database health check failed: {e}")
+        return False
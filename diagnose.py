@@ -84,19 +84,18 @@ async def check_database():
     logger.info("🗄️ Checking database...")
 
     try:
-        from database import health_check, AsyncSessionLocal, Match
-        from sqlalchemy import select
+        from database import health_check, AsyncSessionLocal
+        from queries import count_matches, list_matches
 
         health = await health_check()
         logger.info(f"🏥 Database health: {health}")
 
         async with AsyncSessionLocal() as session:
-            result = await session.execute(select(Match))
-            matches = result.scalars().all()
-            logger.info(f"📊 Matches in DB: {len(matches)}")
+            logger.info(f"📊 Matches in DB: {await count_matches(session)}")
 
-            for match in matches[:3]:
-                logger.info(f"  - {match.team1} vs {match.team2} ({match.date})")
+            page = await list_matches(session, limit=3)
+            for match in page["items"]:
+                logger.info(f"  - {match['team1']} vs {match['team2']} ({match['date']})")
 
         return True
     except Exception as e:
@@ -1,6 +1,10 @@
 import csv
 import os
 
+from memory import tracked
+
+
+@tracked()
 def export_team_csv(team_list, match_id):
     os.makedirs("exports", exist_ok=True)
     filename = f"exports/GL_Genie_Teams_{match_id}.csv"
@@ -0,0 +1,214 @@
+# fast_json.py
+
+import gzip
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import orjson
+from starlette.responses import Response
+
+from response_cache import STREAMING_TYPES
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are sent as they are
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+PLAYER_FIELDS = ("id", "name", "team", "role", "fantasy_points", "confidence")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def field_value(obj: Any, name: str) -> Any:
+    """A field of a dict or an object such as a pydantic model; None when missing"""
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def pack_players(players: Iterable[Any], fields: Sequence[str] = PLAYER_FIELDS) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Column-per-field player table and a name -> row index lookup.
+
+    Works with Player models or plain dicts; each player is written once no
+    matter how many lineups it appears in. Players are told apart by id when
+    they have one, so two players who share a name keep their own rows;
+    lineups name their players, so the lookup points at the first of them.
+    """
+    rows = []
+    index: Dict[str, int] = {}
+    seen = set()
+    for player in players:
+        name = field_value(player, "name")
+        player_id = field_value(player, "id")
+        key = ("id", player_id) if player_id is not None else ("name", name)
+        if key in seen:
+            continue
+        seen.add(key)
+        index.setdefault(name, len(rows))
+        rows.append([field_value(player, field) for field in fields])
+    return {"fields": list(fields), "rows": rows}, index
+
+
+def pack_teams(teams: Iterable[Any], players: Iterable[Any]) -> Dict[str, Any]:
+    """
+    Compact payload for generated lineups.
+
+    Every lineup is [player indexes, captain index, vice-captain index,
+    total points], with indexes into the shared player table. Names that are
+    not in `players` are appended to the table with only their name set.
+    """
+    table, index = pack_players(players)
+    name_slot = table["fields"].index("name")
+
+    def lookup(name: str) -> int:
+        slot = index.get(name)
+        if slot is None:
+            slot = index[name] = len(table["rows"])
+            row = [None] * len(table["fields"])
+            row[name_slot] = name
+            table["rows"].append(row)
+        return slot
+
+    lineups = [
+        [
+            [lookup(name) for name in field_value(team, "players")],
+            lookup(field_value(team, "captain")),
+            lookup(field_value(team, "vice_captain")),
+            field_value(team, "total_points") or 0.0,
+        ]
+        for team in teams
+    ]
+    return {
+        "players": table,
+        "lineup_fields": ["players", "captain", "vice_captain", "total_points"],
+        "lineups": lineups,
+    }
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response rendered with orjson.
+
+    Endpoints that return one directly skip FastAPI's jsonable_encoder pass.
+    The body size and serialization time are reported in X-Body-Bytes and
+    X-Serialize-Ms.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = dumps(content)
+        self.serialize_ms = (time.perf_counter() - start) * 1000
+        return body
+
+    def __init__(self, content: Any = None, status_code: int = 200, headers: Optional[Dict[str, str]] = None, **kwargs):
+        super().__init__(content, status_code, headers, **kwargs)
+        self.headers["X-Body-Bytes"] = str(len(self.body))
+        self.headers["X-Serialize-Ms"] = f"{self.serialize_ms:.3f}"
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported coding from an Accept-Encoding header, or None"""
+    offered: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        offered[coding.strip().lower()] = quality
+
+    preferred = (["br"] if brotli is not None else []) + ["gzip"]
+    candidates = [c for c in preferred if offered.get(c, offered.get("*", 0.0)) > 0]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda c: offered.get(c, offered.get("*", 0.0)))
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Negotiated gzip/brotli for buffered responses above a size threshold.
+
+    Adds Vary: Accept-Encoding, marks ETags weak once the bytes change and
+    keeps the uncompressed size in X-Body-Bytes.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.stats = {"responses": 0, "compressed": 0, "bytes_in": 0, "bytes_out": 0}
+
+    async def __call__(self, scope, receive, send):
+        # A HEAD response has no body to compress, and its Content-Length must stay the GET body's
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        accept = dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1")
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def wrapped(message):
+            nonlocal passthrough
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                if (message["status"] in (204, 304) or b"content-encoding" in headers
+                        or headers.get(b"content-type", b"").startswith(STREAMING_TYPES)):
+                    passthrough = True
+                    return await send(message)
+                start.update(message)
+                return
+            if passthrough:
+                return await send(message)
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                await self._finish(send, start, b"".join(chunks), encoding)
+
+        await self.app(scope, receive, wrapped)
+
+    async def _finish(self, send, start: Dict[str, Any], body: bytes, encoding: str) -> None:
+        vary = [v for k, v in start.get("headers", []) if k.lower() == b"vary"]
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() not in (b"content-length", b"vary")]
+        self.stats["responses"] += 1
+        self.stats["bytes_in"] += len(body)
+        if len(body) >= self.minimum_size:
+            compressed = compress(body, encoding)
+            if len(compressed) < len(body):
+                headers = [
+                    (k, b"W/" + v if k.lower() == b"etag" and not v.startswith(b"W/") else v)
+                    for k, v in headers if k.lower() != b"x-body-bytes"
+                ]
+                headers += [
+                    (b"content-encoding", encoding.encode()),
+                    (b"x-body-bytes", str(len(body)).encode()),
+                ]
+                body = compressed
+                self.stats["compressed"] += 1
+        self.stats["bytes_out"] += len(body)
+        headers += [(b"content-length", str(len(body)).encode()), (b"vary", b", ".join(vary + [b"Accept-Encoding"]))]
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,14 @@
+# feature_schema.py
+
+# Model Configuration
+REQUIRED_FEATURES = [
+    'bat_avg', 'bat_sr', 'bowl_avg', 'bowl_sr', 'death_overs_pct'
+]
+
+DEFAULT_FEATURES = {
+    'bat_avg': 25.0,
+    'bat_sr': 120.0,
+    'bowl_avg': 30.0,
+    'bowl_sr': 25.0,
+    'death_overs_pct': 0.3
+}
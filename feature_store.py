@@ -0,0 +1,322 @@
+# feature_store.py
+
+import logging
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import Column, Date, Float, Integer, String, and_, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Base, Match, MatchPerformance
+
+logger = logging.getLogger(__name__)
+
+# Rolling window (in matches) and half-life (in days) for time decay
+ROLLING_WINDOW = 5
+DECAY_HALF_LIFE_DAYS = 180.0
+
+# SQLite caps bound parameters per statement, so IN lists are chunked
+MAX_IN_CLAUSE = 500
+
+# Columns served to training and inference, in order
+FEATURE_COLUMNS = [
+    'matches_played',
+    'runs_avg_5', 'wickets_avg_5', 'catches_avg_5',
+    'runs_ewm', 'wickets_ewm', 'catches_ewm',
+]
+
+
+class PlayerFeature(Base):
+    """Precomputed features for a player after all matches up to as_of_date"""
+    __tablename__ = "player_features"
+    player_id = Column(String, primary_key=True)
+    as_of_date = Column(Date, primary_key=True)
+    matches_played = Column(Integer, nullable=False, default=0)
+    runs_avg_5 = Column(Float, nullable=False, default=0.0)
+    wickets_avg_5 = Column(Float, nullable=False, default=0.0)
+    catches_avg_5 = Column(Float, nullable=False, default=0.0)
+    runs_ewm = Column(Float, nullable=False, default=0.0)
+    wickets_ewm = Column(Float, nullable=False, default=0.0)
+    catches_ewm = Column(Float, nullable=False, default=0.0)
+    decay_weight = Column(Float, nullable=False, default=0.0)
+
+
+def _chunks(values: List[Any], size: int = MAX_IN_CLAUSE) -> Iterable[List[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _daily_performances(player_ids: List[str], start: Optional[date] = None):
+    """
+    Per-player, per-date totals (several matches on one day are merged).
+
+    With `start`, only matches from that date are read: a range scan of
+    ix_match_performances_player_date per player.
+    """
+    query = (
+        select(
+            MatchPerformance.player_id.label('player_id'),
+            Match.date.label('match_date'),
+            func.coalesce(func.sum(MatchPerformance.runs_scored), 0).label('runs'),
+            func.coalesce(func.sum(MatchPerformance.wickets_taken), 0).label('wickets'),
+            func.coalesce(func.sum(MatchPerformance.catches), 0).label('catches'),
+        )
+        .join(Match, Match.id == MatchPerformance.match_id)
+        .where(MatchPerformance.player_id.in_(player_ids))
+        .group_by(MatchPerformance.player_id, Match.date)
+    )
+    if start is not None:
+        query = query.where(MatchPerformance.match_date >= start)
+    return query
+
+
+def _roll_forward(
+    prior: Optional[Dict[str, Any]],
+    window: List[Dict[str, Any]],
+    performances: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """Compute feature rows for new performances, continuing from a prior state"""
+    rows = []
+    matches_played = prior['matches_played'] if prior else 0
+    weight = prior['decay_weight'] if prior else 0.0
+    ewm = {
+        stat: prior[f'{stat}_ewm'] if prior else 0.0
+        for stat in ('runs', 'wickets', 'catches')
+    }
+    last_date = prior['as_of_date'] if prior else None
+    recent = list(window)
+
+    for perf in performances:
+        if last_date is not None:
+            gap = (perf['match_date'] - last_date).days
+            decay = 0.5 ** (gap / DECAY_HALF_LIFE_DAYS)
+        else:
+            decay = 0.0
+        new_weight = weight * decay + 1.0
+        for stat in ewm:
+            ewm[stat] = (ewm[stat] * weight * decay + perf[stat]) / new_weight
+        weight = new_weight
+        matches_played += 1
+
+        recent.append(perf)
+        recent = recent[-ROLLING_WINDOW:]
+        n = len(recent)
+
+        rows.append({
+            'player_id': perf['player_id'],
+            'as_of_date': perf['match_date'],
+            'matches_played': matches_played,
+            'runs_avg_5': sum(r['runs'] for r in recent) / n,
+            'wickets_avg_5': sum(r['wickets'] for r in recent) / n,
+            'catches_avg_5': sum(r['catches'] for r in recent) / n,
+            'runs_ewm': ewm['runs'],
+            'wickets_ewm': ewm['wickets'],
+            'catches_ewm': ewm['catches'],
+            'decay_weight': weight,
+        })
+        last_date = perf['match_date']
+    return rows
+
+
+async def refresh_players(session: AsyncSession, player_ids: Iterable[str], since: date) -> int:
+    """
+    Recompute feature rows for the given players from `since` onwards.
+
+    The latest feature row before `since` is the starting state (counts and
+    EWM), and the feature rows before it give the dates of the rolling
+    window's matches, so performances are only read from the start of that
+    window. The work grows with the new performances, not with the player's
+    history; players with no stored rows yet are read in full.
+    """
+    player_ids = sorted(set(str(p) for p in player_ids))
+    written = 0
+    # Past days the rolling window still includes; the prior row is needed even when that is none
+    window_days = ROLLING_WINDOW - 1
+
+    for chunk in _chunks(player_ids):
+        # One feature row per playing day: the latest before `since` is the
+        # starting state and the last `window_days` of them date the window
+        latest = (
+            select(
+                PlayerFeature,
+                func.row_number().over(
+                    partition_by=PlayerFeature.player_id,
+                    order_by=PlayerFeature.as_of_date.desc(),
+                ).label('rn'),
+            )
+            .where(PlayerFeature.player_id.in_(chunk), PlayerFeature.as_of_date < since)
+            .subquery()
+        )
+        result = await session.execute(select(latest).where(latest.c.rn <= max(window_days, 1)))
+        priors: Dict[str, Dict[str, Any]] = {}
+        window_start: Dict[str, date] = {}
+        for row in result:
+            if row.rn == 1:
+                priors[row.player_id] = dict(row._mapping)
+            if row.rn <= window_days:
+                window_start[row.player_id] = min(row.as_of_date, window_start.get(row.player_id, since))
+
+        # Performances feeding the rolling window, plus everything from `since`
+        daily_rows: List[Dict[str, Any]] = []
+        known = [p for p in chunk if p in priors]
+        unknown = [p for p in chunk if p not in priors]
+        if known:
+            start = min(window_start.get(p, since) for p in known)
+            result = await session.execute(_daily_performances(known, start))
+            daily_rows.extend(
+                dict(row._mapping) for row in result if row.match_date >= window_start.get(row.player_id, since)
+            )
+        if unknown:
+            result = await session.execute(_daily_performances(unknown))
+            daily_rows.extend(dict(row._mapping) for row in result)
+
+        windows: Dict[str, List[Dict[str, Any]]] = {}
+        pending: Dict[str, List[Dict[str, Any]]] = {}
+        for row in sorted(daily_rows, key=lambda r: (r['player_id'], r['match_date'])):
+            if row['match_date'] < since:
+                windows.setdefault(row['player_id'], []).append(row)
+            else:
+                pending.setdefault(row['player_id'], []).append(row)
+        for player_id, window in windows.items():
+            windows[player_id] = window[-window_days:] if window_days else []
+
+        await session.execute(
+            delete(PlayerFeature).where(
+                PlayerFeature.player_id.in_(chunk),
+                PlayerFeature.as_of_date >= since,
+            )
+        )
+
+        rows = []
+        for player_id, performances in pending.items():
+            rows.extend(_roll_forward(priors.get(player_id), windows.get(player_id, []), performances))
+        if rows:
+            await session.execute(insert(PlayerFeature), rows)
+            written += len(rows)
+
+    logger.info("Refreshed %d feature rows for %d players since %s", written, len(player_ids), since)
+    return written
+
+
+async def on_performances_inserted(session: AsyncSession, performances: Iterable[MatchPerformance]) -> int:
+    """Refresh the feature store for the players touched by new performance rows"""
+    performances = list(performances)
+    if not performances:
+        return 0
+
+    match_ids = sorted({p.match_id for p in performances})
+    result = await session.execute(select(func.min(Match.date)).where(Match.id.in_(match_ids)))
+    since = result.scalar()
+    if since is None:
+        logger.warning("New performances reference unknown matches; feature store not refreshed")
+        return 0
+
+    return await refresh_players(session, {p.player_id for p in performances}, since)
+
+
+async def rebuild_all(session: AsyncSession) -> int:
+    """Materialize features for every player from scratch"""
+    result = await session.execute(select(MatchPerformance.player_id).distinct())
+    player_ids = [row[0] for row in result if row[0] is not None]
+    return await refresh_players(session, player_ids, date.min)
+
+
+async def get_feature_vectors(
+    session: AsyncSession,
+    player_ids: Iterable[str],
+    as_of: date,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Point-in-time lookup: features for each player from matches strictly before `as_of`.
+
+    A whole squad is served by one indexed query on (player_id, as_of_date).
+    Players without history are omitted from the result.
+    """
+    player_ids = sorted(set(str(p) for p in player_ids))
+    vectors: Dict[str, Dict[str, float]] = {}
+
+    for chunk in _chunks(player_ids):
+        latest = (
+            select(
+                PlayerFeature,
+                func.row_number().over(
+                    partition_by=PlayerFeature.player_id,
+                    order_by=PlayerFeature.as_of_date.desc(),
+                ).label('rn'),
+            )
+            .where(PlayerFeature.player_id.in_(chunk), PlayerFeature.as_of_date < as_of)
+            .subquery()
+        )
+        result = await session.execute(select(latest).where(latest.c.rn == 1))
+        for row in result:
+            vectors[row.player_id] = {col: float(getattr(row, col)) for col in FEATURE_COLUMNS}
+
+    return vectors
+
+
+def feature_rows(vectors: Dict[str, Dict[str, float]], player_ids: Iterable[str]) -> List[List[float]]:
+    """
+    Model input rows, in FEATURE_COLUMNS order, for the given players.
+
+    Players without history get zeros, as get_training_rows gives them, so a
+    model sees the same vector for a player at training and at inference.
+    """
+    return [[vectors.get(str(p), {}).get(col, 0.0) for col in FEATURE_COLUMNS] for p in player_ids]
+
+
+async def get_training_rows(session: AsyncSession, start: Optional[date] = None, end: Optional[date] = None) -> List[Dict[str, Any]]:
+    """
+    Feature vectors joined to the performance they should predict.
+
+    Each performance is paired with the player's features as of the day before
+    the match, which is exactly what get_feature_vectors serves at inference.
+    """
+    pf = PlayerFeature.__table__
+    as_of = (
+        select(func.max(pf.c.as_of_date))
+        .where(pf.c.player_id == MatchPerformance.player_id, pf.c.as_of_date < Match.date)
+        .correlate(MatchPerformance, Match)
+        .scalar_subquery()
+    )
+    query = (
+        select(
+            MatchPerformance.match_id,
+            MatchPerformance.player_id,
+            Match.date.label('match_date'),
+            MatchPerformance.runs_scored,
+            MatchPerformance.wickets_taken,
+            MatchPerformance.catches,
+            *[pf.c[col] for col in FEATURE_COLUMNS],
+        )
+        .join(Match, Match.id == MatchPerformance.match_id)
+        .outerjoin(pf, and_(pf.c.player_id == MatchPerformance.player_id, pf.c.as_of_date == as_of))
+        .order_by(Match.date, MatchPerformance.id)
+    )
+    if start is not None:
+        query = query.where(Match.date >= start)
+    if end is not None:
+        query = query.where(Match.date < end)
+
+    result = await session.execute(query)
+    rows = []
+    for row in result:
+        record = dict(row._mapping)
+        for col in FEATURE_COLUMNS:
+            if record[col] is None:
+                record[col] = 0.0
+        rows.append(record)
+    return rows
+
+
+async def _rebuild_main():
+    from database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        written = await rebuild_all(session)
+        await session.commit()
+    print(f"✅ Feature store rebuilt ({written} rows)")
+
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(_rebuild_main())
@@ -0,0 +1,217 @@
+# health.py
+
+import asyncio
+import inspect
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Union
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+HEALTH_INTERVAL_SECONDS = float(os.getenv("HEALTH_INTERVAL_SECONDS", "10"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+# Readiness fails until the model is loaded (set when workers pre-warm)
+HEALTH_REQUIRE_MODEL = os.getenv("HEALTH_REQUIRE_MODEL", "false").lower() == "true"
+
+CheckResult = Dict[str, Any]
+CheckFunction = Callable[[], Union[CheckResult, Awaitable[CheckResult]]]
+
+
+class HealthCheck(NamedTuple):
+    name: str
+    check: CheckFunction
+    # Readiness fails when a critical check is not ok
+    critical: bool = True
+
+
+# --- Default checks ---
+async def check_database() -> CheckResult:
+    from database import health_check
+    return {"ok": await health_check()}
+
+
+def check_model() -> CheckResult:
+    # Only looks at an already imported module, never triggers the load
+    module = sys.modules.get("predict_model")
+    wrapper = getattr(module, "MLModelWrapper", None)
+    loaded = wrapper is not None and getattr(wrapper, "_model", None) is not None
+    return {"ok": loaded or not HEALTH_REQUIRE_MODEL, "loaded": loaded}
+
+
+def check_upstream_cache() -> CheckResult:
+    from sports_api import CACHE_FILE, CACHE_TTL
+    try:
+        age = time.time() - os.stat(CACHE_FILE).st_mtime
+    except OSError:
+        return {"ok": False, "age_seconds": None}
+    return {"ok": age < CACHE_TTL, "age_seconds": round(age, 1)}
+
+
+def check_queues() -> CheckResult:
+    queues = {}
+    for module_name, attribute, label in (
+        ("prediction_writer", "prediction_writer", "prediction_writer"),
+        ("jobs", "job_manager", "jobs"),
+    ):
+        module = sys.modules.get(module_name)
+        if module is not None:
+            queues[label] = getattr(module, attribute).pending
+    live = sys.modules.get("live_updates")
+    if live is not None:
+        queues["live_subscribers"] = live.live_hub.subscriber_count
+    logging_config = sys.modules.get("logging_config")
+    if logging_config is not None:
+        queues["logging"] = logging_config.logging_stats()
+    return {"ok": True, **queues}
+
+
+async def check_memory() -> CheckResult:
+    from memory import memory_stats
+    # Sizing the model serializes it once; keep that off the event loop
+    stats = await asyncio.get_running_loop().run_in_executor(None, memory_stats)
+    return {"ok": True, **stats}
+
+
+def check_startup() -> CheckResult:
+    import startup
+    return {"ok": startup.warmed, "prewarm": startup.PREWARM}
+
+
+DEFAULT_CHECKS = [
+    HealthCheck("startup", check_startup),
+    HealthCheck("database", check_database),
+    HealthCheck("model", check_model),
+    HealthCheck("upstream_cache", check_upstream_cache, critical=False),
+    HealthCheck("queues", check_queues, critical=False),
+    HealthCheck("memory", check_memory, critical=False),
+]
+
+
+class HealthMonitor:
+    """
+    Runs the readiness checks in the background and keeps the last result.
+
+    Probes read the stored snapshot, so they cost nothing and never wait on
+    the database or on a slow request. Each check has a timeout; a check that
+    raises or times out is reported as failed.
+    """
+
+    def __init__(self, checks=None, interval: float = HEALTH_INTERVAL_SECONDS,
+                 timeout: float = HEALTH_CHECK_TIMEOUT):
+        self.checks = list(checks if checks is not None else DEFAULT_CHECKS)
+        self.interval = interval
+        self.timeout = timeout
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self._refreshed_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run_check(self, check: HealthCheck) -> CheckResult:
+        start = time.perf_counter()
+        try:
+            result = check.check()
+            if inspect.isawaitable(result):
+                result = await asyncio.wait_for(result, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            result = {"ok": False, "error": "timeout"}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        result["critical"] = check.critical
+        result["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+
+    async def refresh(self) -> Dict[str, Any]:
+        results = await asyncio.gather(*(self._run_check(check) for check in self.checks))
+        checks = {check.name: result for check, result in zip(self.checks, results)}
+        ready = all(result["ok"] for result in checks.values() if result["critical"])
+        self.snapshot = {
+            "status": "ready" if ready else "not_ready",
+            "checked_at": datetime.utcnow().isoformat(),
+            "checks": checks,
+        }
+        self._refreshed_at = time.monotonic()
+        return self.snapshot
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Health refresh failed")
+            await asyncio.sleep(self.interval)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="health-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def readiness(self) -> Dict[str, Any]:
+        """The stored snapshot, marked not ready if it is missing or stale"""
+        if self.snapshot is None:
+            return {"status": "not_ready", "reason": "no health data yet"}
+        age = time.monotonic() - self._refreshed_at
+        if age > 3 * self.interval:
+            return {**self.snapshot, "status": "not_ready", "reason": f"health data is {age:.0f}s old"}
+        return self.snapshot
+
+    def is_ready(self) -> bool:
+        return self.readiness()["status"] == "ready"
+
+    def is_database_ok(self) -> bool:
+        database = (self.snapshot or {}).get("checks", {}).get("database", {})
+        return bool(database.get("ok"))
+
+
+health_monitor = HealthMonitor()
+
+router = APIRouter()
+
+
+@router.get("/health/live")
+async def liveness():
+    """The process is up and serving requests"""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness():
+    """Last background health snapshot; 503 while not ready"""
+    snapshot = health_monitor.readiness()
+    return JSONResponse(snapshot, status_code=200 if snapshot["status"] == "ready" else 503)
+
+
+@router.get("/health/startup")
+async def startup_timings():
+    """Time spent in each startup phase, slowest first"""
+    from startup import startup_report
+    return startup_report()
+
+
+@router.get("/health/memory")
+async def memory_usage():
+    """This worker's RSS and model size, plus the latest tracked pipeline allocations"""
+    from memory import memory_stats, recent_reports
+    # Sizing a newly loaded model serializes it; keep that off the event loop
+    stats = await asyncio.get_running_loop().run_in_executor(None, memory_stats)
+    return {**stats, "reports": recent_reports()}
+
+
+@router.get("/health")
+async def health():
+    """Health check endpoint"""
+    db_healthy = health_monitor.is_database_ok()
+    return {
+        "status": "healthy" if health_monitor.is_ready() else "unhealthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "database": "connected" if db_healthy else "disconnected"
+    }
@@ -0,0 +1,386 @@
+# jobs.py
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, String, Text, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Base, SessionLocal
+from lineups import LineupBatch, generate_lineups
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+TEAMS_PER_CHUNK = 200
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_POLL_SECONDS = 0.5
+# A running job's owner renews its lease every third of this; an expired lease means the owner died
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Finished jobs and their results are deleted this long after they finish
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "168"))
+RETENTION_SWEEP_SECONDS = 3600
+PURGE_BATCH_SIZE = 100
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+class JobNotFoundError(Exception):
+    pass
+
+
+class LeaseLostError(Exception):
+    """The job's lease expired and another worker reclaimed it"""
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    input_hash = Column(String, nullable=False, index=True)
+    params = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default=QUEUED)
+    progress = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+    result_count = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    # Worker running the job, and when its claim lapses unless renewed
+    owner = Column(String)
+    lease_expires_at = Column(DateTime)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class JobResult(Base):
+    __tablename__ = "job_results"
+    job_id = Column(String, primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    payload = Column(Text, nullable=False)
+
+
+class JobKind(NamedTuple):
+    # params -> list of chunk arguments; each chunk runs in a worker process
+    plan: Callable[[Dict[str, Any]], List[Any]]
+    # Returns result dicts, or anything iterating as them such as a LineupBatch
+    run_chunk: Callable[[Dict[str, Any], Any], Iterable[Dict[str, Any]]]
+
+
+# --- Team generation ---
+def _plan_team_generation(params: Dict[str, Any]) -> List[Tuple[int, int]]:
+    total = int(params.get("max_combinations", 5))
+    return [(start, min(TEAMS_PER_CHUNK, total - start)) for start in range(0, total, TEAMS_PER_CHUNK)]
+
+
+def _generate_team_chunk(params: Dict[str, Any], chunk: Tuple[int, int]) -> LineupBatch:
+    start, count = chunk
+    # Seeded per chunk, so a job gives the same lineups however it is scheduled
+    seed = int.from_bytes(hashlib.sha256(f"{params.get('seed', 0)}:{start}".encode()).digest()[:8], "big")
+    # A batch crosses the process boundary as a few small arrays rather than `count` dicts
+    return generate_lineups(
+        params["ranked_players"],
+        params["winner_team"],
+        params["team1"],
+        params["team2"],
+        params["team1_players"],
+        params["team2_players"],
+        count,
+        seed=seed,
+    )
+
+
+JOB_KINDS: Dict[str, JobKind] = {
+    "generate_teams": JobKind(_plan_team_generation, _generate_team_chunk),
+}
+
+
+def input_hash(kind: str, params: Dict[str, Any]) -> str:
+    canonical = json.dumps({"kind": kind, "params": params}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def job_status(job: Job) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "total": job.total,
+        "result_count": job.result_count,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+class JobManager:
+    """
+    Persistent job queue with a bounded pool of worker processes.
+
+    Jobs are stored in SQLite as soon as they are submitted, so queued jobs
+    are picked up again by start() after a restart. A job whose kind and
+    parameters match an active job is not run twice; the existing job id is
+    returned instead. Each job is split into chunks that run in the process
+    pool; results are written after every chunk, so they can be paged or
+    streamed while the job is still running.
+
+    Several workers can share the table. A running job records its owner and
+    a lease that the owner renews while it is alive; only jobs whose lease
+    has expired are reset and run again, so a starting worker never restarts
+    another worker's live job. Finished jobs and their results are deleted
+    after JOB_RETENTION_HOURS.
+    """
+
+    def __init__(self, session_factory=SessionLocal, workers: int = JOB_WORKERS,
+                 lease_seconds: float = JOB_LEASE_SECONDS, retention_hours: float = JOB_RETENTION_HOURS):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.lease = timedelta(seconds=lease_seconds)
+        self.retention = timedelta(hours=retention_hours)
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._submit_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        reclaimed = await self.reclaim_expired()
+        async with self.session_factory() as session:
+            pending = (await session.execute(
+                select(Job.id).where(Job.status == QUEUED).order_by(Job.created_at)
+            )).scalars().all()
+        for job_id in pending:
+            self._queue.put_nowait(job_id)
+
+        self._tasks = [asyncio.create_task(self._worker(), name=f"job-worker-{n}") for n in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintain(), name="job-leases"))
+        logger.info(f"Job manager {self.owner_id} started with {self.workers} workers, "
+                    f"{len(pending)} jobs queued ({len(reclaimed)} reclaimed)")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, kind: str, params: Dict[str, Any]) -> Tuple[str, bool]:
+        """Queue a job; returns (job_id, deduplicated)"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        digest = input_hash(kind, params)
+
+        async with self._submit_lock:
+            async with self.session_factory() as session:
+                async with session.begin():
+                    existing = (await session.execute(
+                        select(Job.id).where(Job.input_hash == digest, Job.status.in_(ACTIVE_STATES)).limit(1)
+                    )).scalar()
+                    if existing is not None:
+                        return existing, True
+                    job_id = uuid.uuid4().hex
+                    session.add(Job(
+                        id=job_id, kind=kind, input_hash=digest,
+                        params=json.dumps(params), status=QUEUED,
+                    ))
+
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+        logger.info(f"Queued {kind} job {job_id}")
+        return job_id, False
+
+    async def reclaim_expired(self) -> List[str]:
+        """Reset running jobs whose owner stopped renewing the lease; returns their ids"""
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            async with session.begin():
+                # Leases are checked in the UPDATE itself, so a renewal that lands first wins
+                expired = (await session.execute(
+                    update(Job)
+                    .where(Job.status == RUNNING,
+                           (Job.lease_expires_at.is_(None)) | (Job.lease_expires_at < now))
+                    .values(status=QUEUED, owner=None, lease_expires_at=None,
+                            progress=0, result_count=0, updated_at=now)
+                    .returning(Job.id)
+                )).scalars().all()
+                if expired:
+                    await session.execute(delete(JobResult).where(JobResult.job_id.in_(expired)))
+        if expired:
+            logger.warning(f"Reclaimed {len(expired)} jobs with expired leases: {expired}")
+        return list(expired)
+
+    async def purge_finished(self, older_than: Optional[datetime] = None) -> int:
+        """Delete finished jobs, and their results, that finished before `older_than`"""
+        cutoff = older_than or datetime.utcnow() - self.retention
+        purged = 0
+        while True:
+            # In batches, so a large backlog never holds the write lock for long
+            async with self.session_factory() as session:
+                async with session.begin():
+                    batch = (await session.execute(
+                        select(Job.id).where(Job.status.in_((DONE, FAILED)), Job.updated_at < cutoff)
+                        .limit(PURGE_BATCH_SIZE)
+                    )).scalars().all()
+                    if not batch:
+                        break
+                    await session.execute(delete(JobResult).where(JobResult.job_id.in_(batch)))
+                    await session.execute(delete(Job).where(Job.id.in_(batch)))
+            purged += len(batch)
+        if purged:
+            logger.info(f"Purged {purged} finished jobs older than {cutoff.isoformat()}")
+        return purged
+
+    async def _maintain(self) -> None:
+        """Renew this worker's leases, reclaim dead workers' jobs and apply the retention policy"""
+        interval = self.lease.total_seconds() / 3
+        last_sweep = None
+        while True:
+            try:
+                async with self.session_factory() as session:
+                    async with session.begin():
+                        await session.execute(
+                            update(Job).where(Job.owner == self.owner_id, Job.status == RUNNING)
+                            .values(lease_expires_at=datetime.utcnow() + self.lease)
+                        )
+                for job_id in await self.reclaim_expired():
+                    self._queue.put_nowait(job_id)
+                now = asyncio.get_running_loop().time()
+                if last_sweep is None or now - last_sweep >= RETENTION_SWEEP_SECONDS:
+                    last_sweep = now
+                    await self.purge_finished()
+            except Exception:
+                logger.exception("Job lease maintenance failed")
+            await asyncio.sleep(interval)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception(f"Job {job_id} crashed")
+            finally:
+                self._queue.task_done()
+
+    async def _set(self, session: AsyncSession, job_id: str, **values) -> None:
+        """Update a job this worker holds, renewing the lease; raises LeaseLostError if it was reclaimed"""
+        now = datetime.utcnow()
+        updated = await session.execute(
+            update(Job).where(Job.id == job_id, Job.owner == self.owner_id, Job.status == RUNNING)
+            .values(updated_at=now, lease_expires_at=now + self.lease, **values)
+        )
+        if updated.rowcount != 1:
+            raise LeaseLostError(job_id)
+
+    async def _run(self, job_id: str) -> None:
+        async with self.session_factory() as session:
+            async with session.begin():
+                # Claim the job; another worker or process may have taken it
+                now = datetime.utcnow()
+                claimed = await session.execute(
+                    update(Job).where(Job.id == job_id, Job.status == QUEUED)
+                    .values(status=RUNNING, owner=self.owner_id, lease_expires_at=now + self.lease, updated_at=now)
+                )
+                if claimed.rowcount != 1:
+                    return
+                job = await session.get(Job, job_id)
+                kind = JOB_KINDS[job.kind]
+                params = json.loads(job.params)
+                chunks = kind.plan(params)
+                total = int(params.get("max_combinations", len(chunks)))
+                await self._set(session, job_id, total=total)
+
+        loop = asyncio.get_running_loop()
+        seq = 0
+        try:
+            for chunk in chunks:
+                results = await loop.run_in_executor(self._pool, kind.run_chunk, params, chunk)
+                async with self.session_factory() as session:
+                    async with session.begin():
+                        # Checked first: a reclaimed job's results belong to its new run
+                        payloads = [json.dumps(result) for result in results]
+                        done = seq + len(payloads)
+                        await self._set(session, job_id, progress=min(done, total), result_count=done)
+                        session.add_all([
+                            JobResult(job_id=job_id, seq=seq + n, payload=payload)
+                            for n, payload in enumerate(payloads)
+                        ])
+                        seq = done
+            async with self.session_factory() as session:
+                async with session.begin():
+                    await self._set(session, job_id, status=DONE, progress=total)
+        except LeaseLostError:
+            logger.warning(f"Job {job_id} was reclaimed by another worker; abandoning this run")
+            return
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            async with self.session_factory() as session:
+                async with session.begin():
+                    try:
+                        await self._set(session, job_id, status=FAILED, error=str(e))
+                    except LeaseLostError:
+                        logger.warning(f"Job {job_id} was reclaimed by another worker before it failed")
+            return
+        logger.info(f"Job {job_id} finished with {seq} results")
+
+    async def get(self, job_id: str) -> Dict[str, Any]:
+        async with self.session_factory() as session:
+            job = await session.get(Job, job_id)
+            if job is None:
+                raise JobNotFoundError(job_id)
+            return job_status(job)
+
+    async def results_page(self, job_id: str, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+        """One page of results by sequence number; available while the job runs"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        status = await self.get(job_id)
+        async with self.session_factory() as session:
+            rows = (await session.execute(
+                select(JobResult.seq, JobResult.payload)
+                .where(JobResult.job_id == job_id, JobResult.seq >= offset)
+                .order_by(JobResult.seq).limit(limit)
+            )).all()
+        items = [json.loads(row.payload) for row in rows]
+        next_offset = rows[-1].seq + 1 if rows else offset
+        more = next_offset < status["result_count"] or status["status"] in ACTIVE_STATES
+        return {
+            "job": status,
+            "items": items,
+            "next_offset": next_offset if more else None,
+        }
+
+    async def stream_results(self, job_id: str) -> AsyncIterator[bytes]:
+        """NDJSON lines of results, following the job until it finishes"""
+        offset = 0
+        while True:
+            page = await self.results_page(job_id, offset, MAX_PAGE_SIZE)
+            for item in page["items"]:
+                yield (json.dumps(item) + "\n").encode()
+            offset += len(page["items"])
+            if page["next_offset"] is None:
+                return
+            if not page["items"]:
+                await asyncio.sleep(STREAM_POLL_SECONDS)
+
+
+job_manager = JobManager()
@@ -0,0 +1,66 @@
+# jobs_api.py
+
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from jobs import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, JobNotFoundError, job_manager
+
+router = APIRouter()
+
+
+class RankedPlayer(BaseModel):
+    player: str
+    score: float
+
+
+class TeamGenerationRequest(BaseModel):
+    ranked_players: List[RankedPlayer]
+    winner_team: str
+    team1: str
+    team2: str
+    team1_players: List[str]
+    team2_players: List[str]
+    max_combinations: int = Field(5, ge=1, le=100_000)
+    seed: int = 0
+
+
+@router.post("/teams", status_code=202)
+async def submit_team_generation(request: TeamGenerationRequest):
+    """Queue a team generation job and return its id immediately"""
+    job_id, deduplicated = await job_manager.submit("generate_teams", request.dict())
+    return {"job_id": job_id, "deduplicated": deduplicated, **await job_manager.get(job_id)}
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Status and progress of a job"""
+    try:
+        return await job_manager.get(job_id)
+    except JobNotFoundError:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+
+@router.get("/{job_id}/results")
+async def get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """One page of results; pass next_offset back to get the next page"""
+    try:
+        return await job_manager.results_page(job_id, offset, limit)
+    except JobNotFoundError:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+
+@router.get("/{job_id}/results/stream")
+async def stream_job_results(job_id: str):
+    """All results as NDJSON, streamed as the job produces them"""
+    try:
+        await job_manager.get(job_id)
+    except JobNotFoundError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(job_manager.stream_results(job_id), media_type="application/x-ndjson")
@@ -0,0 +1,252 @@
+# lineups.py
+
+import logging
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from fast_json import PLAYER_FIELDS, field_value
+from memory import tracked
+from scoring import CAPTAIN_MULTIPLIER, VICE_CAPTAIN_MULTIPLIER
+
+logger = logging.getLogger(__name__)
+
+TEAM_SIZE = 11
+# Player indexes are stored as uint8, so one table holds at most this many players
+MAX_PLAYERS = 255
+# Lineups sampled per step in generate_lineups, to bound the temporary arrays
+GENERATION_CHUNK = 20_000
+
+
+class InvalidLineupsError(ValueError):
+    pass
+
+
+class LineupBatch:
+    """
+    Many lineups over one shared player table, stored as index arrays.
+
+    Each lineup is a row of eleven uint8 indexes into `players`, plus the
+    captain's and vice-captain's indexes and any number of float score
+    columns, so 100k lineups take a couple of megabytes instead of 100k
+    dicts or pydantic models. Validation and scoring run on the whole batch
+    at once; slicing returns a batch that shares the player table, and
+    pydantic Team objects are only built by to_teams() when a lineup is
+    serialized.
+    """
+
+    def __init__(self, players: Sequence[Any], matrix: np.ndarray, captain: np.ndarray,
+                 vice_captain: np.ndarray, scores: Optional[Dict[str, np.ndarray]] = None):
+        if len(players) > MAX_PLAYERS:
+            raise ValueError(f"A lineup batch holds at most {MAX_PLAYERS} players, got {len(players)}")
+        matrix = np.asarray(matrix, dtype=np.uint8)
+        if matrix.ndim != 2 or matrix.shape[1] != TEAM_SIZE:
+            raise ValueError(f"Lineup matrix must have shape (n, {TEAM_SIZE}), got {matrix.shape}")
+        self.players = list(players)
+        self.names = [player if isinstance(player, str) else field_value(player, "name") for player in self.players]
+        self.matrix = matrix
+        self.captain = np.asarray(captain, dtype=np.uint8)
+        self.vice_captain = np.asarray(vice_captain, dtype=np.uint8)
+        self.scores = {name: np.asarray(column, dtype=np.float32) for name, column in (scores or {}).items()}
+        for name, column in [("captain", self.captain), ("vice_captain", self.vice_captain), *self.scores.items()]:
+            if column.shape != (len(matrix),):
+                raise ValueError(f"Column '{name}' has shape {column.shape}, expected ({len(matrix)},)")
+
+    @classmethod
+    def from_lineups(cls, lineups: Iterable[Any], players: Optional[Iterable[Any]] = None) -> "LineupBatch":
+        """
+        Build a batch from team_generator dicts or Team models.
+
+        Names that are not in `players` are added to the table as bare
+        names. A total_points field, when present, becomes a score column.
+        """
+        table: List[Any] = []
+        index: Dict[str, int] = {}
+        for player in players or ():
+            name = player if isinstance(player, str) else field_value(player, "name")
+            if name not in index:
+                index[name] = len(table)
+                table.append(player)
+
+        def lookup(name: str) -> int:
+            slot = index.get(name)
+            if slot is None:
+                slot = index[name] = len(table)
+                table.append(name)
+            return slot
+
+        rows, captains, vice_captains, totals = [], [], [], []
+        for lineup in lineups:
+            rows.append([lookup(name) for name in field_value(lineup, "players")])
+            captains.append(lookup(field_value(lineup, "captain")))
+            vice_captains.append(lookup(field_value(lineup, "vice_captain")))
+            totals.append(field_value(lineup, "total_points"))
+
+        if len(table) > MAX_PLAYERS:
+            raise ValueError(f"A lineup batch holds at most {MAX_PLAYERS} players, got {len(table)}")
+        if any(len(row) != TEAM_SIZE for row in rows):
+            raise InvalidLineupsError(f"Every lineup must have {TEAM_SIZE} players")
+        matrix = np.array(rows, dtype=np.uint8).reshape(len(rows), TEAM_SIZE)
+        scores = {}
+        if totals and all(total is not None for total in totals):
+            scores["total_points"] = np.array(totals, dtype=np.float32)
+        return cls(table, matrix, captains, vice_captains, scores)
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    def __getitem__(self, key: Union[int, slice, np.ndarray, Sequence[int]]) -> Union[Dict[str, Any], "LineupBatch"]:
+        """An int gives one lineup as a dict; a slice, index array or mask gives a batch"""
+        if isinstance(key, (int, np.integer)):
+            return self.lineup(int(key))
+        return LineupBatch(
+            self.players, self.matrix[key], self.captain[key], self.vice_captain[key],
+            {name: column[key] for name, column in self.scores.items()},
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return (self.matrix.nbytes + self.captain.nbytes + self.vice_captain.nbytes
+                + sum(column.nbytes for column in self.scores.values()))
+
+    # --- Whole-batch operations ---
+    def validate(self) -> np.ndarray:
+        """
+        Boolean mask of valid lineups.
+
+        The same rules as predict_model.Team: no player twice, captain and
+        vice-captain differ; and both must be in the lineup.
+        """
+        ordered = np.sort(self.matrix, axis=1)
+        unique = (ordered[:, 1:] != ordered[:, :-1]).all(axis=1)
+        distinct_leaders = self.captain != self.vice_captain
+        captain_in = (self.matrix == self.captain[:, None]).any(axis=1)
+        vice_in = (self.matrix == self.vice_captain[:, None]).any(axis=1)
+        in_table = (self.matrix < len(self.players)).all(axis=1)
+        return unique & distinct_leaders & captain_in & vice_in & in_table
+
+    def ensure_valid(self) -> None:
+        invalid = np.flatnonzero(~self.validate())
+        if len(invalid):
+            raise InvalidLineupsError(f"{len(invalid)} invalid lineups, first at rows {invalid[:10].tolist()}")
+
+    def score(self, points: Union[Sequence[float], np.ndarray, Dict[str, float]], column: str = "total_points") -> np.ndarray:
+        """
+        Lineup totals with captain and vice-captain multipliers, as scoring.lineup_points.
+
+        `points` is per player table row, or a name -> points mapping. The
+        totals are stored as a score column and returned.
+        """
+        if isinstance(points, dict):
+            points = [points.get(name, 0.0) for name in self.names]
+        values = np.asarray(points, dtype=np.float64)
+        totals = (values[self.matrix].sum(axis=1)
+                  + values[self.captain] * (CAPTAIN_MULTIPLIER - 1)
+                  + values[self.vice_captain] * (VICE_CAPTAIN_MULTIPLIER - 1))
+        self.scores[column] = totals.astype(np.float32)
+        return self.scores[column]
+
+    def top(self, count: int, column: str = "total_points") -> "LineupBatch":
+        """The `count` highest-scoring lineups, best first"""
+        values = self.scores[column]
+        count = min(count, len(values))
+        best = np.argpartition(-values, count - 1)[:count] if count else np.array([], dtype=np.intp)
+        return self[best[np.argsort(-values[best], kind="stable")]]
+
+    # --- Materialization ---
+    def lineup(self, i: int) -> Dict[str, Any]:
+        """One lineup in team_generator's dict format, plus its scores"""
+        names = self.names
+        result: Dict[str, Any] = {
+            "players": [names[slot] for slot in self.matrix[i].tolist()],
+            "captain": names[self.captain[i]],
+            "vice_captain": names[self.vice_captain[i]],
+        }
+        for name, column in self.scores.items():
+            result[name] = float(column[i])
+        return result
+
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.lineup(i)
+
+    # Iterating gives the dicts, so a batch can go wherever team_generator's list went
+    __iter__ = iter_dicts
+
+    def to_teams(self, team_factory: Optional[Callable[..., Any]] = None) -> Iterator[Any]:
+        """Validated pydantic Team objects, built one at a time"""
+        factory = team_factory or _default_team_factory()
+        for lineup in self.iter_dicts():
+            yield factory(**lineup)
+
+    def to_packed(self, fields: Sequence[str] = PLAYER_FIELDS) -> Dict[str, Any]:
+        """The payload fast_json.pack_teams produces, straight from the arrays"""
+        rows = [
+            [player if field == "name" else None for field in fields] if isinstance(player, str)
+            else [field_value(player, field) for field in fields]
+            for player in self.players
+        ]
+        totals = self.scores.get("total_points")
+        totals = totals.tolist() if totals is not None else [0.0] * len(self)
+        return {
+            "players": {"fields": list(fields), "rows": rows},
+            "lineup_fields": ["players", "captain", "vice_captain", "total_points"],
+            "lineups": [
+                [players, captain, vice_captain, total]
+                for players, captain, vice_captain, total in zip(
+                    self.matrix.tolist(), self.captain.tolist(), self.vice_captain.tolist(), totals
+                )
+            ],
+        }
+
+
+def _default_team_factory() -> Callable[..., Any]:
+    # Deferred: the model module is expensive to import
+    from predict_model import Team
+    return Team
+
+
+@tracked()
+def generate_lineups(
+    ranked_players: Sequence[Dict[str, Any]],
+    winner_team: str,
+    team1: str,
+    team2: str,
+    team1_players: Sequence[str],
+    team2_players: Sequence[str],
+    count: int,
+    seed: Optional[int] = None,
+) -> LineupBatch:
+    """
+    team_generator.generate_team, vectorized into a LineupBatch.
+
+    Each lineup takes 8 random players from the predicted winner's pool and
+    3 from the other side, ordered by score; the top two are captain and
+    vice-captain. `ranked_players` holds {"player", "score"} dicts.
+    """
+    winner_list = set(team1_players if winner_team == team1 else team2_players)
+    loser_list = set(team2_players if winner_team == team1 else team1_players)
+    names = [p["player"] for p in ranked_players]
+    scores = np.array([p["score"] for p in ranked_players], dtype=np.float64)
+    winner_pool = np.array([i for i, name in enumerate(names) if name in winner_list], dtype=np.intp)
+    loser_pool = np.array([i for i, name in enumerate(names) if name in loser_list], dtype=np.intp)
+    if len(winner_pool) < 8 or len(loser_pool) < 3:
+        raise ValueError(f"Need 8 players from {winner_team} and 3 from the other team, "
+                         f"got {len(winner_pool)} and {len(loser_pool)}")
+
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for start in range(0, count, GENERATION_CHUNK):
+        size = min(GENERATION_CHUNK, count - start)
+        # Sampling without replacement per row: the first k of a random permutation
+        winners = winner_pool[rng.random((size, len(winner_pool)), dtype=np.float32).argsort(axis=1)[:, :8]]
+        losers = loser_pool[rng.random((size, len(loser_pool)), dtype=np.float32).argsort(axis=1)[:, :3]]
+        picked = np.concatenate([winners, losers], axis=1)
+        order = np.argsort(-scores[picked], axis=1, kind="stable")
+        chunks.append(np.take_along_axis(picked, order, axis=1).astype(np.uint8))
+    matrix = np.concatenate(chunks) if chunks else np.empty((0, TEAM_SIZE), dtype=np.uint8)
+
+    return LineupBatch(
+        [{"name": name, "fantasy_points": float(score)} for name, score in zip(names, scores)],
+        matrix, matrix[:, 0], matrix[:, 1],
+    )
@@ -0,0 +1,284 @@
+# live_updates.py
+
+import asyncio
+import logging
+import math
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+import orjson
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per subscriber before it is considered too slow
+SUBSCRIBER_QUEUE_SIZE = 64
+# Slow subscribers are resynced with a snapshot this many times, then dropped
+MAX_RESYNCS = 3
+HEARTBEAT_SECONDS = 15.0
+# Changes smaller than this do not count as a new value
+POINTS_TOLERANCE = 1e-6
+# Channels without subscribers are forgotten after this long without a publish
+CHANNEL_IDLE_SECONDS = 600.0
+EVICT_INTERVAL = 60.0
+
+# Marker put on a lagging subscriber's queue in place of the deltas it missed
+RESYNC = object()
+
+
+def sse_event(event: str, data: Any, event_id: Optional[str] = None) -> bytes:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + orjson.dumps(data).decode())
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+def _changed(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> bool:
+    if old is None or old.keys() != new.keys():
+        return True
+    for key, value in new.items():
+        previous = old[key]
+        if isinstance(value, float) and isinstance(previous, (int, float)):
+            if not math.isclose(value, previous, abs_tol=POINTS_TOLERANCE):
+                return True
+        elif value != previous:
+            return True
+    return False
+
+
+class Subscriber:
+    __slots__ = ("queue", "resyncs", "closed")
+
+    def __init__(self, size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.resyncs = 0
+        self.closed = False
+
+
+class MatchChannel:
+    """Latest predictions and lineup for one match, plus its subscribers"""
+
+    def __init__(self, match_id: str, now: float = 0.0, event_prefix: str = ""):
+        self.match_id = match_id
+        self.event_prefix = event_prefix
+        self.version = 0
+        self.players: Dict[str, Dict[str, Any]] = {}
+        self.lineup: Optional[Any] = None
+        self.subscribers: Set[Subscriber] = set()
+        self.last_active = now
+        self._snapshot: Optional[Tuple[int, bytes]] = None
+
+    def snapshot(self) -> bytes:
+        """The current state as one event, serialized once per version and shared by every reader"""
+        if self._snapshot is None or self._snapshot[0] != self.version:
+            self._snapshot = (self.version, sse_event("snapshot", {
+                "match_id": self.match_id,
+                "version": self.version,
+                "players": self.players,
+                "lineup": self.lineup,
+            }, self.event_id()))
+        return self._snapshot[1]
+
+    def event_id(self) -> str:
+        return f"{self.event_prefix}{self.version}"
+
+
+class LiveHub:
+    """
+    Fan-out of per-match prediction updates to server-sent event streams.
+
+    publish() compares the new predictions with the last ones, serializes the
+    changed players once and hands the same bytes to every subscriber, so one
+    recomputation costs the same for ten viewers as for ten thousand. Each
+    subscriber has a bounded queue; a client that falls behind has its backlog
+    replaced by a single snapshot, and is disconnected if it keeps lagging.
+
+    A channel nobody is subscribed to is kept for idle_seconds after its last
+    publish, so reconnecting clients can resume, and then evicted. Versions
+    come from one hub-wide sequence, so a channel created again after
+    eviction never reuses a version a client may still hold.
+
+    The hub lives in one process: with several workers, a recomputation
+    reaches only the viewers connected to the worker that made it, so live
+    streams need a single worker or sticky routing to the publishing one.
+    Event ids are prefixed with this hub's instance id, and a Last-Event-ID
+    from another worker or an earlier run is ignored, so its version is never
+    compared with this hub's sequence and the client gets a snapshot.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE, idle_seconds: float = CHANNEL_IDLE_SECONDS,
+                 clock: Callable[[], float] = time.monotonic, evict_interval: float = EVICT_INTERVAL,
+                 instance: Optional[str] = None):
+        self.instance = instance or uuid.uuid4().hex[:12]
+        self.queue_size = queue_size
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        self.evict_interval = evict_interval
+        self.channels: Dict[str, MatchChannel] = {}
+        self.stats = {"published": 0, "deltas": 0, "delivered": 0, "resyncs": 0, "dropped": 0, "evicted": 0}
+        self._sequence = 0
+        self._last_evict = clock()
+
+    def _channel(self, match_id: str) -> MatchChannel:
+        now = self.clock()
+        if now - self._last_evict >= self.evict_interval:
+            self._evict_idle(now)
+        channel = self.channels.get(match_id)
+        if channel is None:
+            channel = self.channels[match_id] = MatchChannel(match_id, now, f"{self.instance}-")
+        return channel
+
+    def _evict_idle(self, now: float) -> None:
+        idle = [match_id for match_id, channel in self.channels.items()
+                if not channel.subscribers and now - channel.last_active >= self.idle_seconds]
+        for match_id in idle:
+            del self.channels[match_id]
+        self._last_evict = now
+        if idle:
+            self.stats["evicted"] += len(idle)
+            logger.debug(f"Evicted {len(idle)} idle live channels")
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(channel.subscribers) for channel in self.channels.values())
+
+    def publish(self, match_id: str, players: Dict[str, Dict[str, Any]], lineup: Optional[Any] = None) -> Optional[int]:
+        """
+        Record new predictions for a match and broadcast what changed.
+
+        `players` maps player id to its prediction fields and replaces the
+        previous set; players missing from it are reported as removed.
+        Returns the new version, or None if nothing changed.
+        """
+        channel = self._channel(match_id)
+        self.stats["published"] += 1
+
+        changed = {pid: values for pid, values in players.items() if _changed(channel.players.get(pid), values)}
+        removed = [pid for pid in channel.players if pid not in players]
+        lineup_changed = lineup is not None and lineup != channel.lineup
+        if not changed and not removed and not lineup_changed:
+            return None
+
+        self._sequence += 1
+        channel.version = self._sequence
+        channel.last_active = self.clock()
+        channel.players = dict(players)
+        if lineup is not None:
+            channel.lineup = lineup
+
+        delta: Dict[str, Any] = {"match_id": match_id, "version": channel.version, "changed": changed}
+        if removed:
+            delta["removed"] = removed
+        if lineup_changed:
+            delta["lineup"] = lineup
+        self._broadcast(channel, sse_event("delta", delta, channel.event_id()))
+        self.stats["deltas"] += 1
+        return channel.version
+
+    def _broadcast(self, channel: MatchChannel, payload: bytes) -> None:
+        for subscriber in list(channel.subscribers):
+            try:
+                subscriber.queue.put_nowait(payload)
+                self.stats["delivered"] += 1
+            except asyncio.QueueFull:
+                self._lagging(channel, subscriber)
+
+    def _lagging(self, channel: MatchChannel, subscriber: Subscriber) -> None:
+        # Missed deltas are worthless once a snapshot is on its way
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.resyncs += 1
+        if subscriber.resyncs > MAX_RESYNCS:
+            subscriber.closed = True
+            channel.subscribers.discard(subscriber)
+            self.stats["dropped"] += 1
+            logger.info(f"Dropped slow subscriber on match {channel.match_id}")
+        else:
+            self.stats["resyncs"] += 1
+        subscriber.queue.put_nowait(RESYNC)
+
+    def subscribe(self, match_id: str) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        self._channel(match_id).subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, match_id: str, subscriber: Subscriber) -> None:
+        channel = self.channels.get(match_id)
+        if channel is None:
+            return
+        channel.subscribers.discard(subscriber)
+        if not channel.subscribers:
+            if not channel.players:
+                del self.channels[match_id]
+            else:
+                # Kept for resuming clients until it has been idle for idle_seconds
+                channel.last_active = self.clock()
+
+    def resume_version(self, last_event_id: Optional[str]) -> Optional[int]:
+        """The version in a Last-Event-ID this hub issued; None for any other id"""
+        instance, _, version = (last_event_id or "").rpartition("-")
+        if instance != self.instance or not version.isdigit():
+            return None
+        return int(version)
+
+    async def stream(self, match_id: str, last_event_id: Optional[str] = None,
+                     heartbeat: float = HEARTBEAT_SECONDS) -> AsyncIterator[bytes]:
+        """SSE byte stream for one client: a snapshot, then deltas and heartbeats"""
+        subscriber = self.subscribe(match_id)
+        channel = self._channel(match_id)
+        try:
+            # A reconnecting client that is already current needs no snapshot
+            resume = self.resume_version(last_event_id)
+            if resume is None or resume != channel.version:
+                yield channel.snapshot()
+            while not subscriber.closed:
+                try:
+                    payload = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                yield channel.snapshot() if payload is RESYNC else payload
+        finally:
+            self.unsubscribe(match_id, subscriber)
+
+
+live_hub = LiveHub()
+
+
+def publish_predictions(match_id: str, players: List[Any], lineup: Optional[Any] = None) -> Optional[int]:
+    """Broadcast predictions for Player models or dicts with id/name/fantasy_points"""
+    def field(player: Any, name: str) -> Any:
+        return player.get(name) if isinstance(player, dict) else getattr(player, name, None)
+
+    return live_hub.publish(match_id, {
+        str(field(player, "id")): {
+            "name": field(player, "name"),
+            "team": field(player, "team"),
+            "fantasy_points": float(field(player, "fantasy_points") or 0.0),
+            "confidence": field(player, "confidence"),
+        }
+        for player in players
+    }, lineup)
+
+
+router = APIRouter()
+
+
+@router.get("/matches/{match_id}/stream")
+async def match_stream(request: Request, match_id: str, last_event_id: Optional[str] = Header(None)):
+    """Server-sent events with live prediction deltas for a match, from this worker's hub"""
+    async def events():
+        async for chunk in live_hub.stream(match_id, last_event_id):
+            if await request.is_disconnected():
+                break
+            yield chunk
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
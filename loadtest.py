@@ -0,0 +1,442 @@
+"""
+End-to-end HTTP load test for the API.
+
+Seeds a throwaway SQLite database, starts a local stub of the cricket data
+API, launches the app under uvicorn pointed at both, and drives a weighted
+mix of requests at a fixed concurrency (optionally capped at a target rate).
+Reports throughput, p50/p95/p99 latency and error rates per route as JSON,
+and compares with an earlier report when --baseline is given, exiting
+non-zero when a route got slower or lost throughput beyond --threshold.
+
+    python loadtest.py --app backend.app.main:app --app-dir .. --duration 60 --concurrency 64
+    python loadtest.py --url http://127.0.0.1:8000 --mix matches=1   # an already running server
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+from benchmark import make_history, make_squad, seed_sqlite
+
+API = "/api/v1"
+DEFAULT_OUTPUT = "exports/loadtest_results.json"
+DEFAULT_MIX = "matches=50,prediction=25,generation=15,export=10"
+# Relative change in p95 latency or throughput that counts as a regression
+DEFAULT_THRESHOLD = 0.15
+STARTUP_TIMEOUT_SECONDS = 60
+# Latencies kept per route for percentiles; beyond this a uniform sample is kept
+LATENCY_SAMPLE_LIMIT = 200_000
+# Seconds to wait for the export job the export scenario streams
+EXPORT_JOB_TIMEOUT_SECONDS = 60
+
+
+class Scenario(NamedTuple):
+    method: str
+    # (rng, state) -> path; state holds the seeded match ids and the export job id
+    path: Callable[[random.Random, Dict[str, Any]], str]
+    body: Optional[Callable[[random.Random, Dict[str, Any]], Any]] = None
+
+
+def _ranked_request(rng: random.Random, state: Dict[str, Any], combinations: int) -> Dict[str, Any]:
+    match = rng.choice(state["squads"])
+    squad = match["squad"]
+    team1 = [p["name"] for p in squad if p["team"] == match["team1"]]
+    team2 = [p["name"] for p in squad if p["team"] == match["team2"]]
+    return {
+        "ranked_players": [{"player": p["name"], "score": round(rng.random(), 4)} for p in squad],
+        "winner_team": match["team1"],
+        "team1": match["team1"],
+        "team2": match["team2"],
+        "team1_players": team1,
+        "team2_players": team2,
+        "max_combinations": combinations,
+        # A fresh seed per request, so identical jobs are not deduplicated away
+        "seed": rng.randrange(1 << 30),
+    }
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "matches": Scenario("GET", lambda rng, state: f"{API}/matches?limit=50"),
+    "prediction": Scenario(
+        "POST", lambda rng, state: f"{API}/teams/predict",
+        lambda rng, state: {"match_id": rng.choice(state["match_ids"])},
+    ),
+    "batch_prediction": Scenario(
+        "POST", lambda rng, state: f"{API}/predictions/batch",
+        lambda rng, state: {"match_ids": rng.sample(state["match_ids"], 10)},
+    ),
+    "generation": Scenario(
+        "POST", lambda rng, state: f"{API}/jobs/teams",
+        lambda rng, state: _ranked_request(rng, state, 20),
+    ),
+    "export": Scenario("GET", lambda rng, state: f"{API}/jobs/{state['export_job_id']}/results/stream"),
+    "stats": Scenario("GET", lambda rng, state: f"{API}/stats/players/top?limit=25"),
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """"matches=50,prediction=25" -> weights by scenario name"""
+    mix = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}'. Choose from {sorted(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("The traffic mix needs at least one scenario with a positive weight")
+    return mix
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class RouteStats:
+    """
+    Counters and a latency sample for one route.
+
+    Latencies go into a fixed-size reservoir (Algorithm R): every request has
+    the same chance of being in it however long the run, so percentiles stay
+    unbiased and memory stays bounded. The maximum is tracked exactly.
+    """
+
+    __slots__ = ("latencies", "requests", "errors", "statuses", "max_latency", "limit", "_rng")
+
+    def __init__(self, limit: int = LATENCY_SAMPLE_LIMIT, seed: Any = 0):
+        self.latencies: List[float] = []
+        self.requests = 0
+        self.errors = 0
+        self.statuses: Dict[str, int] = {}
+        self.max_latency: Optional[float] = None
+        self.limit = limit
+        self._rng = random.Random(seed)
+
+    def record(self, status: str, seconds: float, ok: bool) -> None:
+        self.requests += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+        if self.max_latency is None or seconds > self.max_latency:
+            self.max_latency = seconds
+        if len(self.latencies) < self.limit:
+            self.latencies.append(seconds)
+        else:
+            slot = self._rng.randrange(self.requests)
+            if slot < self.limit:
+                self.latencies[slot] = seconds
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "requests": self.requests,
+            "rps": round(self.requests / elapsed, 1) if elapsed else None,
+            "error_rate": round(self.errors / self.requests, 4) if self.requests else 0.0,
+            "statuses": self.statuses,
+            "p50_ms": ms(percentile(latencies, 50)),
+            "p95_ms": ms(percentile(latencies, 95)),
+            "p99_ms": ms(percentile(latencies, 99)),
+            "max_ms": ms(self.max_latency),
+        }
+
+
+# --- Local cricket API stub ---
+class CricketAPIStub:
+    """Serves match_info for any match id with a squad derived from the id"""
+
+    def __init__(self, seed: int = 0, delay: float = 0.0):
+        self.seed = seed
+        self.delay = delay
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                match_id = parse_qs(urlparse(self.path).query).get("id", ["unknown"])[0]
+                if stub.delay:
+                    time.sleep(stub.delay)
+                body = json.dumps(stub.match_info(match_id)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="cricket-api-stub", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def match_info(self, match_id: str) -> Dict[str, Any]:
+        rng = random.Random(f"{self.seed}:{match_id}")
+        squad = make_squad(rng, "Team A", "Team B")
+        teams: Dict[str, List[Dict[str, Any]]] = {}
+        for player in squad:
+            teams.setdefault(player["team"], []).append(player)
+        return {"status": "success", "data": {
+            "id": match_id,
+            "teams": [{"name": name, "players": players} for name, players in teams.items()],
+        }}
+
+    def __enter__(self) -> "CricketAPIStub":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# --- Application under test ---
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app(app: str, app_dir: str, env: Dict[str, str], workers: int) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=app_dir, env={**os.environ, **env},
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+def wait_until_live(url: str, process: Optional[subprocess.Popen] = None,
+                    timeout: float = STARTUP_TIMEOUT_SECONDS) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"App exited with code {process.returncode} during startup")
+        try:
+            if httpx.get(f"{url}/health/live", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"App at {url} did not become live within {timeout:.0f}s")
+
+
+# --- Load generation ---
+async def _prepare_state(client: httpx.AsyncClient, rng: random.Random, match_ids: List[str],
+                         mix: Dict[str, float]) -> Dict[str, Any]:
+    state: Dict[str, Any] = {
+        "match_ids": match_ids,
+        "squads": [],
+    }
+    for n in range(20):
+        team1, team2 = f"Team {n % 10}", f"Team {(n + 1) % 10}"
+        state["squads"].append({"team1": team1, "team2": team2, "squad": make_squad(rng, team1, team2)})
+    if "export" in mix:
+        # One finished job whose results every export request streams
+        response = await client.post(f"{API}/jobs/teams", json=_ranked_request(rng, state, 1000))
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+        deadline = asyncio.get_running_loop().time() + EXPORT_JOB_TIMEOUT_SECONDS
+        while True:
+            job = (await client.get(f"{API}/jobs/{job_id}")).json()
+            if job["status"] not in ("queued", "running"):
+                break
+            if asyncio.get_running_loop().time() >= deadline:
+                raise RuntimeError(f"Export job {job_id} still {job['status']} after {EXPORT_JOB_TIMEOUT_SECONDS}s")
+            await asyncio.sleep(0.1)
+        # Streaming a failed job's results would measure an error path, not the export
+        if job["status"] != "done":
+            raise RuntimeError(f"Export job {job_id} ended as {job['status']}: {job.get('error')}")
+        state["export_job_id"] = job_id
+    return state
+
+
+async def drive(url: str, mix: Dict[str, float], concurrency: int, duration: float, warmup: float,
+                rate: Optional[float], match_ids: List[str], seed: int = 0,
+                timeout: float = 30.0) -> Dict[str, Any]:
+    """Run the mix for `duration` seconds after `warmup` and return per-route statistics"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        state = await _prepare_state(client, random.Random(seed), match_ids, mix)
+        names, weights = list(mix), list(mix.values())
+        stats = {name: RouteStats(seed=f"{seed}:{name}") for name in names}
+        total = RouteStats(seed=f"{seed}:total")
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        measure_from = started + warmup
+        stop_at = measure_from + duration
+        next_slot = started
+
+        async def worker(n: int) -> None:
+            nonlocal next_slot
+            rng = random.Random(f"{seed}:{n}")
+            while True:
+                now = loop.time()
+                if now >= stop_at:
+                    return
+                if rate:
+                    # Open-loop pacing: each request takes the next slot of the schedule
+                    slot, next_slot = next_slot, max(next_slot, now - 1.0) + 1.0 / rate
+                    if slot > now:
+                        await asyncio.sleep(slot - now)
+                name = rng.choices(names, weights)[0]
+                scenario = SCENARIOS[name]
+                body = scenario.body(rng, state) if scenario.body else None
+                request_start = time.perf_counter()
+                try:
+                    response = await client.request(scenario.method, scenario.path(rng, state), json=body)
+                    await response.aread()
+                    status, ok = str(response.status_code), response.status_code < 400
+                except httpx.HTTPError as e:
+                    status, ok = type(e).__name__, False
+                elapsed = time.perf_counter() - request_start
+                if loop.time() >= measure_from:
+                    stats[name].record(status, elapsed, ok)
+                    total.record(status, elapsed, ok)
+
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = loop.time() - measure_from
+
+    routes = {name: route.summary(elapsed) for name, route in stats.items()}
+    return {"elapsed_s": round(elapsed, 2), "total": total.summary(elapsed), "routes": routes}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """Per-route p95 and throughput against the baseline, with regressions flagged"""
+    rows = []
+    for name, route in current["routes"].items():
+        before = baseline.get("routes", {}).get(name)
+        if not before or not route["requests"] or not before["requests"]:
+            continue
+        p95_ratio = route["p95_ms"] / before["p95_ms"] if before["p95_ms"] else 1.0
+        rps_ratio = route["rps"] / before["rps"] if before["rps"] else 1.0
+        rows.append({
+            "route": name,
+            "p95_ms": [before["p95_ms"], route["p95_ms"]],
+            "rps": [before["rps"], route["rps"]],
+            "error_rate": [before["error_rate"], route["error_rate"]],
+            "regression": (p95_ratio > 1 + threshold or rps_ratio < 1 - threshold
+                           or route["error_rate"] > before["error_rate"] + 0.01),
+        })
+    return rows
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"{'route':<18}{'requests':>10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    for name, route in list(report["routes"].items()) + [("TOTAL", report["total"])]:
+        print(f"{name:<18}{route['requests']:>10}{route['rps'] or 0:>10.1f}{route['p50_ms'] or 0:>10.1f}"
+              f"{route['p95_ms'] or 0:>10.1f}{route['p99_ms'] or 0:>10.1f}{route['error_rate']:>9.1%}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="backend.app.main:app", help="uvicorn import string of the app")
+    parser.add_argument("--app-dir", default=".", help="Directory uvicorn is started from")
+    parser.add_argument("--url", help="Load an already running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Scenario weights, from {sorted(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--rate", type=float, help="Target requests per second (default: as fast as possible)")
+    parser.add_argument("--history", type=int, default=100_000, help="Performance rows in the seeded database")
+    parser.add_argument("--stub-delay-ms", type=float, default=20.0, help="Latency of the cricket API stub")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", help="Name for this run, e.g. a version or commit")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    with tempfile.TemporaryDirectory() as workdir, CricketAPIStub(args.seed, args.stub_delay_ms / 1000) as stub:
+        players, matches, performances = make_history(random.Random(args.seed), args.history)
+        match_ids = [m[0] for m in matches]
+        process = None
+        url = args.url
+        if url is None:
+            db_path = os.path.join(workdir, "loadtest.db")
+            seed_sqlite(db_path, players, matches, performances)
+            print(f"🌱 Seeded {len(matches):,} matches and {len(performances):,} performances")
+            env = {
+                "DATABASE_URL": f"sqlite+aiosqlite:///{db_path}",
+                "CRICKET_API_URL": stub.url,
+                "RUN_MIGRATION": "false",
+                # Measure capacity, not the rate limiter
+                "RATE_LIMIT_PER_MINUTE": "100000000",
+                "PREWARM": "true",
+            }
+            process, url = start_app(args.app, args.app_dir, env, args.workers)
+        try:
+            wait_until_live(url, process)
+            print(f"🚀 Driving {url} with {args.concurrency} concurrent clients for {args.duration:.0f}s")
+            result = asyncio.run(drive(url, mix, args.concurrency, args.duration, args.warmup,
+                                       args.rate, match_ids, args.seed))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "label": args.label,
+            "app": args.url or args.app,
+            "workers": args.workers,
+            "mix": mix,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "rate": args.rate,
+            "history_rows": args.history,
+            "stub_delay_ms": args.stub_delay_ms,
+            "stub_requests": stub.requests,
+        },
+        **result,
+    }
+    _print_report(report)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f), args.threshold)
+        for row in report["comparison"]:
+            mark = "❌" if row["regression"] else "✅"
+            print(f"{mark} {row['route']:<18} p95 {row['p95_ms'][0]} -> {row['p95_ms'][1]} ms, "
+                  f"{row['rps'][0]} -> {row['rps'][1]} rps")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Report written to {args.output}")
+    return 1 if any(row["regression"] for row in report.get("comparison", [])) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
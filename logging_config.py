@@ -1,6 +1,19 @@
+import atexit
 import logging.config
+import logging.handlers
 import json
+import os
+import queue
+import threading
+import time
 from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# Records buffered for the listener thread; beyond this they are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Per logger and level, INFO/WARNING records allowed per second (0 = unlimited)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "50"))
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "100"))
 
 LOG_CONFIG = {
     "version": 1,
@@ -36,11 +49,138 @@ LOG_CONFIG = {
     }
 }
 
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks: when the queue is full the record is dropped and counted"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Token-bucket rate limit per (logger, level) for INFO and WARNING records.
+
+    Hot-path messages beyond `rate` per second (after a burst allowance) are
+    suppressed and counted; errors are always kept.
+    """
+
+    def __init__(self, rate: float = LOG_SAMPLE_RATE, burst: int = LOG_SAMPLE_BURST,
+                 overrides: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.overrides = overrides or {}
+        self.suppressed: Dict[Tuple[str, int], int] = {}
+        self._buckets: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR or record.levelno < logging.INFO:
+            return True
+        rate = self.overrides.get(record.name, self.rate)
+        if rate <= 0:
+            return True
+
+        key = (record.name, record.levelno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return True
+            bucket[0] = tokens
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return False
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+_sampling_filter: Optional[SamplingFilter] = None
+
+
+def _json_formatter_available() -> bool:
+    try:
+        import pythonjsonlogger  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
 def setup_logging():
-    """Configure logging for the application"""
+    """
+    Configure logging for the application.
+
+    The console and file handlers run on a background listener thread; the
+    root logger only gets a non-blocking queue handler with sampling, so
+    logging never does I/O on the event loop.
+    """
+    global _listener, _queue_handler, _sampling_filter
+    if _listener is not None:
+        return
+
     # Create logs directory if it doesn't exist
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
     
     # Apply logging configuration
-    logging.config.dictConfig(LOG_CONFIG)
+    config = json.loads(json.dumps(LOG_CONFIG))
+    if not _json_formatter_available():
+        config["handlers"]["file"]["formatter"] = "default"
+        del config["formatters"]["json"]
+    logging.config.dictConfig(config)
+
+    # Move the configured handlers behind a queue
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    for handler in handlers:
+        root.removeHandler(handler)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _sampling_filter = SamplingFilter()
+    _queue_handler.addFilter(_sampling_filter)
+    root.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the listener thread.
+
+    The queue handler is taken off the root logger and the real handlers go
+    back on it, so records logged afterwards (e.g. by other atexit hooks) are
+    written directly instead of piling up in a queue nobody reads.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        root = logging.getLogger()
+        root.removeHandler(_queue_handler)
+        for handler in _listener.handlers:
+            handler.flush()
+            root.addHandler(handler)
+        _listener = None
+        _queue_handler = None
+
+
+def logging_stats() -> Dict[str, int]:
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+        "suppressed": sum(_sampling_filter.suppressed.values()) if _sampling_filter else 0,
+    }
@@ -1,3 +1,5 @@
+from .startup import timed, warm_up
+
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -5,12 +7,19 @@ from datetime import datetime
 import logging
 
 from .database.session import get_db
-from backend.app.api.main import health_check
 from .middleware.error_handler import error_handler
 from .config import CORS_ORIGINS, API_V1_PREFIX, PROJECT_NAME, PROJECT_VERSION
+with timed("import app modules"):
+    from .prediction_writer import prediction_writer
+    from .jobs import job_manager
+    from .health import health_monitor, router as health_router
+    from .response_cache import ResponseCacheMiddleware
+    from .fast_json import CompressionMiddleware, FastJSONResponse
+    from .logging_config import setup_logging, shutdown_logging
+    from .profiling import ProfilingMiddleware, profiler, router as profiling_router
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Setup logging: handlers run on a background thread behind a bounded queue
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Create FastAPI app
@@ -19,6 +28,7 @@ app = FastAPI(
     version=PROJECT_VERSION,
     docs_url=f"{API_V1_PREFIX}/docs",
     redoc_url=f"{API_V1_PREFIX}/redoc",
+    default_response_class=FastJSONResponse,
 )
 
 # Add CORS middleware
@@ -30,22 +40,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ETags, 304s and cached bodies for polled GET routes
+app.add_middleware(ResponseCacheMiddleware)
+
+# Wraps the response cache, so cached bodies are stored uncompressed and negotiated per request
+app.add_middleware(CompressionMiddleware)
+
 # Add error handler middleware
 app.middleware("http")(error_handler)
 
-@app.get("/health")
-async def health():
-    """Health check endpoint"""
-    db_healthy = await health_check()
-    return {
-        "status": "healthy" if db_healthy else "unhealthy",
-        "timestamp": datetime.utcnow().isoformat(),
-        "database": "connected" if db_healthy else "disconnected"
-    }
+# Outermost: opt-in per-request sampling profiles (X-Profile header or armed by an admin)
+app.add_middleware(ProfilingMiddleware)
+
+@app.on_event("startup")
+async def start_background_writers():
+    # Runs before the worker accepts traffic; PREWARM=true loads the model here
+    await warm_up()
+    # Task factory for request profiles; only installed when PROFILE_TOKEN is set
+    profiler.install()
+    await prediction_writer.start()
+    await job_manager.start()
+    await health_monitor.start()
+
+@app.on_event("shutdown")
+async def flush_background_writers():
+    # Flush buffered predictions before the process exits
+    await prediction_writer.stop()
+    await job_manager.stop()
+    await health_monitor.stop()
+    shutdown_logging()
+
+# /health, /health/live and /health/ready serve a snapshot refreshed in the background
+app.include_router(health_router, tags=["health"])
 
 # Import and include routers
-from .api.routers import matches, teams, predictions
+with timed("import routers"):
+    from .api.routers import matches, teams, predictions
 
 app.include_router(matches.router, prefix=f"{API_V1_PREFIX}/matches", tags=["matches"])
 app.include_router(teams.router, prefix=f"{API_V1_PREFIX}/teams", tags=["teams"])
 app.include_router(predictions.router, prefix=f"{API_V1_PREFIX}/predictions", tags=["predictions"])
+
+from .stats_api import router as stats_router
+
+app.include_router(stats_router, prefix=f"{API_V1_PREFIX}/stats", tags=["stats"])
+
+from .jobs_api import router as jobs_router
+
+app.include_router(jobs_router, prefix=f"{API_V1_PREFIX}/jobs", tags=["jobs"])
+
+from .batch_api import router as batch_router
+
+app.include_router(batch_router, prefix=f"{API_V1_PREFIX}/predictions", tags=["predictions"])
+
+from .live_updates import router as live_router
+
+app.include_router(live_router, prefix=f"{API_V1_PREFIX}/live", tags=["live"])
+
+from .ball_events import router as deliveries_router
+
+# Ball-by-ball feed for the derived player features
+app.include_router(deliveries_router, prefix=f"{API_V1_PREFIX}/live", tags=["live"])
+
+app.include_router(profiling_router, prefix=f"{API_V1_PREFIX}/admin/profiles", tags=["admin"])
@@ -0,0 +1,245 @@
+# memory.py
+
+import functools
+import inspect
+import linecache
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# tracemalloc slows allocation-heavy code down noticeably, so tracking is opt-in
+MEMORY_TRACKING = os.getenv("MEMORY_TRACKING", "false").lower() == "true"
+# Frames kept per allocation; more frames give better call sites and cost more
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "1"))
+TOP_SITES = 10
+MAX_REPORTS = 50
+
+
+class MemoryBudgetExceeded(Exception):
+    pass
+
+
+class Budget(NamedTuple):
+    """Peak traced bytes allowed for a pipeline: a fixed part plus a part per input item"""
+    fixed_bytes: int
+    per_item_bytes: int = 0
+
+    def for_items(self, items: int) -> int:
+        return self.fixed_bytes + self.per_item_bytes * items
+
+
+MB = 1024 * 1024
+
+# Budgets for the tracked pipelines; the memory tests hold them to these
+BUDGETS: Dict[str, Budget] = {
+    "generate_team": Budget(1 * MB, 600),
+    "generate_lineups": Budget(8 * MB, 32),
+    "export_team_csv": Budget(1 * MB, 16),
+    "predict_matches": Budget(4 * MB, 4_000),
+}
+
+
+class MemoryReport:
+    """Allocation summary of one tracked call"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.peak_bytes = 0
+        self.retained_bytes = 0
+        self.duration_ms = 0.0
+        self.top_sites: List[Dict[str, Any]] = []
+        self.budget_bytes: Optional[int] = None
+        # Set when another tracked call was already running; nothing was measured
+        self.skipped = False
+        self.recorded_at = time.time()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "peak_bytes": self.peak_bytes,
+            "retained_bytes": self.retained_bytes,
+            "budget_bytes": self.budget_bytes,
+            "duration_ms": self.duration_ms,
+            "skipped": self.skipped,
+            "top_sites": self.top_sites,
+        }
+
+
+_reports: "OrderedDict[str, MemoryReport]" = OrderedDict()
+# tracemalloc's peak is process-wide; concurrent tracked calls would blur it
+_track_lock = threading.Lock()
+
+
+def _site(frame: tracemalloc.Frame) -> str:
+    line = linecache.getline(frame.filename, frame.lineno).strip()
+    return f"{os.path.basename(frame.filename)}:{frame.lineno} {line}"[:160]
+
+
+@contextmanager
+def track(name: str, budget: Optional[int] = None, top: int = TOP_SITES) -> Iterator[MemoryReport]:
+    """
+    Trace allocations made inside the block.
+
+    The report holds the peak traced bytes above the starting point, the
+    bytes still allocated when the block ends, and the call sites that
+    retained the most. With a budget, MemoryBudgetExceeded is raised when
+    the peak goes over it. tracemalloc is started for the block if it is not
+    already running, and stopped again afterwards.
+
+    Only one block is measured at a time, since the peak is process-wide; a
+    block entered while another is running (a concurrent request) gets a
+    report marked skipped.
+    """
+    report = MemoryReport(name)
+    report.budget_bytes = budget
+    # Never wait: the block may span awaits, and waiting would stall the event loop
+    if not _track_lock.acquire(blocking=False):
+        report.skipped = True
+        yield report
+        return
+    try:
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start(MEMORY_TRACE_FRAMES)
+        try:
+            before = tracemalloc.take_snapshot()
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            start = time.perf_counter()
+            try:
+                yield report
+            finally:
+                report.duration_ms = round((time.perf_counter() - start) * 1000, 2)
+                current, peak = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot()
+                report.peak_bytes = max(0, peak - baseline)
+                report.retained_bytes = current - baseline
+                filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+                stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+                report.top_sites = [
+                    {"site": _site(stat.traceback[0]), "size_bytes": stat.size_diff, "count": stat.count_diff}
+                    for stat in stats[:top] if stat.size_diff > 0
+                ]
+        finally:
+            if started_here:
+                tracemalloc.stop()
+    finally:
+        _track_lock.release()
+
+    _reports[name] = report
+    _reports.move_to_end(name)
+    while len(_reports) > MAX_REPORTS:
+        _reports.popitem(last=False)
+
+    if budget is not None and report.peak_bytes > budget:
+        sites = "; ".join(f"{s['site']} (+{s['size_bytes']:,} B)" for s in report.top_sites[:3])
+        raise MemoryBudgetExceeded(
+            f"{name} peaked at {report.peak_bytes:,} bytes, budget {budget:,} bytes. Top sites: {sites}"
+        )
+
+
+def tracked(name: Optional[str] = None) -> Callable:
+    """Decorator: run the function under track() while MEMORY_TRACKING is on"""
+    def decorator(func: Callable) -> Callable:
+        label = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not MEMORY_TRACKING:
+                    return await func(*args, **kwargs)
+                with track(label):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not MEMORY_TRACKING:
+                return func(*args, **kwargs)
+            with track(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def recent_reports() -> List[Dict[str, Any]]:
+    return [report.as_dict() for report in reversed(_reports.values())]
+
+
+# --- Process-level figures ---
+def rss_bytes() -> Optional[int]:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# Keyed on the model object itself and dropped with it, so a reloaded model
+# that reuses a freed object's address is never given the old size
+_model_sizes: "weakref.WeakKeyDictionary[Any, int]" = weakref.WeakKeyDictionary()
+
+
+def model_size_bytes(model: Any) -> int:
+    """Serialized size of a model, a close estimate of its in-memory arrays; cached per object"""
+    try:
+        return _model_sizes[model]
+    except KeyError:
+        pass
+    except TypeError:
+        # Not weak-referenceable; measured every time rather than cached by id
+        return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    size = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    _model_sizes[model] = size
+    return size
+
+
+def loaded_model_size() -> Optional[int]:
+    # Only looks at an already loaded model, never triggers the load
+    module = sys.modules.get("predict_model")
+    wrapper = getattr(getattr(module, "MLModelWrapper", None), "_instance", None)
+    model = getattr(wrapper, "_model", None)
+    if model is None:
+        return None
+    size = model_size_bytes(model)
+    scaler = getattr(wrapper, "_scaler", None)
+    return size + (model_size_bytes(scaler) if scaler is not None else 0)
+
+
+def memory_stats() -> Dict[str, Any]:
+    """Per-worker memory figures for the health endpoints"""
+    traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else None
+    return {
+        "pid": os.getpid(),
+        "rss_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "model_bytes": loaded_model_size(),
+        "tracking": MEMORY_TRACKING,
+        "traced_bytes": traced[0] if traced else None,
+    }
@@ -3,38 +3,18 @@ from fastapi.responses import JSONResponse
 from typing import Callable
 import time
 import os
-from datetime import datetime, timedelta
-from collections import defaultdict
 import logging
 from functools import wraps
 
+from rate_limit import build_rate_limiter, rate_limit_headers
+
 # Get API key from environment
 API_KEY = os.getenv("CRICKET_API_KEY")
 
 logger = logging.getLogger(__name__)
 
-# Rate limiting configuration
-RATE_LIMIT_DURATION = timedelta(minutes=1)
-MAX_REQUESTS_PER_MINUTE = 60
-
-class RateLimiter:
-    def __init__(self):
-        self.requests = defaultdict(list)
-    
-    def is_rate_limited(self, client_ip: str) -> bool:
-        now = datetime.now()
-        self.requests[client_ip] = [
-            req_time for req_time in self.requests[client_ip]
-            if now - req_time < RATE_LIMIT_DURATION
-        ]
-        
-        if len(self.requests[client_ip]) >= MAX_REQUESTS_PER_MINUTE:
-            return True
-            
-        self.requests[client_ip].append(now)
-        return False
-
-rate_limiter = RateLimiter()
+# Rate limiting configuration: RATE_LIMIT_PER_MINUTE, RATE_LIMIT_ROUTES, RATE_LIMIT_BACKEND
+rate_limiter = build_rate_limiter()
 
 async def verify_api_key(request: Request) -> bool:
     api_key = request.headers.get("X-API-Key")
@@ -42,6 +22,11 @@ async def verify_api_key(request: Request) -> bool:
         return False
     return api_key == API_KEY
 
+async def require_api_key(request: Request) -> None:
+    """Route dependency for endpoints that change shared state"""
+    if not await verify_api_key(request):
+        raise HTTPException(status_code=401, detail="Invalid or missing API key")
+
 async def api_key_middleware(request: Request, call_next: Callable):
     if not await verify_api_key(request):
         return JSONResponse(
@@ -51,12 +36,15 @@ async def api_key_middleware(request: Request, call_next: Callable):
     return await call_next(request)
 
 async def rate_limit_middleware(request: Request, call_next: Callable):
-    client_ip = request.client.host
+    client_ip = request.client.host if request.client else "unknown"
     
-    if rate_limiter.is_rate_limited(client_ip):
+    decision = await rate_limiter.check(client_ip, request.url.path)
+    if not decision.allowed:
+        headers = rate_limit_headers(decision)
         return JSONResponse(
             status_code=429,
-            content={"detail": "Too many requests", "retry_after": "60 seconds"}
+            content={"detail": "Too many requests", "retry_after": f"{headers['Retry-After']} seconds"},
+            headers=headers
         )
     
     try:
@@ -65,6 +53,7 @@ async def rate_limit_middleware(request: Request, call_next: Callable):
         process_time = time.time() - start_time
         
         response.headers["X-Process-Time"] = str(process_time)
+        response.headers.update(rate_limit_headers(decision))
         return response
         
     except Exception as e:
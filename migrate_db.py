@@ -1,39 +1,20 @@
 import asyncio
-from sqlalchemy import Index
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.sql import text
-from database import Base, Match, Player, MatchPerformance, DATABASE_URL, AsyncSessionLocal
+from database import Base, DATABASE_URL
+from feature_store import PlayerFeature
+import aggregates
+import jobs
+from schema_indexes import INDEXES, apply_index_plan, sqlalchemy_executor
 
 async def run_migration():
     # Create an asynchronous engine for the migration
     engine = create_async_engine(DATABASE_URL)
-    
+
     async with engine.begin() as conn:
         try:
             # Create tables if they don't exist
             await conn.run_sync(Base.metadata.create_all)
-            
-            # Create new indexes if not exist
-            indexes = await conn.execute(text("PRAGMA index_list('matches')"))
-            existing_indexes = [row[1] for row in indexes.fetchall()]
-            if 'ix_matches_team1' not in existing_indexes:
-                await conn.run_sync(Index('ix_matches_team1', Match.team1).create)
-            if 'ix_matches_team2' not in existing_indexes:
-                await conn.run_sync(Index('ix_matches_team2', Match.team2).create)
-            if 'ix_matches_date' not in existing_indexes:
-                await conn.run_sync(Index('ix_matches_date', Match.date).create)
-
-            indexes = await conn.execute(text("PRAGMA index_list('players')"))
-            existing_indexes = [row[1] for row in indexes.fetchall()]
-            if 'ix_players_team' not in existing_indexes:
-                await conn.run_sync(Index('ix_players_team', Player.team).create)
-
-            indexes = await conn.execute(text("PRAGMA index_list('match_performances')"))
-            existing_indexes = [row[1] for row in indexes.fetchall()]
-            if 'ix_match_performances_match_player' not in existing_indexes:
-                await conn.run_sync(Index('ix_match_performances_match_player', MatchPerformance.match_id, MatchPerformance.player_id).create)
-
-            print("✅ Indexes created successfully!")
 
             # Add 'winner' column to matches table if it does not exist
             result = await conn.execute(text("PRAGMA table_info('matches')"))
@@ -45,21 +26,58 @@ async def run_migration():
             else:
                 print("'winner' column already exists in matches table.")
 
+            # Add 'match_date' to match_performances and fill it from matches
+            result = await conn.execute(text("PRAGMA table_info('match_performances')"))
+            columns = [row[1] for row in result.fetchall()]
+            if 'match_date' not in columns:
+                print("Adding 'match_date' column to match_performances table...")
+                await conn.execute(text("ALTER TABLE match_performances ADD COLUMN match_date DATE"))
+            result = await conn.execute(text(
+                "UPDATE match_performances SET match_date = "
+                "(SELECT date FROM matches WHERE matches.id = match_performances.match_id) "
+                "WHERE match_date IS NULL"
+            ))
+            print(f"✅ 'match_date' filled in for {result.rowcount} performances.")
+
+            # Add lease columns to jobs, so workers only reclaim jobs whose owner died
+            result = await conn.execute(text("PRAGMA table_info('jobs')"))
+            columns = [row[1] for row in result.fetchall()]
+            for column, ddl in (('owner', 'TEXT'), ('lease_expires_at', 'DATETIME')):
+                if column not in columns:
+                    print(f"Adding '{column}' column to jobs table...")
+                    await conn.execute(text(f"ALTER TABLE jobs ADD COLUMN {column} {ddl}"))
+                    print(f"✅ '{column}' column added to jobs table.")
+
+            # Create declared indexes, drop redundant ones, check hot query plans
+            report = await conn.run_sync(lambda sync_conn: apply_index_plan(sqlalchemy_executor(sync_conn)))
+
+            for name in report['created']:
+                print(f"✅ Index {name} created.")
+            for table, name, reason in report['dropped']:
+                print(f"🗑️ Dropped redundant index {name} on {table} ({reason}).")
+            print("✅ Indexes created successfully!")
+
+            regressions = {name: problem for name, problem in report['plans'].items() if problem}
+            for name, problem in report['plans'].items():
+                if problem:
+                    print(f"❌ Query plan for {name}: {problem}")
+                else:
+                    print(f"✅ Query plan for {name} uses its intended index.")
+
             # Verify the indexes were created
-            async with AsyncSessionLocal() as session:
-                for table, index in [
-                    ('matches', 'ix_matches_team1'),
-                    ('matches', 'ix_matches_team2'),
-                    ('matches', 'ix_matches_date'),
-                    ('players', 'ix_players_team'),
-                    ('match_performances', 'ix_match_performances_match_player')
-                ]:
-                    result = await session.execute(text(f"SELECT COUNT(*) FROM sqlite_master WHERE type='index' AND tbl_name='{table}' AND name='{index}'"))
-                    count = result.scalar()
-                    if count > 0:
-                        print(f"✅ Index {index} on table {table} verified.")
-                    else:
-                        print(f"❌ Index {index} on table {table} not found!")
+            for spec in INDEXES:
+                result = await conn.execute(
+                    text("SELECT COUNT(*) FROM sqlite_master WHERE type='index' AND tbl_name=:table AND name=:name"),
+                    {"table": spec.table, "name": spec.name}
+                )
+                count = result.scalar()
+                if count > 0:
+                    print(f"✅ Index {spec.name} on table {spec.table} verified.")
+                else:
+                    print(f"❌ Index {spec.name} on table {spec.table} not found!")
+
+            if regressions:
+                raise RuntimeError(f"Query plan regressions: {sorted(regressions)}")
 
             print("✅ Migration completed successfully!")
         except Exception as e:
@@ -68,15 +86,12 @@ async def run_migration():
 
 async def reverse_migration():
     engine = create_async_engine(DATABASE_URL)
-    
+
     async with engine.begin() as conn:
         try:
             # Drop the indexes
-            await conn.execute(text("DROP INDEX IF EXISTS ix_matches_team1"))
-            await conn.execute(text("DROP INDEX IF EXISTS ix_matches_team2"))
-            await conn.execute(text("DROP INDEX IF EXISTS ix_matches_date"))
-            await conn.execute(text("DROP INDEX IF EXISTS ix_players_team"))
-            await conn.execute(text("DROP INDEX IF EXISTS ix_match_performances_match_player"))
+            for spec in INDEXES:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {spec.name}"))
 
             print("✅ Indexes dropped successfully!")
         except Exception as e:
@@ -0,0 +1,58 @@
+# performances.py
+
+import logging
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import aggregates
+import feature_store
+from database import Match, MatchPerformance
+from response_cache import resource_versions
+
+logger = logging.getLogger(__name__)
+
+# session.info key for resource versions to bump once the transaction commits
+_PENDING_BUMPS_KEY = "performances_pending_bumps"
+
+
+async def record_performances(session: AsyncSession, rows: Iterable[Dict[str, Any]]) -> List[MatchPerformance]:
+    """
+    Insert match performances and update everything derived from them.
+
+    The feature store and the summary tables are refreshed for the affected
+    players and matches only, in the caller's transaction.
+    """
+    performances = [MatchPerformance(**row) for row in rows]
+    if not performances:
+        return []
+
+    undated = {p.match_id for p in performances if p.match_date is None}
+    if undated:
+        dates = dict((await session.execute(select(Match.id, Match.date).where(Match.id.in_(undated)))).all())
+        for performance in performances:
+            if performance.match_date is None:
+                performance.match_date = dates.get(performance.match_id)
+
+    session.add_all(performances)
+    await session.flush()
+
+    await feature_store.on_performances_inserted(session, performances)
+    await aggregates.on_performances_inserted(session, performances)
+    # Cached stats responses go stale once this transaction commits
+    session.info.setdefault(_PENDING_BUMPS_KEY, set()).add("stats")
+    logger.info("Recorded %d performances", len(performances))
+    return performances
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_pending_versions(session: Session) -> None:
+    for name in sorted(session.info.pop(_PENDING_BUMPS_KEY, ())):
+        resource_versions.bump_later(name)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_versions(session: Session) -> None:
+    session.info.pop(_PENDING_BUMPS_KEY, None)
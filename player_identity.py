@@ -0,0 +1,377 @@
+# player_identity.py
+
+import hashlib
+import logging
+import os
+import re
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from database import Player, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Minimum trigram similarity (Dice coefficient) for a fuzzy match
+PLAYER_MATCH_THRESHOLD = float(os.getenv("PLAYER_MATCH_THRESHOLD", "0.6"))
+# Resolved lookups kept per index; cleared whenever players are added
+LOOKUP_CACHE_SIZE = 10_000
+NGRAM = 3
+# A fuzzy match must beat the runner-up by this much, or the name is ambiguous
+FUZZY_MARGIN = 0.05
+# Seconds between checks for players inserted by other workers or bulk loads
+PLAYER_INDEX_REFRESH_SECONDS = float(os.getenv("PLAYER_INDEX_REFRESH_SECONDS", "30"))
+# Seconds between full reloads, which also pick up players renamed elsewhere
+PLAYER_INDEX_RELOAD_SECONDS = float(os.getenv("PLAYER_INDEX_RELOAD_SECONDS", "3600"))
+# Wait after a failed load, doubling per consecutive failure up to the maximum
+LOAD_RETRY_SECONDS = 1.0
+LOAD_RETRY_MAX_SECONDS = 60.0
+
+# session.info key for players inserted or renamed in a transaction, applied on commit
+_PENDING_KEY = "player_identity_pending"
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(name: str) -> str:
+    """
+    Lowercase, accent-free, punctuation-free form of a name.
+
+    Runs of initials are joined, so "M.S. Dhoni", "MS Dhoni" and "m s dhoni"
+    normalize the same.
+    """
+    text = name or ""
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    text = text.lower()
+    joined: List[str] = []
+    in_initials = False
+    for token in _NON_ALNUM.sub(" ", text).split():
+        if len(token) == 1 and in_initials:
+            joined[-1] += token
+        else:
+            joined.append(token)
+            in_initials = len(token) == 1
+    return " ".join(joined)
+
+
+def stable_player_id(name: str) -> str:
+    """Id for a name with no player row; the same in every process, unlike hash()"""
+    return hashlib.sha1(normalize_name(name).encode("utf-8")).hexdigest()[:16]
+
+
+def _aliases(key: str) -> Set[str]:
+    """Other spellings a normalized name is looked up by"""
+    tokens = key.split()
+    aliases = {" ".join(sorted(tokens))}
+    if len(tokens) > 1:
+        # "virat kohli" -> "v kohli", "kohli"
+        aliases.add(f"{tokens[0][0]} {tokens[-1]}")
+        aliases.add(tokens[-1])
+    aliases.discard(key)
+    return aliases
+
+
+def _ngrams(key: str) -> Set[str]:
+    padded = f" {key} "
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+class Resolution(NamedTuple):
+    player_id: str
+    name: str
+    score: float
+    method: str  # "exact", "alias" or "fuzzy"
+
+
+class PlayerIndex:
+    """
+    In-memory name -> player id index over the players table.
+
+    Names are looked up by their normalized form first, then by aliases
+    (token order, initial plus surname, surname alone, and any added with
+    add_alias), then by trigram similarity. An alias or fuzzy hit shared by
+    several players only resolves when the team narrows it to one. Lookups
+    are dictionary reads plus, for misspellings, a pass over the posting
+    lists of the query's trigrams, and results are cached until the index
+    changes.
+
+    ensure_loaded() keeps it in step with the table: players inserted
+    elsewhere are picked up every `refresh_interval` (by SQLite rowid above
+    the highest seen; other databases reload), everything is reloaded every
+    `reload_interval`, and a failed load is retried with backoff.
+    """
+
+    def __init__(self, threshold: float = PLAYER_MATCH_THRESHOLD,
+                 refresh_interval: float = PLAYER_INDEX_REFRESH_SECONDS,
+                 reload_interval: float = PLAYER_INDEX_RELOAD_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self.clock = clock
+        self._refreshing = False
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def clear(self) -> None:
+        self.loaded = False
+        self._names: Dict[str, str] = {}
+        self._teams: Dict[str, Optional[str]] = {}
+        self._exact: Dict[str, Set[str]] = defaultdict(set)
+        self._aliases: Dict[str, Set[str]] = defaultdict(set)
+        # Fuzzy matching: one entry per (player, normalized name)
+        self._entries: List[Tuple[str, int]] = []
+        self._entry_ids: Dict[Tuple[str, str], int] = {}
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._cache: Dict[Tuple[str, Optional[str]], Optional[Resolution]] = {}
+        # Highest players rowid loaded; None when the database has no rowid
+        self._high_water: Optional[int] = None
+        self._loaded_at = self._refreshed_at = 0.0
+        self._failures = 0
+        self._retry_at = 0.0
+
+    # --- Building ---
+    def add(self, player_id: str, name: str, team: Optional[str] = None) -> None:
+        """Add a player, or update a known one; a new name replaces the old one's lookups"""
+        player_id = str(player_id)
+        key = normalize_name(name)
+        if not key:
+            return
+        previous = self._names.get(player_id)
+        if previous == name:
+            if self._teams.get(player_id) != team:
+                self._teams[player_id] = team
+                self._cache.clear()
+            return
+        if previous is not None:
+            self._discard_name(player_id, normalize_name(previous))
+        self._names[player_id] = name
+        self._teams[player_id] = team
+        self._exact[key].add(player_id)
+        for alias in _aliases(key):
+            self._aliases[alias].add(player_id)
+        self._add_entry(player_id, key)
+        self._cache.clear()
+
+    def add_many(self, players: Iterable[Tuple[str, str, Optional[str]]]) -> int:
+        added = 0
+        for player_id, name, team in players:
+            self.add(player_id, name, team)
+            added += 1
+        return added
+
+    def add_alias(self, alias: str, player_id: str) -> None:
+        """An extra spelling for a known player, e.g. a nickname"""
+        key = normalize_name(alias)
+        if key:
+            self._aliases[key].add(str(player_id))
+            self._add_entry(str(player_id), key)
+            self._cache.clear()
+
+    def _add_entry(self, player_id: str, key: str) -> None:
+        if (player_id, key) in self._entry_ids:
+            return
+        grams = _ngrams(key)
+        entry = len(self._entries)
+        self._entries.append((player_id, len(grams)))
+        self._entry_ids[(player_id, key)] = entry
+        for gram in grams:
+            self._postings[gram].append(entry)
+
+    def _discard_name(self, player_id: str, key: str) -> None:
+        """Drop the exact, alias and trigram lookups a player got from a former name"""
+        for table, lookup in [(self._exact, key), *((self._aliases, alias) for alias in _aliases(key))]:
+            ids = table.get(lookup)
+            if ids is not None:
+                ids.discard(player_id)
+                if not ids:
+                    del table[lookup]
+        entry = self._entry_ids.pop((player_id, key), None)
+        if entry is not None:
+            # The entry's slot stays, unreachable, so other entries keep their numbers
+            for gram in _ngrams(key):
+                postings = self._postings[gram]
+                postings.remove(entry)
+                if not postings:
+                    del self._postings[gram]
+
+    async def load(self, session: AsyncSession) -> int:
+        """Rebuild the index from the players table"""
+        rowid = _rowid_column(session)
+        columns = [Player.id, Player.name, Player.team] + ([rowid] if rowid is not None else [])
+        rows = (await session.execute(select(*columns))).all()
+        self.clear()
+        self.add_many(row[:3] for row in rows)
+        if rowid is not None:
+            self._high_water = max((row[3] for row in rows), default=0)
+        self.loaded = True
+        self._loaded_at = self._refreshed_at = self.clock()
+        logger.info("Player index loaded with %d players", len(self))
+        return len(self)
+
+    async def refresh(self, session: AsyncSession) -> int:
+        """Add players inserted since the last load or refresh; reloads where there is no rowid"""
+        rowid = _rowid_column(session)
+        if rowid is None or self._high_water is None:
+            return await self.load(session)
+        rows = (await session.execute(
+            select(Player.id, Player.name, Player.team, rowid).where(rowid > self._high_water).order_by(rowid)
+        )).all()
+        self.add_many(row[:3] for row in rows)
+        if rows:
+            self._high_water = rows[-1][3]
+            logger.info("Player index picked up %d new players", len(rows))
+        self._refreshed_at = self.clock()
+        return len(rows)
+
+    async def ensure_loaded(self, session_factory=SessionLocal) -> None:
+        """
+        Load on first use, then refresh or reload when due.
+
+        Without a database the index stays empty and ids fall back to
+        stable_player_id until a retry succeeds. Callers never wait on a
+        refresh another caller has already started.
+        """
+        now = self.clock()
+        if self._refreshing or now < self._retry_at:
+            return
+        if self.loaded and now - self._refreshed_at < self.refresh_interval:
+            return
+        self._refreshing = True
+        try:
+            async with session_factory() as session:
+                if not self.loaded or now - self._loaded_at >= self.reload_interval:
+                    await self.load(session)
+                else:
+                    await self.refresh(session)
+            self._failures = 0
+        except Exception as e:
+            self._failures += 1
+            delay = min(LOAD_RETRY_SECONDS * 2 ** (self._failures - 1), LOAD_RETRY_MAX_SECONDS)
+            self._retry_at = self.clock() + delay
+            logger.warning("Could not load the player index, retrying in %.0fs: %s", delay, e)
+        finally:
+            self._refreshing = False
+
+    # --- Lookup ---
+    def resolve(self, name: str, team: Optional[str] = None) -> Optional[Resolution]:
+        cache_key = (name, team)
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+        key = normalize_name(name)
+        if not key:
+            return None
+
+        result = None
+        # A name given as initials, surname or in another order is looked up as
+        # such, but the query's own aliases are not: "rohit kohli" is not "kohli"
+        lookups = [(self._exact.get(key), "exact"), (self._aliases.get(key), "alias"),
+                   (self._aliases.get(" ".join(sorted(key.split()))), "alias")]
+        candidates = [(ids, method) for ids, method in lookups if ids]
+        if candidates:
+            ids, method = candidates[0]
+            ids = self._narrow(ids, team)
+            if len(ids) == 1:
+                player_id = next(iter(ids))
+                result = Resolution(player_id, self._names[player_id], 1.0, method)
+            # Otherwise ambiguous: a wrong id is worse than none, and a fuzzy
+            # match would only pick one of the same players at random
+        else:
+            result = self._fuzzy(key, team)
+
+        if len(self._cache) >= LOOKUP_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[cache_key] = result
+        return result
+
+    def resolve_id(self, name: str, team: Optional[str] = None) -> str:
+        """The matched player's id, or the name's stable id when nothing matches"""
+        result = self.resolve(name, team)
+        return result.player_id if result is not None else stable_player_id(name)
+
+    def _narrow(self, ids: Set[str], team: Optional[str]) -> Set[str]:
+        if len(ids) > 1 and team is not None:
+            on_team = {player_id for player_id in ids if self._teams.get(player_id) == team}
+            return on_team or ids
+        return ids
+
+    def _fuzzy(self, key: str, team: Optional[str]) -> Optional[Resolution]:
+        grams = _ngrams(key)
+        shared: Counter = Counter()
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings:
+                shared.update(postings)
+        # Dice = 2c / (q + s) with s >= c, so fewer shared grams than this can never reach the threshold
+        needed = self.threshold * len(grams) / (2 - self.threshold)
+
+        best: Dict[str, float] = {}
+        for entry, count in shared.items():
+            if count < needed:
+                continue
+            player_id, size = self._entries[entry]
+            score = 2 * count / (len(grams) + size)
+            if score >= self.threshold and score > best.get(player_id, 0.0):
+                best[player_id] = score
+        if team is not None and any(self._teams.get(p) == team for p in best):
+            best = {p: score for p, score in best.items() if self._teams.get(p) == team}
+        if not best:
+            return None
+
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < FUZZY_MARGIN:
+            return None
+        player_id, score = ranked[0]
+        return Resolution(player_id, self._names[player_id], round(score, 3), "fuzzy")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "players": len(self._names),
+            "aliases": len(self._aliases),
+            "ngrams": len(self._postings),
+            "cached_lookups": len(self._cache),
+        }
+
+
+def _rowid_column(session: AsyncSession) -> Optional[Any]:
+    """The players table's rowid on SQLite, which grows with every insert"""
+    if session.get_bind().dialect.name == "sqlite":
+        return literal_column("players.rowid")
+    return None
+
+
+player_index = PlayerIndex()
+
+
+# Players inserted or renamed through the ORM join the index once their transaction commits
+@event.listens_for(Player, "after_insert")
+def _player_inserted(mapper, connection, target: Player) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, []).append((target.id, target.name, target.team))
+
+
+@event.listens_for(Player, "after_update")
+def _player_updated(mapper, connection, target: Player) -> None:
+    attrs = inspect(target).attrs
+    if attrs.name.history.has_changes() or attrs.team.history.has_changes():
+        _player_inserted(mapper, connection, target)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_inserted_players(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and player_index.loaded:
+        player_index.add_many(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_inserted_players(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
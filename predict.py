@@ -1,13 +1,22 @@
 import pandas as pd
 import joblib
-from ml.train import get_features
+from ml.train import check_artifact, get_features
 
-model = joblib.load("ml/gl_model.pkl")
+loaded = joblib.load("ml/gl_model.pkl")
+if isinstance(loaded, dict):
+    # Raises ArtifactSchemaError at import if the model was trained on other features
+    artifact = check_artifact(loaded)
+    model, scaler = artifact['model'], artifact['scaler']
+else:
+    # Old format: a bare model, fitted on unscaled features
+    model, scaler = loaded, None
 
 def predict_top_players(players: list, match_id: str) -> list:
     stats_df = pd.read_csv(f"data/player_stats_{match_id}.csv")
     stats_df = stats_df[stats_df['player'].isin(players)]
     X = get_features(stats_df)
+    if scaler is not None:
+        X = scaler.transform(X)
     stats_df['score'] = model.predict_proba(X)[:, 1]
     ranked = stats_df.sort_values("score", ascending=False).reset_index(drop=True)
-    return ranked.to_dict(orient="records")
+    return ranked.to_dict(orient="records")
\ No newline at end of file
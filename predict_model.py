@@ -1,4 +1,5 @@
 from pathlib import Path
+from datetime import date
 import os
 import logging
 from itertools import combinations
@@ -6,12 +7,8 @@ from typing import List, Dict, Any, Optional
 from collections.abc import AsyncGenerator
 
 # Third-party imports
-import httpx
 from pydantic import BaseModel, Field, validator
 from fastapi import HTTPException
-import joblib
-import pandas as pd
-import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from tenacity import retry, stop_after_attempt, wait_exponential, RetryError
@@ -27,53 +24,65 @@ try:
 except ImportError as e:
     raise ImportError(f"Failed to import required modules. Make sure backend package is in PYTHONPATH: {e}")
 
+import config
+from feature_schema import REQUIRED_FEATURES, DEFAULT_FEATURES
+from feature_store import FEATURE_COLUMNS, feature_rows, get_feature_vectors
+from ball_events import ball_aggregator
+from prediction_writer import cache_predictions
+from memory import tracked
+from player_identity import player_index
+from startup import lazy_import
+
+# Imported on first use, timed into the startup report; PREWARM imports them before traffic
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
 # Load environment variables
 load_dotenv()
 
-# Configure logging once
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Handlers are installed once by logging_config.setup_logging(); messages
+# use %-style arguments so they are only formatted if the record is emitted
 logger = logging.getLogger(__name__)
 
-# Application settings and configuration
-try:
-    settings = get_settings()
-except Exception as e:
-    logger.error(f"Failed to load settings: {e}")
-    raise RuntimeError(f"Configuration error: {e}")
-
 # API Constants
 RETRY_ATTEMPTS = 3
 MIN_WAIT_SECONDS = 1
 MAX_WAIT_SECONDS = 10
 
-# Model Configuration
-REQUIRED_FEATURES = [
-    'bat_avg', 'bat_sr', 'bowl_avg', 'bowl_sr', 'death_overs_pct'
-]
-
-DEFAULT_FEATURES = {
-    'bat_avg': 25.0,
-    'bat_sr': 120.0,
-    'bowl_avg': 30.0,
-    'bowl_sr': 25.0,
-    'death_overs_pct': 0.3
-}
-
-# Validate ML model path
-ML_MODEL_PATH = settings.ML_MODEL_PATH
-if not Path(ML_MODEL_PATH).exists():
-    logger.error(f"ML model not found at {ML_MODEL_PATH}")
-    raise RuntimeError(f"ML model file missing: {ML_MODEL_PATH}")
-
-# Initialize Cricket API client
-try:
-    cricket_api = CricketAPI()
-except Exception as e:
-    logger.error(f"Failed to initialize Cricket API client: {e}")
-    raise RuntimeError(f"API client initialization error: {e}")
+# Settings, the model path and the Cricket API client are resolved on first
+# use (or by the startup warm-up), so importing this module has no side effects
+_settings = None
+_cricket_api = None
+
+def get_app_settings():
+    """Application settings, loaded once"""
+    global _settings
+    if _settings is None:
+        try:
+            _settings = get_settings()
+        except Exception as e:
+            logger.error("Failed to load settings: %s", e)
+            raise RuntimeError(f"Configuration error: {e}")
+    return _settings
+
+def get_ml_model_path() -> str:
+    """Validated ML model path"""
+    path = get_app_settings().ML_MODEL_PATH
+    if not Path(path).exists():
+        logger.error("ML model not found at %s", path)
+        raise RuntimeError(f"ML model file missing: {path}")
+    return path
+
+def get_cricket_api() -> CricketAPI:
+    """Shared Cricket API client, created on first use"""
+    global _cricket_api
+    if _cricket_api is None:
+        try:
+            _cricket_api = CricketAPI()
+        except Exception as e:
+            logger.error("Failed to initialize Cricket API client: %s", e)
+            raise RuntimeError(f"API client initialization error: {e}")
+    return _cricket_api
 
 # --- Custom Exceptions ---
 class MLModelError(Exception):
@@ -149,11 +158,16 @@ class MLModelWrapper:
     """Wrapper for ML model with enhanced error handling and validation"""
     _instance = None
     _model = None
+    _scaler = None
+    # Input columns: player stats, or feature-store vectors for models trained with train_from_store
+    _features = REQUIRED_FEATURES
     
     def __init__(self):
         """Initialize with model path validation"""
-        if not os.path.exists(ML_MODEL_PATH):
-            raise MLModelError(f"Model file not found: {ML_MODEL_PATH}")
+        try:
+            self.model_path = get_ml_model_path()
+        except RuntimeError as e:
+            raise MLModelError(f"Model file not found: {e}")
     
     @classmethod
     def get_instance(cls) -> 'MLModelWrapper':
@@ -162,7 +176,7 @@ class MLModelWrapper:
             try:
                 cls._instance = cls()
             except Exception as e:
-                logger.error(f"Failed to create MLModelWrapper instance: {e}")
+                logger.error("Failed to create MLModelWrapper instance: %s", e)
                 raise MLModelError(f"Model initialization failed: {e}")
         return cls._instance
     
@@ -170,7 +184,18 @@ class MLModelWrapper:
         """Load and validate ML model with comprehensive error handling"""
         if self._model is None:
             try:
-                self._model = joblib.load(ML_MODEL_PATH)
+                # Deferred: joblib pulls in a large part of scikit-learn's stack
+                import joblib
+                loaded = joblib.load(self.model_path)
+                
+                # Training saves model, scaler and feature schema as one artifact
+                if isinstance(loaded, dict) and 'model' in loaded:
+                    if loaded.get('features') not in (REQUIRED_FEATURES, FEATURE_COLUMNS):
+                        raise MLModelError(f"Model feature schema mismatch: {loaded.get('features')}")
+                    self._features = list(loaded['features'])
+                    self._scaler = loaded.get('scaler')
+                    loaded = loaded['model']
+                self._model = loaded
                 
                 # Validate model interface
                 required_methods = ['predict', 'fit']
@@ -183,21 +208,27 @@ class MLModelWrapper:
                 if not hasattr(self._model, 'feature_names_in_'):
                     logger.warning("Model doesn't have feature_names_in_ attribute")
                 
-                logger.info(f"ML model loaded and validated successfully from {ML_MODEL_PATH}")
+                logger.info("ML model loaded and validated successfully from %s", self.model_path)
             except (OSError, IOError) as e:
-                logger.error(f"IO error loading model: {e}")
+                logger.error("IO error loading model: %s", e)
                 raise MLModelError(f"Failed to read model file: {e}")
             except Exception as e:
-                logger.error(f"Unexpected error loading model: {e}")
+                logger.error("Unexpected error loading model: %s", e)
                 raise MLModelError(f"Model loading failed: {e}")
         return self._model
+
+    @property
+    def features(self) -> List[str]:
+        """Columns the loaded model expects, in order"""
+        self.load_model()
+        return self._features
     
     @retry(
         stop=stop_after_attempt(RETRY_ATTEMPTS),
         wait=wait_exponential(multiplier=MIN_WAIT_SECONDS, max=MAX_WAIT_SECONDS),
         reraise=True
     )
-    def predict(self, features: pd.DataFrame) -> np.ndarray:
+    def predict(self, features: "pd.DataFrame") -> "np.ndarray":
         """Make predictions with enhanced validation and retry logic"""
         try:
             model = self.load_model()
@@ -206,7 +237,7 @@ class MLModelWrapper:
             if not isinstance(features, pd.DataFrame):
                 raise ValueError("Features must be a pandas DataFrame")
             
-            missing_features = set(REQUIRED_FEATURES) - set(features.columns)
+            missing_features = set(self._features) - set(features.columns)
             if missing_features:
                 raise ValueError(f"Missing required features: {missing_features}")
             
@@ -218,10 +249,13 @@ class MLModelWrapper:
                 raise ValueError("Features contain negative values")
             
             # Ensure correct feature order and types
-            features = features[REQUIRED_FEATURES].astype(float)
+            features = features[self._features].astype(float)
+            
+            # Apply the scaler the model was trained with
+            model_input = self._scaler.transform(features) if self._scaler is not None else features
             
             # Make prediction
-            predictions = model.predict(features)
+            predictions = model.predict(model_input)
             
             # Validate predictions
             if not isinstance(predictions, np.ndarray):
@@ -233,22 +267,39 @@ class MLModelWrapper:
             return predictions
             
         except Exception as e:
-            logger.error(f"Prediction error: {e}")
+            logger.error("Prediction error: %s", e)
             raise PredictionError(f"Failed to make prediction: {str(e)}")
             
-    def validate_features(self, features: pd.DataFrame) -> None:
+    def validate_features(self, features: "pd.DataFrame") -> None:
         """Validate feature DataFrame"""
         if features.empty:
             raise ValidationError("Empty feature DataFrame")
             
-        for feature in REQUIRED_FEATURES:
+        for feature in self.features:
             if feature not in features.columns:
                 raise ValidationError(f"Missing feature: {feature}")
             
             if not pd.api.types.is_numeric_dtype(features[feature]):
                 raise ValidationError(f"Feature {feature} must be numeric")
 
+async def load_store_features(player_ids: List[str], as_of: date,
+                              session: Optional[AsyncSession] = None) -> "pd.DataFrame":
+    """Point-in-time feature-store vectors (matches before `as_of`), one row per player"""
+    if session is not None:
+        vectors = await get_feature_vectors(session, player_ids, as_of)
+    else:
+        async with AsyncSessionLocal() as own_session:
+            vectors = await get_feature_vectors(own_session, player_ids, as_of)
+    return pd.DataFrame(feature_rows(vectors, player_ids), columns=FEATURE_COLUMNS)
+
+def _match_date(match_data: Dict[str, Any]) -> date:
+    try:
+        return date.fromisoformat(str(match_data.get('date'))[:10])
+    except ValueError:
+        return date.today()
+
 # --- Core Logic for Player Prediction ---
+@tracked()
 async def predict_top_players(
     match_id: str,
     combined_players: Optional[List[str]] = None,
@@ -277,9 +328,9 @@ async def predict_top_players(
         
     if combined_players is not None and not all(isinstance(p, str) for p in combined_players):
         raise ValidationError("combined_players must be a list of strings")
-    logger.info(f"Predicting top players for match_id: {match_id}. Total players in input: {len(combined_players)}")
+    logger.info("Predicting top players for match_id: %s. Total players in input: %s", match_id, len(combined_players))
 
-    logger.info(f"Starting prediction for match_id: {match_id}")
+    logger.info("Starting prediction for match_id: %s", match_id)
     
     if not match_id:
         raise ValueError("match_id cannot be empty")
@@ -289,19 +340,20 @@ async def predict_top_players(
         try:
             cached_predictions = await get_cached_predictions(match_id, session)
             if cached_predictions:
-                logger.info(f"Using cached predictions for match {match_id}")
+                logger.info("Using cached predictions for match %s", match_id)
                 return cached_predictions
         except Exception as e:
-            logger.warning(f"Failed to get cached predictions: {e}")
+            logger.warning("Failed to get cached predictions: %s", e)
 
     # Initialize ML model
     try:
         ml_model = MLModelWrapper.get_instance()
     except MLModelError as e:
-        logger.error(f"Failed to initialize ML model: {e}")
+        logger.error("Failed to initialize ML model: %s", e)
         raise PredictionError(f"Model initialization failed: {str(e)}")
     
     # 1. Fetch match data
+    import httpx
     async with httpx.AsyncClient(timeout=httpx.Timeout(30.0)) as client:
         try:
             response = await client.get(
@@ -318,11 +370,11 @@ async def predict_top_players(
                 raise ValidationError("No data in API response")
                 
         except httpx.TimeoutException as e:
-            logger.error(f"Timeout while fetching match data for {match_id}: {e}")
+            logger.error("Timeout while fetching match data for %s: %s", match_id, e)
             raise PredictionError("Cricket data service timeout. Please try again later.")
             
         except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP {e.response.status_code} error: {e.response.text}")
+            logger.error("HTTP %s error: %s", e.response.status_code, e.response.text)
             if e.response.status_code == 404:
                 raise ValidationError(f"Match {match_id} not found")
             elif e.response.status_code == 401:
@@ -331,7 +383,7 @@ async def predict_top_players(
                 raise PredictionError(f"Cricket data service error: {str(e)}")
                 
         except Exception as e:
-            logger.error(f"Error fetching match data: {e}")
+            logger.error("Error fetching match data: %s", e)
             raise PredictionError("Failed to fetch match data")
 
     async def process_player_data(player: Dict[str, Any], team_name: str) -> Optional[Dict[str, Any]]:
@@ -340,13 +392,16 @@ async def predict_top_players(
         if not player.get('id') or not player.get('name'):
             raise ValidationError(f"Missing required fields for player in team {team_name}")
 
+        # Prefer features computed from ingested ball-by-ball data
+        derived = ball_aggregator.observed_features(player.get('id'))
+
         # Create player with validated stats
         stats = PlayerStats(
-            bat_avg=float(player.get('batting_average', DEFAULT_FEATURES['bat_avg'])),
-            bat_sr=float(player.get('strike_rate', DEFAULT_FEATURES['bat_sr'])),
-            bowl_avg=float(player.get('bowling_average', DEFAULT_FEATURES['bowl_avg'])),
-            bowl_sr=float(player.get('bowling_strike_rate', DEFAULT_FEATURES['bowl_sr'])),
-            death_overs_pct=float(player.get('death_overs_percentage', DEFAULT_FEATURES['death_overs_pct']))
+            bat_avg=float(derived.get('bat_avg', player.get('batting_average', DEFAULT_FEATURES['bat_avg']))),
+            bat_sr=float(derived.get('bat_sr', player.get('strike_rate', DEFAULT_FEATURES['bat_sr']))),
+            bowl_avg=float(derived.get('bowl_avg', player.get('bowling_average', DEFAULT_FEATURES['bowl_avg']))),
+            bowl_sr=float(derived.get('bowl_sr', player.get('bowling_strike_rate', DEFAULT_FEATURES['bowl_sr']))),
+            death_overs_pct=float(derived.get('death_overs_pct', player.get('death_overs_percentage', DEFAULT_FEATURES['death_overs_pct'])))
         )
         
         return {
@@ -357,9 +412,9 @@ async def predict_top_players(
             'stats': stats
         }
     except (ValueError, TypeError) as e:
-        logger.warning(f"Error processing player {player.get('name', 'unknown')}: {e}")
+        logger.warning("Error processing player %s: %s", player.get('name', 'unknown'), e)
     except ValidationError as e:
-        logger.warning(f"Validation error for player {player.get('name', 'unknown')}: {e}")
+        logger.warning("Validation error for player %s: %s", player.get('name', 'unknown'), e)
     return None
 
 # Process match data and extract players
@@ -378,9 +433,10 @@ try:
         # Use fallback data if needed
         if not players_data and combined_players:
             logger.info("Using fallback player data")
+            await player_index.ensure_loaded()
             for name in combined_players:
                 players_data.append({
-                    'id': str(hash(name)),
+                    'id': player_index.resolve_id(name),
                     'name': name,
                     'team': 'Unknown',
                     'role': 'Unknown',
@@ -416,14 +472,15 @@ try:
                     'stats': stats
                 })
             except (ValueError, TypeError) as e:
-                logger.warning(f"Error processing player data: {e}")
+                logger.warning("Error processing player data: %s", e)
     
     # Use fallback data if needed
     if not players_data and combined_players:
         logger.warning("Using fallback player data")
+        await player_index.ensure_loaded()
         for name in combined_players:
             players_data.append({
-                'id': str(hash(name)),
+                'id': player_index.resolve_id(name),
                 'name': name,
                 'team': 'Unknown',
                 'role': 'Unknown',
@@ -440,19 +497,25 @@ try:
         # Prepare features and make predictions
         try:
             # Create features DataFrame
-            features_df = pd.DataFrame([
-                {
-                    'bat_avg': p['stats'].bat_avg,
-                    'bat_sr': p['stats'].bat_sr,
-                    'bowl_avg': p['stats'].bowl_avg,
-                    'bowl_sr': p['stats'].bowl_sr,
-                    'death_overs_pct': p['stats'].death_overs_pct
-                }
-                for p in players_data
-            ])
+            if ml_model.features == FEATURE_COLUMNS:
+                # Same point-in-time vectors the model was trained on
+                features_df = await load_store_features(
+                    [p['id'] for p in players_data], _match_date(match_data), session
+                )
+            else:
+                features_df = pd.DataFrame([
+                    {
+                        'bat_avg': p['stats'].bat_avg,
+                        'bat_sr': p['stats'].bat_sr,
+                        'bowl_avg': p['stats'].bowl_avg,
+                        'bowl_sr': p['stats'].bowl_sr,
+                        'death_overs_pct': p['stats'].death_overs_pct
+                    }
+                    for p in players_data
+                ])
 
             # Validate features before prediction
-            for feature in REQUIRED_FEATURES:
+            for feature in ml_model.features:
                 if feature not in features_df.columns:
                     raise ValidationError(f"Missing required feature: {feature}")
                 
@@ -469,7 +532,7 @@ try:
                 except MLModelError as e:
                     if attempt == RETRY_ATTEMPTS - 1:
                         raise PredictionError(f"All prediction attempts failed: {str(e)}")
-                    logger.warning(f"Prediction attempt {attempt + 1} failed, retrying...")
+                    logger.warning("Prediction attempt %s failed, retrying...", attempt + 1)
                     await asyncio.sleep(1)  # Short delay between retries
             
             # Create Player objects with predictions
@@ -487,7 +550,7 @@ try:
                     )
                     players.append(player)
                 except (ValueError, ValidationError) as e:
-                    logger.warning(f"Error creating player object for {player_data['name']}: {e}")
+                    logger.warning("Error creating player object for %s: %s", player_data['name'], e)
                     prediction_errors.append(f"Failed to process {player_data['name']}: {str(e)}")
             
             if not players:
@@ -501,22 +564,22 @@ try:
                 try:
                     await cache_predictions(match_id, players, session)
                 except Exception as e:
-                    logger.warning(f"Failed to cache predictions: {e}")
+                    logger.warning("Failed to cache predictions: %s", e)
             
-            logger.info(f"Successfully predicted performance for {len(players)} players")
+            logger.info("Successfully predicted performance for %s players", len(players))
             if prediction_errors:
-                logger.warning(f"Encountered {len(prediction_errors)} errors during prediction")
+                logger.warning("Encountered %s errors during prediction", len(prediction_errors))
             
             return players
             
         except ValidationError as e:
-            logger.error(f"Validation error during prediction: {e}")
+            logger.error("Validation error during prediction: %s", e)
             raise ValidationError(f"Invalid data for prediction: {str(e)}")
         except MLModelError as e:
-            logger.error(f"ML model error during prediction: {e}")
+            logger.error("ML model error during prediction: %s", e)
             raise PredictionError(f"Model prediction failed: {str(e)}")
         except Exception as e:
-            logger.error(f"Unexpected error during prediction: {e}")
+            logger.error("Unexpected error during prediction: %s", e)
             raise PredictionError(f"Prediction failed: {str(e)}")
 
 # --- Team Generation Logic ---
@@ -545,6 +608,7 @@ def validate_team_input(
     if unknown_team1 or unknown_team2:
         raise ValueError(f"Unknown players found: {unknown_team1 | unknown_team2}")
 
+@tracked()
 def generate_team(
     ranked_players: List[Player],
     winner_team: str,
@@ -558,13 +622,13 @@ def generate_team(
     Generates fantasy teams based on ranked players, winner prediction, and team constraints.
     Includes input validation and enhanced error handling.
     """
-    logger.info(f"Generating teams with {len(ranked_players)} ranked players.")
+    logger.info("Generating teams with %s ranked players.", len(ranked_players))
     
     try:
         validate_team_input(ranked_players, winner_team, team1, team2, team1_players, team2_players)
 
     if len(ranked_players) < 11:
-        logger.warning(f"Not enough ranked players ({len(ranked_players)}) to form a full 11-player team. Returning empty list.")
+        logger.warning("Not enough ranked players (%s) to form a full 11-player team. Returning empty list.", len(ranked_players))
         return [] 
     
     top_11_players = ranked_players[:11]
@@ -586,17 +650,18 @@ def generate_team(
             players=top_11_player_names 
         ))
         if len(teams) >= max_combinations:
-            logger.info(f"Reached maximum of {max_combinations} teams. Stopping generation.")
+            logger.info("Reached maximum of %s teams. Stopping generation.", max_combinations)
             break
 
-    logger.info(f"Generated {len(teams)} teams.")
+    logger.info("Generated %s teams.", len(teams))
     return teams
 
 # --- Dummy Export CSV (remains largely the same) ---
+@tracked()
 def export_team_csv(teams: List[Team], match_id: str):
     """
     Exports the generated teams to a CSV file.
     """
-    logger.info(f"Exporting {len(teams)} teams for match {match_id} to CSV (dummy function).")
+    logger.info("Exporting %s teams for match %s to CSV (dummy function).", len(teams), match_id)
     pass
 
@@ -0,0 +1,151 @@
+# prediction_writer.py
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from database import Prediction, SessionLocal
+from response_cache import resource_versions
+from live_updates import publish_predictions
+
+logger = logging.getLogger(__name__)
+
+# Flush when this many rows are buffered, or when the oldest row is this old
+BATCH_SIZE = 500
+FLUSH_INTERVAL_SECONDS = 1.0
+
+# Upper bound on buffered rows; producers wait once it is reached
+MAX_PENDING_ROWS = 20_000
+
+FLUSH_RETRIES = 3
+
+
+class PredictionWriteQueue:
+    """
+    Write-behind buffer for rows of the `predictions` table.
+
+    Requests hand rows to the queue and return immediately; a background task
+    groups them into one transaction per batch. The queue is bounded, so a
+    stalled disk slows producers down instead of growing memory without limit.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        max_pending: int = MAX_PENDING_ROWS,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"enqueued": 0, "written": 0, "batches": 0, "failed": 0}
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._run(), name="prediction-writer")
+        logger.info("Prediction write-behind queue started")
+
+    async def stop(self) -> None:
+        """Flush everything still buffered and stop the background task"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info(f"Prediction write-behind queue stopped: {self.stats}")
+
+    async def enqueue(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Buffer rows for writing; only waits when the queue is full"""
+        if self._task is None:
+            raise RuntimeError("Prediction write queue is not running")
+        count = 0
+        for row in rows:
+            await self._queue.put(row)
+            count += 1
+        self.stats["enqueued"] += count
+        return count
+
+    async def _next_batch(self) -> Tuple[List[Dict[str, Any]], bool]:
+        batch: List[Dict[str, Any]] = []
+        item = await self._queue.get()
+        if item is None:
+            return batch, True
+        batch.append(item)
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        for attempt in range(1, FLUSH_RETRIES + 1):
+            try:
+                async with self.session_factory() as session:
+                    async with session.begin():
+                        await session.execute(insert(Prediction), batch)
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+                return
+            except Exception as e:
+                logger.warning(f"Prediction flush attempt {attempt} failed for {len(batch)} rows: {e}")
+                await asyncio.sleep(0.1 * attempt)
+        self.stats["failed"] += len(batch)
+        logger.error(f"Dropped {len(batch)} prediction rows after {FLUSH_RETRIES} failed flushes")
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._next_batch()
+            # Drain what is already buffered before shutting down
+            if stopping:
+                while not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is not None:
+                        batch.append(item)
+            for start in range(0, len(batch), self.batch_size):
+                await self._flush(batch[start:start + self.batch_size])
+
+
+prediction_writer = PredictionWriteQueue()
+
+
+async def cache_predictions(match_id: str, players: List[Any], session=None) -> int:
+    """Queue predicted scores for persistence without waiting for the commit"""
+    rows = [
+        {
+            "player_id": str(player.id),
+            "predicted_score": float(player.fantasy_points),
+            "ownership_percent": None,
+            "mindset": None,
+        }
+        for player in players
+    ]
+    count = await prediction_writer.enqueue(rows)
+    # Cached prediction responses for this match are now stale
+    await resource_versions.bump_async(f"predictions:{match_id}")
+    # Push the changed players to live viewers of this match
+    publish_predictions(match_id, players)
+    logger.debug(f"Queued {count} predictions for match {match_id}")
+    return count
@@ -0,0 +1,322 @@
+# profiling.py
+
+import asyncio
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+logger = logging.getLogger(__name__)
+
+# Shared secret for the X-Profile trigger header and the admin endpoints;
+# profiling is disabled entirely when it is not set
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Finished profiles kept in memory, oldest dropped first
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+MAX_STACK_DEPTH = 128
+
+PROFILE_HEADER = b"x-profile"
+REQUEST_ID_HEADER = b"x-request-id"
+
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+
+
+def _frame_label(code) -> str:
+    # ';' separates frames in the collapsed format
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _thread_stack(frame) -> List[str]:
+    """Labels of a running thread's frames, outermost first, without the event loop machinery"""
+    frames = []
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        # Everything above Handle._run is the loop itself
+        if code.co_name == "_run" and code.co_filename.endswith(os.path.join("asyncio", "events.py")):
+            break
+        frames.append(_frame_label(code))
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def _await_stack(task: asyncio.Task) -> List[str]:
+    """Labels of a suspended task's coroutine chain, ending in what it waits on"""
+    frames = []
+    awaitable: Any = task.get_coro()
+    while awaitable is not None and len(frames) < MAX_STACK_DEPTH:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            # A Future or other awaitable at the bottom of the chain
+            frames.append(f"[await {type(awaitable).__name__}]")
+            break
+        frames.append(_frame_label(frame.f_code))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return frames
+
+
+class RequestProfile:
+    """Samples collected for one request, as collapsed stacks"""
+
+    def __init__(self, profile_id: str, method: str, path: str, loop: asyncio.AbstractEventLoop,
+                 label: Optional[str] = None):
+        self.profile_id = profile_id
+        # The client's X-Request-ID, for finding the profile; never used as a key
+        self.label = label
+        self.method = method
+        self.path = path
+        self.loop = loop
+        self.thread_id = threading.get_ident()
+        # Tasks the request runs in; appended from the loop, read by the sampler
+        self.tasks: List[asyncio.Task] = []
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.status: Optional[int] = None
+        self.started_at = datetime.utcnow()
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+
+    def sample(self, frames: Dict[int, Any]) -> None:
+        root = f"{self.method} {self.path}"
+        tasks = [task for task in list(self.tasks) if not task.done()]
+        if not tasks:
+            return
+        try:
+            running = asyncio.current_task(self.loop)
+        except RuntimeError:
+            running = None
+        if running is not None and running in tasks:
+            stack = ["[running]"] + _thread_stack(frames.get(self.thread_id))
+        else:
+            # Suspended: charge the time to whatever the innermost task awaits
+            stack = ["[waiting]"] + _await_stack(tasks[-1])
+        self.stacks[";".join([root] + stack)] += 1
+        self.samples += 1
+
+    def finish(self, status: Optional[int]) -> None:
+        self.status = status
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 2)
+
+    def collapsed(self) -> str:
+        """One "frame;frame;frame count" line per stack, for flamegraph.pl or speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top: int = 0) -> Dict[str, Any]:
+        result = {
+            "profile_id": self.profile_id,
+            "label": self.label,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration_ms,
+            "samples": self.samples,
+            "interval_ms": PROFILE_INTERVAL_MS,
+        }
+        if top:
+            result["top_stacks"] = [
+                {"stack": stack.split(";"), "samples": count} for stack, count in self.stacks.most_common(top)
+            ]
+        return result
+
+
+class _Sampler(threading.Thread):
+    """Wall-clock sampler for one request; stops when the request finishes"""
+
+    def __init__(self, profile: RequestProfile, interval: float):
+        super().__init__(name=f"profiler-{profile.profile_id}", daemon=True)
+        self.profile = profile
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            try:
+                self.profile.sample(sys._current_frames())
+            except Exception as e:
+                logger.debug("Profiler sample failed: %s", e)
+
+
+class Profiler:
+    """
+    Opt-in sampling profiler for single requests.
+
+    A request is profiled when it carries the X-Profile header with the
+    profiling token, or when an admin has armed the profiler for the next
+    requests on a path. While it runs, a thread samples the request every
+    few milliseconds: the live stack when one of its tasks is on the event
+    loop, the coroutine await chain when it is suspended, so time spent
+    waiting on the database or an executor shows up as well. Requests that
+    are not profiled only pay for a header lookup.
+
+    Profiles are stored under an id the server generates; a client's
+    X-Request-ID is only kept as a label, so one request can never overwrite
+    or claim another's profile.
+    """
+
+    def __init__(self, keep: int = PROFILE_KEEP, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.keep = keep
+        self.interval = interval_ms / 1000
+        self.profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._armed_prefix = "/"
+        self._armed = 0
+        self._lock = threading.Lock()
+
+    @property
+    def armed(self) -> int:
+        return self._armed
+
+    def arm(self, path_prefix: str = "/", count: int = 1) -> None:
+        """Profile the next `count` requests whose path starts with `path_prefix`"""
+        with self._lock:
+            self._armed_prefix = path_prefix
+            self._armed = max(0, count)
+
+    def _take_armed(self, path: str) -> bool:
+        with self._lock:
+            if self._armed and path.startswith(self._armed_prefix):
+                self._armed -= 1
+                return True
+            return False
+
+    def install(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """
+        Put the profiling task factory on the loop, once, from the startup hook.
+
+        Tasks started inside a profiled request (call_next, gather, ...) join
+        its profile through the factory. Once installed, every task the loop
+        creates pays for one extra Python call and a ContextVar lookup, well
+        under a microsecond, so nothing is installed while profiling is
+        disabled. start() installs it on first use if the hook did not.
+        """
+        if PROFILE_TOKEN:
+            self._install_task_factory(loop or asyncio.get_running_loop())
+
+    def _install_task_factory(self, loop: asyncio.AbstractEventLoop) -> None:
+        if getattr(loop.get_task_factory(), "profiler", None) is self:
+            return
+        previous = loop.get_task_factory()
+
+        def factory(loop, coro, **kwargs):
+            task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+            profile = _active_profile.get()
+            if profile is not None:
+                profile.tasks.append(task)
+            return task
+
+        factory.profiler = self
+        loop.set_task_factory(factory)
+
+    def start(self, method: str, path: str, label: Optional[str] = None) -> RequestProfile:
+        loop = asyncio.get_running_loop()
+        self._install_task_factory(loop)
+        profile = RequestProfile(uuid.uuid4().hex, method, path, loop, label)
+        profile.tasks.append(asyncio.current_task())
+        return profile
+
+    def store(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self.profiles[profile.profile_id] = profile
+            while len(self.profiles) > self.keep:
+                self.profiles.popitem(last=False)
+        logger.info("Profiled %s %s in %sms (%d samples), id %s, label %s", profile.method, profile.path,
+                    profile.duration_ms, profile.samples, profile.profile_id, profile.label)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return self.profiles.get(profile_id)
+
+
+profiler = Profiler()
+
+
+def _header_triggers(headers: Dict[bytes, bytes]) -> bool:
+    value = headers.get(PROFILE_HEADER)
+    return bool(PROFILE_TOKEN and value) and hmac.compare_digest(value, PROFILE_TOKEN.encode())
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware; add it last so the profile covers the other middleware"""
+
+    def __init__(self, app, profiler: Profiler = profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (PROFILE_TOKEN or self.profiler.armed):
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if not (_header_triggers(headers) or self.profiler._take_armed(scope["path"])):
+            return await self.app(scope, receive, send)
+
+        label = headers.get(REQUEST_ID_HEADER, b"").decode("latin-1")[:128] or None
+        profile = self.profiler.start(scope["method"], scope["path"], label)
+        status = None
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.profile_id.encode())]
+            await send(message)
+
+        token = _active_profile.set(profile)
+        sampler = _Sampler(profile, self.profiler.interval)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stopped.set()
+            _active_profile.reset(token)
+            profile.finish(status)
+            self.profiler.store(profile)
+
+
+router = APIRouter()
+
+
+def _require_admin(x_admin_token: Optional[str]) -> None:
+    if not PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, PROFILE_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Stored request profiles, newest first"""
+    _require_admin(x_admin_token)
+    return {
+        "armed": profiler.armed,
+        "profiles": [profile.summary() for profile in reversed(list(profiler.profiles.values()))],
+    }
+
+
+@router.post("/arm")
+async def arm_profiler(path_prefix: str = "/", count: int = 1, x_admin_token: Optional[str] = Header(None)):
+    """Profile the next `count` requests under `path_prefix`"""
+    _require_admin(x_admin_token)
+    profiler.arm(path_prefix, min(count, PROFILE_KEEP))
+    return {"armed": profiler.armed, "path_prefix": path_prefix}
+
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str, format: str = "collapsed", x_admin_token: Optional[str] = Header(None)):
+    """Collapsed stacks of one request (flamegraph input), or a JSON summary with format=json"""
+    _require_admin(x_admin_token)
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "json":
+        return profile.summary(top=20)
+    return PlainTextResponse(profile.collapsed())
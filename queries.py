@@ -0,0 +1,168 @@
+# queries.py
+
+import base64
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from database import Match, MatchPerformance, Player
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+RECENT_PERFORMANCES = 5
+
+# Columns returned by list views; full ORM objects are never loaded for them
+MATCH_LIST_COLUMNS = (Match.id, Match.team1, Match.team2, Match.date, Match.winner)
+
+
+def encode_cursor(match_date: date, match_id: str) -> str:
+    raw = f"{match_date.isoformat()}|{match_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        match_date, match_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return date.fromisoformat(match_date), match_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def list_matches(
+    session: AsyncSession,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+    team: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    One page of matches ordered by (date, id), using keyset pagination.
+
+    The cursor is the (date, id) of the last row served, so each page is an
+    index range scan no matter how deep into the history it is.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    key = tuple_(Match.date, Match.id)
+
+    query = select(*MATCH_LIST_COLUMNS)
+    if cursor:
+        after = tuple_(*decode_cursor(cursor))
+        query = query.where(key < after if descending else key > after)
+    if team:
+        query = query.where((Match.team1 == team) | (Match.team2 == team))
+    if descending:
+        query = query.order_by(Match.date.desc(), Match.id.desc())
+    else:
+        query = query.order_by(Match.date, Match.id)
+
+    # Fetch one extra row to know whether another page exists
+    rows = (await session.execute(query.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [dict(row._mapping) for row in rows]
+    next_cursor = encode_cursor(rows[-1].date, rows[-1].id) if has_more else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def count_matches(session: AsyncSession) -> int:
+    return (await session.execute(select(func.count()).select_from(Match))).scalar_one()
+
+
+async def get_match_squad(
+    session: AsyncSession,
+    match_id: str,
+    recent: int = RECENT_PERFORMANCES,
+) -> Optional[Dict[str, Any]]:
+    """
+    A match with both squads and each player's most recent performances before it.
+
+    Everything comes back from a single query. Each player's recent
+    performances are a LIMITed range scan of ix_match_performances_player_date,
+    (player_id, match_date, match_id), ending at the match date, so a squad
+    reads about squad size x `recent` index entries however long the history
+    is. Returns None if the match does not exist.
+    """
+    target = aliased(Match, name="target")
+    prior_perf = aliased(MatchPerformance, name="prior_perf")
+
+    # match_date is denormalized from matches, so ordering needs no join
+    recent_ids = (
+        select(prior_perf.id)
+        .where(prior_perf.player_id == Player.id, prior_perf.match_date < target.date)
+        .order_by(prior_perf.match_date.desc(), prior_perf.match_id.desc())
+        .limit(recent)
+        .correlate(Player, target)
+    )
+
+    query = (
+        select(
+            target.id.label("match_id"),
+            target.team1,
+            target.team2,
+            target.date.label("match_date"),
+            Player.id.label("player_id"),
+            Player.name,
+            Player.team,
+            Player.batting_average,
+            Player.bowling_average,
+            MatchPerformance.match_id.label("perf_match_id"),
+            MatchPerformance.match_date.label("perf_date"),
+            MatchPerformance.runs_scored,
+            MatchPerformance.wickets_taken,
+            MatchPerformance.catches,
+        )
+        .select_from(target)
+        .outerjoin(Player, Player.team.in_([target.team1, target.team2]))
+        # Joined by primary key only: the subquery runs once per player
+        .outerjoin(MatchPerformance, MatchPerformance.id.in_(recent_ids))
+        .where(target.id == match_id)
+        .order_by(Player.team, Player.name, MatchPerformance.match_date.desc(), MatchPerformance.match_id.desc())
+    )
+
+    rows = (await session.execute(query)).all()
+    if not rows:
+        return None
+
+    first = rows[0]
+    squads: Dict[str, List[Dict[str, Any]]] = {first.team1: [], first.team2: []}
+    players: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        if row.player_id is None:
+            continue
+        player = players.get(row.player_id)
+        if player is None:
+            player = players[row.player_id] = {
+                "id": row.player_id,
+                "name": row.name,
+                "team": row.team,
+                "batting_average": row.batting_average,
+                "bowling_average": row.bowling_average,
+                "recent": [],
+            }
+            squads.setdefault(row.team, []).append(player)
+        if row.perf_match_id is not None:
+            player["recent"].append({
+                "match_id": row.perf_match_id,
+                "date": row.perf_date,
+                "runs_scored": row.runs_scored,
+                "wickets_taken": row.wickets_taken,
+                "catches": row.catches,
+            })
+
+    return {
+        "match": {
+            "id": first.match_id,
+            "team1": first.team1,
+            "team2": first.team2,
+            "date": first.match_date,
+        },
+        "squads": squads,
+    }
@@ -0,0 +1,263 @@
+# rate_limit.py
+
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+DEFAULT_WINDOW = float(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "60"))
+# "memory" limits each worker on its own; "sqlite" shares one quota between workers
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", "rate_limits.db")
+EVICT_INTERVAL = 60.0
+
+
+class RateLimit(NamedTuple):
+    limit: int
+    window: float = DEFAULT_WINDOW
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+
+
+def _estimate(previous: int, current: int, elapsed: float, window: float) -> float:
+    """
+    Two-window approximation of a sliding window.
+
+    The previous window's count is weighted by how much of it still overlaps
+    the sliding window ending now.
+    """
+    return previous * max(0.0, 1.0 - elapsed / window) + current
+
+
+def _decide(previous: int, current: int, elapsed: float, rule: RateLimit) -> Decision:
+    estimate = _estimate(previous, current, elapsed, rule.window)
+    if estimate + 1 > rule.limit:
+        # Time until enough of the previous window has slid out
+        if previous and current < rule.limit:
+            needed = (estimate + 1 - rule.limit) / previous * rule.window
+            retry_after = min(needed, rule.window - elapsed)
+        else:
+            retry_after = rule.window - elapsed
+        return Decision(False, rule.limit, 0, max(retry_after, 0.0))
+    return Decision(True, rule.limit, max(int(rule.limit - estimate - 1), 0), 0.0)
+
+
+class RouteLimits:
+    """Per-route limits, matched by the longest path prefix"""
+
+    def __init__(self, default: RateLimit, routes: Optional[Dict[str, RateLimit]] = None):
+        self.default = default
+        self.routes = sorted((routes or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def resolve(self, path: str) -> Tuple[str, RateLimit]:
+        for prefix, rule in self.routes:
+            if path.startswith(prefix):
+                return prefix, rule
+        return "*", self.default
+
+    @classmethod
+    def from_env(cls, value: Optional[str] = None) -> "RouteLimits":
+        """Parse RATE_LIMIT_ROUTES, e.g. "/api/v1/predictions=30,/api/v1/stats=120/60" """
+        value = os.getenv("RATE_LIMIT_ROUTES", "") if value is None else value
+        routes = {}
+        for entry in filter(None, (part.strip() for part in value.split(","))):
+            prefix, _, spec = entry.partition("=")
+            limit, _, window = spec.partition("/")
+            routes[prefix.strip()] = RateLimit(int(limit), float(window) if window else DEFAULT_WINDOW)
+        return cls(RateLimit(DEFAULT_LIMIT), routes)
+
+
+class _Counter:
+    __slots__ = ("window_start", "current", "previous")
+
+    def __init__(self, window_start: float):
+        self.window_start = window_start
+        self.current = 0
+        self.previous = 0
+
+
+class MemoryRateLimiter:
+    """
+    Per-process limiter with a fixed amount of state per (client, route).
+
+    Each key holds two counters on monotonic time, so a check is O(1) no matter
+    how many requests the client has made. Keys idle for more than two windows
+    carry no information and are evicted periodically.
+    """
+
+    def __init__(self, limits: RouteLimits, clock: Callable[[], float] = time.monotonic,
+                 evict_interval: float = EVICT_INTERVAL):
+        self.limits = limits
+        self.clock = clock
+        self.evict_interval = evict_interval
+        self._counters: Dict[Tuple[str, str], _Counter] = {}
+        self._windows: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._last_evict = clock()
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def hit(self, client: str, path: str = "/") -> Decision:
+        route, rule = self.limits.resolve(path)
+        key = (client, route)
+        now = self.clock()
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = self._counters[key] = _Counter(now)
+                self._windows[key] = rule.window
+            else:
+                self._roll(counter, now, rule.window)
+
+            decision = _decide(counter.previous, counter.current, now - counter.window_start, rule)
+            if decision.allowed:
+                counter.current += 1
+
+            if now - self._last_evict >= self.evict_interval:
+                self._evict(now)
+        return decision
+
+    async def check(self, client: str, path: str = "/") -> Decision:
+        """hit() for async callers; in-memory counters never block"""
+        return self.hit(client, path)
+
+    def is_rate_limited(self, client: str, path: str = "/") -> bool:
+        return not self.hit(client, path).allowed
+
+    @staticmethod
+    def _roll(counter: _Counter, now: float, window: float) -> None:
+        elapsed_windows = int((now - counter.window_start) // window)
+        if elapsed_windows <= 0:
+            return
+        counter.previous = counter.current if elapsed_windows == 1 else 0
+        counter.current = 0
+        counter.window_start += elapsed_windows * window
+
+    def _evict(self, now: float) -> None:
+        idle = [key for key, counter in self._counters.items()
+                if now - counter.window_start >= 2 * self._windows[key]]
+        for key in idle:
+            del self._counters[key]
+            del self._windows[key]
+        self._last_evict = now
+        if idle:
+            logger.debug(f"Evicted {len(idle)} idle rate limit entries")
+
+
+class SQLiteRateLimiter:
+    """
+    Limiter whose counters live in a SQLite file shared by every worker.
+
+    Windows are aligned to wall-clock time so all processes agree on them. Each
+    check is one short IMMEDIATE transaction on a single primary-key row.
+    """
+
+    def __init__(self, limits: RouteLimits, path: str = RATE_LIMIT_DB,
+                 clock: Callable[[], float] = time.time, evict_interval: float = EVICT_INTERVAL):
+        self.limits = limits
+        self.path = path
+        self.clock = clock
+        self.evict_interval = evict_interval
+        self._local = threading.local()
+        self._last_evict = clock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                " client TEXT NOT NULL, route TEXT NOT NULL, window_index INTEGER NOT NULL,"
+                " window REAL NOT NULL, current INTEGER NOT NULL, previous INTEGER NOT NULL,"
+                " PRIMARY KEY (client, route)) WITHOUT ROWID"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, client: str, path: str = "/") -> Decision:
+        route, rule = self.limits.resolve(path)
+        now = self.clock()
+        index = math.floor(now / rule.window)
+        elapsed = now - index * rule.window
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT window_index, current, previous FROM rate_limits WHERE client = ? AND route = ?",
+                (client, route),
+            ).fetchone()
+            previous, current = 0, 0
+            if row is not None:
+                stored_index, stored_current, stored_previous = row
+                if stored_index == index:
+                    previous, current = stored_previous, stored_current
+                elif stored_index == index - 1:
+                    previous = stored_current
+
+            decision = _decide(previous, current, elapsed, rule)
+            if decision.allowed:
+                current += 1
+            conn.execute(
+                "INSERT INTO rate_limits (client, route, window_index, window, current, previous) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (client, route) DO UPDATE SET window_index = excluded.window_index, "
+                "window = excluded.window, current = excluded.current, previous = excluded.previous",
+                (client, route, index, rule.window, current, previous),
+            )
+            if now - self._last_evict >= self.evict_interval:
+                self._evict(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return decision
+
+    async def check(self, client: str, path: str = "/") -> Decision:
+        """
+        hit() for async callers, run in a worker thread.
+
+        hit() can wait up to the busy timeout for another worker's write lock,
+        which must not stall the event loop. Each thread keeps its own connection.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.hit, client, path)
+
+    def is_rate_limited(self, client: str, path: str = "/") -> bool:
+        return not self.hit(client, path).allowed
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM rate_limits WHERE (window_index + 2) * window <= ?", (now,))
+        self._last_evict = now
+
+
+def build_rate_limiter(backend: str = RATE_LIMIT_BACKEND, limits: Optional[RouteLimits] = None):
+    limits = limits or RouteLimits.from_env()
+    if backend == "sqlite":
+        return SQLiteRateLimiter(limits)
+    if backend != "memory":
+        raise ValueError(f"Unknown rate limit backend: {backend}")
+    return MemoryRateLimiter(limits)
+
+
+def rate_limit_headers(decision: Decision) -> Dict[str, str]:
+    headers = {"X-RateLimit-Limit": str(decision.limit), "X-RateLimit-Remaining": str(decision.remaining)}
+    if not decision.allowed:
+        headers["Retry-After"] = str(max(1, math.ceil(decision.retry_after)))
+    return headers
+
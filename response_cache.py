@@ -0,0 +1,359 @@
+# response_cache.py
+
+import asyncio
+import hashlib
+import inspect
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from config import API_V1_PREFIX, CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Serialized bodies kept in memory, bounded by total size
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+MAX_BODY_BYTES = 4 * 1024 * 1024
+
+# Responses that are produced incrementally are never buffered
+STREAMING_TYPES = (b"text/event-stream", b"application/x-ndjson")
+
+# SQLite file for version counters shared by every worker; unset keeps them in this process
+RESOURCE_VERSIONS_DB = os.getenv("RESOURCE_VERSIONS_DB") or None
+
+# Request headers that identify the caller; cached responses are never shared between callers
+IDENTITY_HEADERS = (b"authorization", b"x-api-key", b"cookie")
+
+
+class ResourceVersions:
+    """
+    Version counters for data behind cached responses.
+
+    Writers call bump() when the data changes; the middleware folds the
+    version into the ETag and the cache key, so a repeat request can be
+    answered without running the endpoint.
+
+    With a path the counters live in a SQLite file shared by every worker, so
+    a bump in one process invalidates what the others serve: get() is a
+    primary-key read, which WAL mode never blocks, and bump() a single-row
+    upsert. Without one they are per process, for tests and single-worker runs.
+    The epoch is stored with the counters, so recreating the file never
+    revives old ETags.
+
+    Shared counters can wait on the file's busy timeout, so code on the event
+    loop uses get_async() and bump_async(), which run the query in the default
+    executor, or bump_later() where it cannot await.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Per-process counters get a fresh epoch; shared ones read theirs from the file
+        self._epoch = None if path else f"{time.time_ns():x}"
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS resource_versions ("
+                         " name TEXT PRIMARY KEY, version INTEGER NOT NULL) WITHOUT ROWID")
+            conn.execute("INSERT OR IGNORE INTO resource_versions (name, version) VALUES ('', ?)", (time.time_ns(),))
+            self._local.conn = conn
+        if self._epoch is None:
+            epoch = conn.execute("SELECT version FROM resource_versions WHERE name = ''").fetchone()[0]
+            self._epoch = f"{epoch:x}"
+        return conn
+
+    def bump(self, name: str) -> int:
+        if self.path is None:
+            with self._lock:
+                version = self._versions.get(name, 0) + 1
+                self._versions[name] = version
+                return version
+        return self._connect().execute(
+            "INSERT INTO resource_versions (name, version) VALUES (?, 1) "
+            "ON CONFLICT (name) DO UPDATE SET version = version + 1 RETURNING version",
+            (name,),
+        ).fetchone()[0]
+
+    def get(self, name: str) -> str:
+        if self.path is None:
+            return f"{self._epoch}.{self._versions.get(name, 0)}"
+        conn = self._connect()
+        row = conn.execute("SELECT version FROM resource_versions WHERE name = ?", (name,)).fetchone()
+        return f"{self._epoch}.{row[0] if row else 0}"
+
+    async def get_async(self, name: str) -> str:
+        if self.path is None:
+            return self.get(name)
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, name)
+
+    async def bump_async(self, name: str) -> int:
+        if self.path is None:
+            return self.bump(name)
+        return await asyncio.get_running_loop().run_in_executor(None, self.bump, name)
+
+    def bump_later(self, name: str) -> None:
+        """Bump from synchronous code such as session hooks, without blocking a running event loop"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if self.path is None or loop is None:
+            self.bump(name)
+            return
+        def log_failure(done: asyncio.Future) -> None:
+            if not done.cancelled() and done.exception() is not None:
+                logger.warning("Failed to bump resource version %s: %s", name, done.exception())
+
+        loop.run_in_executor(None, self.bump, name).add_done_callback(log_failure)
+
+
+resource_versions = ResourceVersions(RESOURCE_VERSIONS_DB)
+
+
+class CacheRule(NamedTuple):
+    prefix: str
+    cache_control: str
+    # path -> version string, or an awaitable of one; None means the ETag is computed from the body
+    version: Optional[Callable[[str], Union[Optional[str], Awaitable[Optional[str]]]]] = None
+    ttl: float = CACHE_TTL
+    # Request headers, besides the caller's identity, that select a response variant
+    vary: Tuple[bytes, ...] = ()
+
+
+def _path_segment(path: str, prefix: str) -> str:
+    return path[len(prefix):].strip("/").split("/", 1)[0]
+
+
+def _matches_version(path: str) -> Optional[str]:
+    # The match list changes when sports_api refreshes its cache file
+    from sports_api import cache_version
+    return cache_version()
+
+
+async def _predictions_version(path: str) -> Optional[str]:
+    match_id = _path_segment(path, f"{API_V1_PREFIX}/predictions")
+    return await resource_versions.get_async(f"predictions:{match_id}") if match_id else None
+
+
+async def _stats_version(path: str) -> Optional[str]:
+    return await resource_versions.get_async("stats")
+
+
+DEFAULT_RULES: List[CacheRule] = [
+    CacheRule(f"{API_V1_PREFIX}/matches", "public, max-age=30", _matches_version, ttl=300),
+    CacheRule(f"{API_V1_PREFIX}/predictions", "private, no-cache", _predictions_version),
+    CacheRule(f"{API_V1_PREFIX}/stats", "public, max-age=60", _stats_version),
+    CacheRule(f"{API_V1_PREFIX}/teams", "private, no-cache"),
+]
+
+
+def make_etag(*parts: bytes) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part)
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+def request_variant(headers: Dict[bytes, bytes], rule: CacheRule) -> str:
+    """Digest of the request headers a response may depend on; empty for an anonymous, plain request"""
+    values = [headers.get(name, b"") for name in IDENTITY_HEADERS + rule.vary]
+    if not any(values):
+        return ""
+    digest = hashlib.blake2b(digest_size=16)
+    for value in values:
+        digest.update(value)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _varies_only_on(headers: List[Tuple[bytes, bytes]], rule: CacheRule) -> bool:
+    """Whether the response's Vary header names nothing outside the cache key"""
+    keyed = set(IDENTITY_HEADERS + rule.vary)
+    for name, value in headers:
+        if name.lower() == b"vary":
+            varies = {part.strip().lower() for part in value.split(b",")}
+            if not varies <= keyed:
+                return False
+    return True
+
+
+class CachedResponse(NamedTuple):
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: str
+    expires: float
+
+
+class BodyCache:
+    """LRU of serialized responses, bounded by total body size"""
+
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[str, ...], CachedResponse]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "evicted": 0}
+
+    def get(self, key: Tuple[str, ...]) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, key: Tuple[str, ...], entry: CachedResponse) -> None:
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self.size += len(entry.body)
+        while self.size > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.stats["evicted"] += 1
+
+    def _remove(self, key: Tuple[str, ...]) -> None:
+        self.size -= len(self._entries.pop(key).body)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+
+class ResponseCacheMiddleware:
+    """
+    ETag / If-None-Match handling and an in-memory body cache for GET routes.
+
+    For routes with a version provider the ETag is derived from the resource
+    version, so while a stored body for that version is live a matching
+    If-None-Match gets a 304 and a repeat request gets the stored bytes, both
+    without calling the endpoint. Once the entry has expired or been evicted
+    the endpoint runs again and the 304 is decided on the ETag it yields.
+    Other routes get an ETag hashed from the body they produce, which still
+    saves the transfer.
+
+    Cache keys include the caller's identity headers and the rule's vary
+    headers, so one caller's response is never served to another; responses
+    whose Vary header names anything else are not stored.
+    """
+
+    def __init__(self, app, rules: Optional[List[CacheRule]] = None, cache: Optional[BodyCache] = None):
+        self.app = app
+        self.rules = sorted(rules if rules is not None else DEFAULT_RULES,
+                            key=lambda rule: len(rule.prefix), reverse=True)
+        self.cache = cache or BodyCache()
+
+    def _rule_for(self, path: str) -> Optional[CacheRule]:
+        for rule in self.rules:
+            if path.startswith(rule.prefix):
+                return rule
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+        rule = self._rule_for(scope["path"])
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        if_none_match = headers.get(b"if-none-match", b"").decode("latin-1") or None
+        url = scope["path"] + ("?" + scope["query_string"].decode("latin-1") if scope["query_string"] else "")
+
+        version = None
+        if rule.version is not None:
+            try:
+                version = rule.version(scope["path"])
+                if inspect.isawaitable(version):
+                    version = await version
+            except Exception as e:
+                logger.warning(f"Cache version lookup failed for {url}: {e}")
+
+        key = None
+        if version is not None:
+            key = (url, version, request_variant(headers, rule))
+            cached = self.cache.get(key)
+            if cached is not None:
+                if etag_matches(if_none_match, cached.etag):
+                    self.cache.stats["not_modified"] += 1
+                    return await self._send_not_modified(send, cached.etag, rule)
+                return await self._send(send, cached.status, cached.headers, cached.body, cached.etag, rule, scope)
+
+        await self._call_and_capture(scope, receive, send, rule, key, if_none_match)
+
+    async def _call_and_capture(self, scope, receive, send, rule: CacheRule, key, if_none_match) -> None:
+        start: Dict = {}
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def capture(message):
+            nonlocal passthrough
+            if message["type"] == "http.response.start":
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                if message["status"] != 200 or content_type.startswith(STREAMING_TYPES):
+                    passthrough = True
+                    return await send(message)
+                start.update(message)
+                return
+            if passthrough:
+                return await send(message)
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                await self._finish(send, start, b"".join(chunks), rule, key, if_none_match, scope)
+
+        await self.app(scope, receive, capture)
+
+    async def _finish(self, send, start: Dict, body: bytes, rule: CacheRule, key, if_none_match, scope) -> None:
+        headers = [(name, value) for name, value in start.get("headers", [])
+                   if name.lower() not in (b"etag", b"cache-control", b"content-length")]
+        cacheable = not any(name.lower() == b"set-cookie" for name, _ in headers)
+
+        if key is not None:
+            etag = make_etag(*(part.encode() for part in key))
+            if cacheable and len(body) <= MAX_BODY_BYTES and _varies_only_on(headers, rule):
+                self.cache.put(key, CachedResponse(200, headers, body, etag, time.monotonic() + rule.ttl))
+        else:
+            etag = make_etag(body)
+        if etag_matches(if_none_match, etag):
+            self.cache.stats["not_modified"] += 1
+            return await self._send_not_modified(send, etag, rule)
+        await self._send(send, 200, headers, body, etag, rule, scope)
+
+    @staticmethod
+    async def _send(send, status: int, headers, body: bytes, etag: str, rule: CacheRule, scope) -> None:
+        headers = list(headers) + [
+            (b"etag", etag.encode()),
+            (b"cache-control", rule.cache_control.encode()),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+    @staticmethod
+    async def _send_not_modified(send, etag: str, rule: CacheRule) -> None:
+        headers = [(b"etag", etag.encode()), (b"cache-control", rule.cache_control.encode())]
+        await send({"type": "http.response.start", "status": 304, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
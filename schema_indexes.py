@@ -0,0 +1,225 @@
+# schema_indexes.py
+
+import logging
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# execute(sql, params) -> list of row tuples (empty for statements without rows)
+Executor = Callable[..., List[Tuple[Any, ...]]]
+
+
+class IndexSpec(NamedTuple):
+    name: str
+    table: str
+    columns: Tuple[str, ...]
+
+
+class HotQuery(NamedTuple):
+    name: str
+    sql: str
+    params: Tuple[Any, ...]
+    table: str
+    index: str
+    covering: bool = False
+
+
+# Indexes the application relies on. Anything not listed here and made
+# redundant by one of these (or by the primary key) is dropped.
+INDEXES: List[IndexSpec] = [
+    IndexSpec('ix_matches_team1', 'matches', ('team1',)),
+    IndexSpec('ix_matches_team2', 'matches', ('team2',)),
+    IndexSpec('ix_matches_date_id', 'matches', ('date', 'id')),
+    IndexSpec('ix_players_team', 'players', ('team',)),
+    IndexSpec('ix_match_performances_match_player', 'match_performances', ('match_id', 'player_id')),
+    IndexSpec('ix_match_performances_player_date', 'match_performances', ('player_id', 'match_date', 'match_id')),
+    IndexSpec('ix_predictions_player_id', 'predictions', ('player_id',)),
+    IndexSpec('ix_player_career_stats_fantasy_points', 'player_career_stats', ('fantasy_points',)),
+]
+
+# The queries behind the API and jobs, with the index each must search
+HOT_QUERIES: List[HotQuery] = [
+    HotQuery(
+        'match_list_page',
+        "SELECT id, team1, team2, date, winner FROM matches "
+        "WHERE (date, id) > (?, ?) ORDER BY date, id LIMIT 50",
+        ('2024-01-01', ''), 'matches', 'ix_matches_date_id',
+    ),
+    HotQuery(
+        'matches_for_team',
+        "SELECT id, date FROM matches WHERE team1 = ?",
+        ('CSK',), 'matches', 'ix_matches_team1',
+    ),
+    HotQuery(
+        'squad_players',
+        "SELECT id, name, team FROM players WHERE team IN (?, ?)",
+        ('CSK', 'MI'), 'players', 'ix_players_team',
+    ),
+    HotQuery(
+        'match_squad_ids',
+        "SELECT player_id FROM match_performances WHERE match_id = ?",
+        ('m1',), 'match_performances', 'ix_match_performances_match_player', covering=True,
+    ),
+    HotQuery(
+        'player_performances',
+        "SELECT id, match_id, runs_scored FROM match_performances WHERE player_id = ?",
+        ('p1',), 'match_performances', 'ix_match_performances_player_date',
+    ),
+    HotQuery(
+        'player_recent_performances',
+        "SELECT id FROM match_performances WHERE player_id = ? AND match_date < ? "
+        "ORDER BY match_date DESC, match_id DESC LIMIT 5",
+        ('p1', '2024-01-01'), 'match_performances', 'ix_match_performances_player_date', covering=True,
+    ),
+    HotQuery(
+        'player_predictions',
+        "SELECT predicted_score FROM predictions WHERE player_id = ?",
+        ('p1',), 'predictions', 'ix_predictions_player_id',
+    ),
+    HotQuery(
+        'feature_store_as_of',
+        "SELECT * FROM player_features WHERE player_id = ? AND as_of_date < ? "
+        "ORDER BY as_of_date DESC LIMIT 1",
+        ('p1', '2024-01-01'), 'player_features', 'sqlite_autoindex_player_features_1',
+    ),
+    HotQuery(
+        'match_top_performers',
+        "SELECT rank, player_id, fantasy_points FROM match_top_performers WHERE match_id = ? ORDER BY rank",
+        ('m1',), 'match_top_performers', 'sqlite_autoindex_match_top_performers_1',
+    ),
+    HotQuery(
+        'team_match_totals',
+        "SELECT runs, fantasy_points FROM team_match_totals WHERE team = ?",
+        ('CSK',), 'team_match_totals', 'sqlite_autoindex_team_match_totals_1',
+    ),
+]
+
+
+def sqlalchemy_executor(sync_conn) -> Executor:
+    """Adapt a synchronous SQLAlchemy connection (e.g. inside run_sync)"""
+    def execute(sql: str, params: Sequence[Any] = ()) -> List[Tuple[Any, ...]]:
+        result = sync_conn.exec_driver_sql(sql, tuple(params))
+        return [tuple(row) for row in result.fetchall()] if result.returns_rows else []
+    return execute
+
+
+def sqlite3_executor(conn) -> Executor:
+    """Adapt a plain sqlite3 connection"""
+    def execute(sql: str, params: Sequence[Any] = ()) -> List[Tuple[Any, ...]]:
+        return [tuple(row) for row in conn.execute(sql, tuple(params)).fetchall()]
+    return execute
+
+
+def _tables(execute: Executor) -> List[str]:
+    rows = execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+    return [row[0] for row in rows]
+
+
+def existing_indexes(execute: Executor, table: str) -> Dict[str, Dict[str, Any]]:
+    """Index name -> columns, uniqueness and origin ('c' created, 'pk', 'u' constraint)"""
+    indexes = {}
+    for row in execute(f"PRAGMA index_list('{table}')"):
+        # seq, name, unique, origin, partial
+        name, unique, origin = row[1], bool(row[2]), row[3]
+        columns = tuple(info[2] for info in execute(f"PRAGMA index_info('{name}')"))
+        indexes[name] = {'columns': columns, 'unique': unique, 'origin': origin}
+    return indexes
+
+
+def _primary_key(execute: Executor, table: str) -> Tuple[str, ...]:
+    # cid, name, type, notnull, dflt_value, pk
+    pk = sorted((row[5], row[1]) for row in execute(f"PRAGMA table_info('{table}')") if row[5])
+    return tuple(name for _, name in pk)
+
+
+def find_redundant_indexes(execute: Executor) -> List[Tuple[str, str, str]]:
+    """
+    Created indexes that add write cost without helping any lookup.
+
+    An index is redundant when its columns are a prefix of the primary key or
+    of another index on the same table (ties are broken in favour of indexes
+    declared in INDEXES). Returns (table, index, reason) tuples.
+    """
+    declared = {spec.name for spec in INDEXES}
+    redundant = []
+    for table in _tables(execute):
+        indexes = existing_indexes(execute, table)
+        pk = _primary_key(execute, table)
+        for name, info in sorted(indexes.items()):
+            if info['origin'] != 'c' or info['unique']:
+                continue
+            columns = info['columns']
+            if pk and pk[:len(columns)] == columns:
+                redundant.append((table, name, f"prefix of primary key {pk}"))
+                continue
+            for other, other_info in sorted(indexes.items()):
+                if other == name or other_info['columns'][:len(columns)] != columns:
+                    continue
+                if len(other_info['columns']) > len(columns):
+                    redundant.append((table, name, f"prefix of {other}"))
+                    break
+                # Exact duplicate: keep the declared one, or the first by name
+                if name not in declared and (other in declared or other < name):
+                    redundant.append((table, name, f"duplicate of {other}"))
+                    break
+    return redundant
+
+
+def create_missing_indexes(execute: Executor) -> List[str]:
+    tables = set(_tables(execute))
+    created = []
+    for spec in INDEXES:
+        if spec.table not in tables:
+            continue
+        if spec.name not in existing_indexes(execute, spec.table):
+            execute(f"CREATE INDEX IF NOT EXISTS {spec.name} ON {spec.table} ({', '.join(spec.columns)})")
+            created.append(spec.name)
+    return created
+
+
+def drop_redundant_indexes(execute: Executor) -> List[Tuple[str, str, str]]:
+    dropped = find_redundant_indexes(execute)
+    for _, name, _ in dropped:
+        execute(f"DROP INDEX IF EXISTS {name}")
+    return dropped
+
+
+def explain(execute: Executor, sql: str, params: Sequence[Any] = ()) -> List[str]:
+    """EXPLAIN QUERY PLAN detail lines"""
+    return [row[-1] for row in execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def check_query_plan(execute: Executor, query: HotQuery) -> Optional[str]:
+    """Return a description of the problem, or None if the plan is as intended"""
+    plan = explain(execute, query.sql, query.params)
+    full_scans = [line for line in plan if re.match(r"SCAN \w+$", line) or re.match(r"SCAN \w+ AS \w+$", line)]
+    if full_scans:
+        return f"full table scan: {full_scans}"
+
+    kind = r"COVERING INDEX" if query.covering else r"(?:COVERING )?INDEX"
+    pattern = rf"SEARCH {query.table}\b.*USING {kind} {re.escape(query.index)}\b"
+    if not any(re.search(pattern, line) for line in plan):
+        expected = "covering index" if query.covering else "index"
+        return f"expected SEARCH using {expected} {query.index}, got {plan}"
+    return None
+
+
+def check_query_plans(execute: Executor, queries: Sequence[HotQuery] = HOT_QUERIES) -> Dict[str, Optional[str]]:
+    """Check every hot query whose table exists; None means the plan is fine"""
+    tables = set(_tables(execute))
+    return {
+        query.name: check_query_plan(execute, query)
+        for query in queries
+        if query.table in tables
+    }
+
+
+def apply_index_plan(execute: Executor) -> Dict[str, Any]:
+    """Create declared indexes, drop redundant ones and verify the hot query plans"""
+    created = create_missing_indexes(execute)
+    dropped = drop_redundant_indexes(execute)
+    # Refresh planner statistics for the changed indexes
+    execute("PRAGMA optimize")
+    plans = check_query_plans(execute)
+    return {'created': created, 'dropped': dropped, 'plans': plans}
@@ -0,0 +1,33 @@
+# scoring.py
+
+from typing import Dict, Iterable
+
+# Fantasy points per unit, following the usual T20 scoring
+POINTS_PER_RUN = 1.0
+POINTS_PER_WICKET = 25.0
+POINTS_PER_CATCH = 8.0
+
+CAPTAIN_MULTIPLIER = 2.0
+VICE_CAPTAIN_MULTIPLIER = 1.5
+
+
+def fantasy_points(runs: float, wickets: float, catches: float) -> float:
+    """Fantasy points for one player's performance"""
+    return (
+        (runs or 0) * POINTS_PER_RUN
+        + (wickets or 0) * POINTS_PER_WICKET
+        + (catches or 0) * POINTS_PER_CATCH
+    )
+
+
+def lineup_points(players: Iterable[str], captain: str, vice_captain: str, points: Dict[str, float]) -> float:
+    """Total points for a lineup, applying captain and vice-captain multipliers"""
+    total = 0.0
+    for player in players:
+        player_points = points.get(player, 0.0)
+        if player == captain:
+            player_points *= CAPTAIN_MULTIPLIER
+        elif player == vice_captain:
+            player_points *= VICE_CAPTAIN_MULTIPLIER
+        total += player_points
+    return total
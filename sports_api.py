@@ -3,7 +3,7 @@ import json
 import time
 import asyncio
 import httpx
-from typing import List, Dict
+from typing import List, Dict, Optional
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
@@ -28,6 +28,13 @@ async def read_cache() -> List[Dict]:
         print(f"❌ Cache read error: {e}")
     return []
 
+def cache_version() -> Optional[str]:
+    """Modification time of the match cache, used to version cached responses"""
+    try:
+        return str(os.stat(CACHE_FILE).st_mtime_ns)
+    except OSError:
+        return None
+
 async def write_cache(data: List[Dict]):
     try:
         os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
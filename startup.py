@@ -0,0 +1,134 @@
+# startup.py
+
+import asyncio
+import importlib
+import inspect
+import logging
+import os
+import time
+import types
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Load the model and prime caches before the worker accepts traffic
+PREWARM = os.getenv("PREWARM", "false").lower() == "true"
+
+# Heavy modules imported during the warm-up instead of on the first request
+WARM_IMPORTS = ["numpy", "pandas", "joblib", "sklearn.ensemble", "predict_model"]
+
+_process_start = time.perf_counter()
+_phases: List[Dict[str, Any]] = []
+warmed = False
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Record how long a startup phase takes; failures are recorded and re-raised"""
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        _phases.append({
+            "name": name,
+            "ms": round((time.perf_counter() - start) * 1000, 2),
+            "ok": error is None,
+            "error": error,
+        })
+
+
+def import_module(name: str) -> types.ModuleType:
+    """importlib.import_module, timed into the startup report"""
+    with timed(f"import {name}"):
+        return importlib.import_module(name)
+
+
+class LazyModule(types.ModuleType):
+    """
+    Module proxy that imports the real module on first attribute access.
+
+    The import is timed like any other startup phase, so the report shows
+    what the first request had to pay for.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_module"] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__["_module"]
+        if module is None:
+            module = self.__dict__["_module"] = import_module(self.__name__)
+        return module
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._load(), attribute)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def startup_report() -> Dict[str, Any]:
+    phases = sorted(_phases, key=lambda phase: phase["ms"], reverse=True)
+    return {
+        "since_process_start_ms": round((time.perf_counter() - _process_start) * 1000, 2),
+        "warmed": warmed,
+        "phases": phases,
+    }
+
+
+def _load_model() -> None:
+    from predict_model import MLModelWrapper
+    MLModelWrapper.get_instance().load_model()
+
+
+async def _run_phase(name: str, func, *args) -> bool:
+    try:
+        with timed(name):
+            result = func(*args)
+            if inspect.isawaitable(result):
+                await result
+        return True
+    except Exception as e:
+        logger.warning(f"Warm-up phase '{name}' failed: {e}")
+        return False
+
+
+async def warm_up(prewarm: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Startup phase run from the application's startup hook.
+
+    With pre-warming on, heavy modules are imported, the model is loaded and
+    caches are primed in a thread before the worker starts serving; without
+    it all of that happens on first use. A failing phase is logged and
+    reported but does not stop the worker.
+    """
+    global warmed
+    prewarm = PREWARM if prewarm is None else prewarm
+    loop = asyncio.get_running_loop()
+
+    if prewarm:
+        for name in WARM_IMPORTS:
+            await _run_phase(f"import {name}", loop.run_in_executor, None, importlib.import_module, name)
+        await _run_phase("load model", loop.run_in_executor, None, _load_model)
+
+        from sports_api import read_cache
+        await _run_phase("prime match cache", read_cache)
+
+        from player_identity import player_index
+        await _run_phase("load player index", player_index.ensure_loaded)
+
+    warmed = True
+    report = startup_report()
+    slowest = ", ".join(f"{phase['name']} {phase['ms']:.0f}ms" for phase in report["phases"][:5])
+    logger.info(f"Startup finished in {report['since_process_start_ms']:.0f}ms ({slowest})")
+    return report
@@ -0,0 +1,39 @@
+# stats_api.py
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_read_db
+from aggregates import get_match_top_performers, get_player_summary, get_team_summary, get_top_players
+
+router = APIRouter()
+
+
+@router.get("/players/top")
+async def top_players(limit: int = Query(10, ge=1, le=100), session: AsyncSession = Depends(get_read_db)):
+    """Players with the most career fantasy points"""
+    return await get_top_players(session, limit)
+
+
+@router.get("/players/{player_id}")
+async def player_summary(player_id: str, session: AsyncSession = Depends(get_read_db)):
+    """Career totals and recent form for a player"""
+    summary = await get_player_summary(session, player_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Player not found")
+    return summary
+
+
+@router.get("/teams/{team}")
+async def team_summary(team: str, session: AsyncSession = Depends(get_read_db)):
+    """Aggregate totals for a team"""
+    summary = await get_team_summary(session, team)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Team not found")
+    return summary
+
+
+@router.get("/matches/{match_id}/top-performers")
+async def match_top_performers(match_id: str, session: AsyncSession = Depends(get_read_db)):
+    """Highest scoring players in a match"""
+    return await get_match_top_performers(session, match_id)
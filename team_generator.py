@@ -1,5 +1,9 @@
 import random
 
+from memory import tracked
+
+
+@tracked()
 def generate_team(ranked_players, winner_team, team1, team2, team1_players, team2_players, max_combinations=5):
     all_teams = []
     winner_list = team1_players if winner_team == team1 else team2_players
@@ -0,0 +1,93 @@
+import asyncio
+import datetime
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import aggregates
+from database import Base, Match, MatchPerformance, Player
+from performances import record_performances
+from response_cache import resource_versions
+
+
+async def _incremental_matches_rebuild(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'agg.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with Session() as session:
+        session.add_all([Player(id=f"{team}{i}", name=f"{team}{i}", team=team) for team in "AB" for i in range(3)])
+        session.add_all([
+            Match(id=f"m{n}", team1="A", team2="B", date=datetime.date(2024, 1, 1) + datetime.timedelta(days=n))
+            for n in range(8)
+        ])
+        await session.flush()
+        # Each match arrives in two batches, so (team, match) pairs are seen twice
+        for n in range(8):
+            for team in "AB":
+                await record_performances(session, [
+                    {"match_id": f"m{n}", "player_id": f"{team}{i}",
+                     "runs_scored": (n * 7 + i * 3) % 60, "wickets_taken": (n + i) % 3, "catches": i % 2}
+                    for i in range(3)
+                ])
+        await session.commit()
+
+        incremental = (
+            await aggregates.get_player_summary(session, "A1"),
+            await aggregates.get_team_summary(session, "B"),
+            await aggregates.get_match_top_performers(session, "m5"),
+            await aggregates.get_top_players(session, 3),
+        )
+        await aggregates.rebuild_aggregates(session)
+        await session.commit()
+        rebuilt = (
+            await aggregates.get_player_summary(session, "A1"),
+            await aggregates.get_team_summary(session, "B"),
+            await aggregates.get_match_top_performers(session, "m5"),
+            await aggregates.get_top_players(session, 3),
+        )
+    await engine.dispose()
+    return incremental, rebuilt
+
+
+def test_incremental_updates_match_full_rebuild(tmp_path):
+    incremental, rebuilt = asyncio.run(_incremental_matches_rebuild(tmp_path))
+    assert incremental == rebuilt
+
+    player, team, top_performers, _ = incremental
+    assert player["career"]["matches"] == 8
+    assert player["recent_form"]["matches"] == aggregates.RECENT_FORM_WINDOW
+    assert team["matches"] == 8
+    assert [p["rank"] for p in top_performers] == list(range(1, aggregates.TOP_PERFORMERS_PER_MATCH + 1))
+
+
+def test_stats_version_bumps_once_per_committed_transaction(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'bumps.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+
+        async with Session() as session:
+            session.add_all([Player(id="A0", name="A0", team="A"), Match(id="m0", team1="A", team2="B", date=datetime.date(2024, 1, 1))])
+            await session.commit()
+            start = resource_versions.get("stats")
+
+            await record_performances(session, [{"match_id": "m0", "player_id": "A0", "runs_scored": 10}])
+            await session.rollback()
+            # A later, unrelated commit must not apply the rolled-back bump
+            session.add(Player(id="A1", name="A1", team="A"))
+            await session.commit()
+            after_rollback = resource_versions.get("stats")
+
+            for runs in (10, 20):
+                await record_performances(session, [{"match_id": "m0", "player_id": "A0", "runs_scored": runs}])
+            await session.commit()
+            after_commit = resource_versions.get("stats")
+        await engine.dispose()
+        return start, after_rollback, after_commit
+
+    start, after_rollback, after_commit = asyncio.run(scenario())
+    assert after_rollback == start
+    counter = lambda version: int(version.rsplit(".", 1)[1])
+    assert counter(after_commit) == counter(start) + 1
@@ -0,0 +1,58 @@
+import asyncio
+import datetime
+
+import numpy as np
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from backtest import run_backtest
+from database import Base, Match, Player
+from performances import record_performances
+
+TIMING = ["load_seconds", "compute_seconds"]
+
+
+async def _seed(tmp_path):
+    # No pooling: each run_backtest call below has its own event loop
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'backtest.db'}", poolclass=NullPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    async with Session() as session:
+        session.add_all([Player(id=f"{team}{n}", name=f"{team}{n}", team=team) for team in "AB" for n in range(12)])
+        session.add_all([
+            Match(id=f"m{n}", team1="A", team2="B", date=datetime.date(2024, 1, 1) + datetime.timedelta(days=n),
+                  winner="A" if n % 3 else "B")
+            for n in range(6)
+        ])
+        await session.flush()
+        for n in range(6):
+            # Player k of each side scores in proportion to k, so form predicts the next match
+            await record_performances(session, [
+                {"match_id": f"m{n}", "player_id": f"{team}{k}", "runs_scored": k * 5 + n,
+                 "wickets_taken": k % 3, "catches": (k + n) % 2}
+                for team in "AB" for k in range(12)
+            ])
+        await session.commit()
+    return Session
+
+
+def test_backtest_is_deterministic_and_point_in_time(tmp_path):
+    Session = asyncio.run(_seed(tmp_path))
+    runs = [
+        asyncio.run(run_backtest(output=str(tmp_path / f"run{i}.parquet"), workers=2, n_lineups=5,
+                                 batch_size=2, session_factory=Session))
+        for i in range(2)
+    ]
+
+    first, second = (df.drop(columns=TIMING).sort_values("match_id").reset_index(drop=True) for df in runs)
+    assert first.equals(second)
+    assert list(first["match_id"]) == [f"m{n}" for n in range(6)]
+    assert first["error"].isna().all()
+    assert (first["n_lineups"] == 5).all()
+
+    # The first match has no earlier history: every prediction is zero
+    assert first.loc[0, "predicted_winner"] == "A"
+    later = first.iloc[1:]
+    assert (later["best_points"] <= later["dream_points"]).all()
+    assert np.isclose(later["best_pct_of_dream"], later["best_points"] / later["dream_points"]).all()
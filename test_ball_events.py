@@ -0,0 +1,121 @@
+import asyncio
+
+from ball_events import BallEventAggregator
+from feature_schema import DEFAULT_FEATURES
+
+
+def test_strike_rates_and_averages():
+    agg = BallEventAggregator(min_balls=1)
+    agg.ingest_many([
+        {"batter": "b1", "bowler": "w1", "over": 0, "runs": 4},
+        {"batter": "b1", "bowler": "w1", "over": 0, "runs": 0, "player_out": "b1", "wicket_kind": "bowled"},
+        {"batter": "b2", "bowler": "w1", "over": 0, "runs": 2},
+        {"batter": "b2", "bowler": "w1", "over": 0, "runs": 0, "player_out": "b2", "wicket_kind": "caught"},
+    ])
+
+    batter = agg.features("b1")
+    assert batter["bat_sr"] == 200.0
+    assert batter["bat_avg"] == 4.0
+
+    bowler = agg.features("w1")
+    assert bowler["bowl_sr"] == 2.0
+    assert bowler["bowl_avg"] == 3.0
+
+
+def test_extras_and_run_outs():
+    agg = BallEventAggregator()
+    agg.ingest({"batter": "b1", "bowler": "w1", "over": 1, "runs": 0, "extras": 1, "extras_type": "wides"})
+    agg.ingest({"batter": "b1", "bowler": "w1", "over": 1, "runs": 1, "extras": 1, "extras_type": "noballs"})
+    agg.ingest({"batter": "b1", "bowler": "w1", "over": 1, "runs": 0, "extras": 4, "extras_type": "legbyes"})
+    agg.ingest({"batter": "b1", "bowler": "w1", "over": 1, "runs": 1, "player_out": "b2", "wicket_kind": "run out"})
+
+    batter = agg.snapshot("b1")
+    assert batter["balls_faced"] == 3
+    assert batter["runs_scored"] == 2
+
+    bowler = agg.snapshot("w1")
+    assert bowler["balls_bowled"] == 2
+    assert bowler["runs_conceded"] == 4
+    assert bowler["wickets"] == 0
+    assert agg.snapshot("b2")["dismissals"] == 1
+
+
+def test_death_overs_and_defaults():
+    agg = BallEventAggregator(min_balls=1)
+    agg.ingest({"batter": "b1", "bowler": "w1", "over": 3, "runs": 1})
+    agg.ingest({"batter": "b1", "bowler": "w1", "over": 18, "runs": 6})
+
+    assert agg.features("b1")["death_overs_pct"] == 0.5
+    assert agg.features("unknown") == DEFAULT_FEATURES
+    # No wickets yet, so bowling features stay at defaults
+    assert agg.features("w1")["bowl_avg"] == DEFAULT_FEATURES["bowl_avg"]
+
+
+def test_consume_async_stream_skips_malformed():
+    async def stream():
+        yield {"batter": "b1", "bowler": "w1", "over": 0, "runs": 1}
+        yield {"batter": "b1"}
+        yield {"batter": "b1", "bowler": "w1", "over": 0, "runs": 3}
+
+    agg = BallEventAggregator()
+    count = asyncio.run(agg.consume(stream()))
+    assert count == 2
+    assert agg.snapshot("b1")["runs_scored"] == 4
+
+
+def test_observed_features_only_include_backed_values():
+    agg = BallEventAggregator(min_balls=1)
+    agg.ingest({"batter": "b1", "bowler": "w1", "over": 0, "runs": 1})
+
+    assert set(agg.observed_features("b1")) == {"bat_sr", "death_overs_pct"}
+    assert agg.observed_features("unknown") == {}
+
+
+def test_retired_hurt_is_not_a_dismissal():
+    agg = BallEventAggregator()
+    agg.ingest({"batter": "b1", "bowler": "w1", "over": 0, "runs": 30})
+    agg.ingest({"batter": "b1", "bowler": "w1", "over": 0, "runs": 0, "player_out": "b1", "wicket_kind": "retired hurt"})
+
+    assert agg.snapshot("b1")["dismissals"] == 0
+    assert agg.snapshot("w1")["wickets"] == 0
+    assert "bat_avg" not in agg.observed_features("b1")
+
+
+def test_live_figures_need_a_minimum_number_of_balls():
+    agg = BallEventAggregator(min_balls=6)
+    agg.ingest({"batter": "b1", "bowler": "w1", "over": 0, "runs": 6, "player_out": "b1", "wicket_kind": "caught"})
+    # One ball is not a strike rate of 600 or a bowling average of 6
+    assert agg.observed_features("b1") == agg.observed_features("w1") == {}
+    assert agg.features("b1") == DEFAULT_FEATURES
+
+    agg.ingest_many([{"batter": "b1", "bowler": "w1", "over": 1, "runs": 1} for _ in range(5)])
+    assert agg.observed_features("b1")["bat_sr"] == 1100 / 6
+    assert agg.observed_features("w1")["bowl_sr"] == 6.0
+
+
+def test_deliveries_endpoint_needs_an_api_key_and_skips_repeated_balls(monkeypatch):
+    import ball_events
+    import middleware
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(middleware, "API_KEY", "secret")
+    monkeypatch.setattr(ball_events, "ball_aggregator", BallEventAggregator(min_balls=1, require_key=True))
+    app = FastAPI()
+    app.include_router(ball_events.router, prefix="/live")
+    client = TestClient(app)
+    feed = [
+        {"match_id": "m1", "innings": 1, "over": 19, "ball": 1, "batter": "b1", "bowler": "w1", "runs": 6},
+        {"match_id": "m1", "innings": 1, "over": 19, "ball": 2, "batter": "b1", "bowler": "w1", "runs": 0},
+        {"batter": "b1", "bowler": "w1", "over": 19, "runs": 4},
+    ]
+
+    assert client.post("/live/deliveries", json=feed).status_code == 401
+    assert client.post("/live/deliveries", json=feed, headers={"X-API-Key": "wrong"}).status_code == 401
+    assert ball_events.ball_aggregator.deliveries_seen == 0
+
+    first = client.post("/live/deliveries", json=feed, headers={"X-API-Key": "secret"})
+    again = client.post("/live/deliveries", json=feed[:2], headers={"X-API-Key": "secret"})
+    assert first.json() == {"ingested": 2, "duplicates": 0, "skipped": 1, "deliveries_seen": 2}
+    assert again.json() == {"ingested": 0, "duplicates": 2, "skipped": 0, "deliveries_seen": 2}
+    assert ball_events.ball_aggregator.snapshot("b1")["runs_scored"] == 6
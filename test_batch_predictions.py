@@ -0,0 +1,158 @@
+import asyncio
+import datetime
+
+import numpy as np
+import orjson
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from batch_predictions import match_ids_between, predict_matches, stream_predictions
+from database import Base, Match, Player
+
+
+async def _run(tmp_path, predict):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'batch.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    async with Session() as session:
+        session.add_all([
+            Player(id=f"{team}{n}", name=f"{team}{n}", team=team, batting_average=float(n), bowling_average=30.0)
+            for team in "ABC" for n in range(11)
+        ])
+        session.add_all([
+            Match(id="m1", team1="A", team2="B", date=datetime.date(2024, 4, 1)),
+            Match(id="m2", team1="B", team2="C", date=datetime.date(2024, 4, 2)),
+            Match(id="m3", team1="A", team2="X", date=datetime.date(2024, 4, 3)),
+        ])
+        await session.commit()
+
+    try:
+        slate = await match_ids_between(datetime.date(2024, 4, 1), datetime.date(2024, 4, 2), session_factory=Session)
+        results = await predict_matches(slate + ["missing"], predict=predict, persist=False, session_factory=Session)
+    finally:
+        await engine.dispose()
+    return slate, results
+
+
+def test_one_model_call_for_the_whole_slate(tmp_path):
+    calls = []
+
+    def predict(features):
+        calls.append(len(features))
+        return features["bat_avg"].to_numpy() * 10
+
+    slate, results = asyncio.run(_run(tmp_path, predict))
+
+    assert slate == ["m1", "m2"]
+    assert calls == [44]
+    assert [r["match_id"] for r in results] == ["m1", "m2", "missing"]
+    assert results[2] == {"match_id": "missing", "error": "Match not found"}
+
+    players = results[0]["players"]
+    assert len(players) == 22
+    assert players[0]["fantasy_points"] == 100.0
+    assert [p["fantasy_points"] for p in players] == sorted((p["fantasy_points"] for p in players), reverse=True)
+
+
+def test_model_failure_is_reported_per_match(tmp_path):
+    def predict(features):
+        raise RuntimeError("model unavailable")
+
+    _, results = asyncio.run(_run(tmp_path, predict))
+    assert all("error" in r for r in results)
+    assert results[0]["error"] == "Prediction failed"
+
+
+def test_stream_sends_each_chunk_before_predicting_the_next(tmp_path):
+    calls = []
+
+    def predict(features):
+        calls.append(len(features))
+        return features["bat_avg"].to_numpy()
+
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'stream.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+        async with Session() as session:
+            session.add_all([Player(id=f"{team}{n}", name=f"{team}{n}", team=team) for team in "AB" for n in range(11)])
+            session.add_all([Match(id=f"m{n}", team1="A", team2="B", date=datetime.date(2024, 4, 1 + n)) for n in range(5)])
+            await session.commit()
+
+        lines = []
+        try:
+            stream = stream_predictions([f"m{n}" for n in range(5)], chunk_size=2,
+                                        predict=predict, persist=False, session_factory=Session)
+            async for line in stream:
+                # Model calls made by the time this line was sent
+                lines.append((orjson.loads(line)["match_id"], len(calls)))
+        finally:
+            await engine.dispose()
+        return lines
+
+    lines = asyncio.run(scenario())
+    assert [match_id for match_id, _ in lines] == [f"m{n}" for n in range(5)]
+    assert [calls_made for _, calls_made in lines] == [1, 1, 2, 2, 3]
+    assert calls == [44, 44, 22]
+
+
+def test_store_trained_model_gets_point_in_time_store_features(tmp_path):
+    import joblib
+    import train
+    from feature_store import FEATURE_COLUMNS, feature_rows, get_feature_vectors
+    from performances import record_performances
+
+    start = datetime.date(2024, 1, 1)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'store.db'}")
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    players = [f"{team}{n}" for team in "AB" for n in range(11)]
+
+    async def seed():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with Session() as session:
+            session.add_all([Player(id=p, name=p, team=p[0]) for p in players])
+            session.add_all([Match(id=f"m{n}", team1="A", team2="B", date=start + datetime.timedelta(days=n))
+                             for n in range(12)])
+            await session.commit()
+            for n in range(10):
+                await record_performances(session, [
+                    {"match_id": f"m{n}", "player_id": p, "runs_scored": (n * 13 + i * 7) % 70,
+                     "wickets_taken": (n + i) % 3, "catches": (n + i) % 2}
+                    for i, p in enumerate(players)
+                ])
+            await session.commit()
+        # Pooled connections belong to this event loop; training runs its own
+        await engine.dispose()
+
+    asyncio.run(seed())
+    model_path = str(tmp_path / "model.pkl")
+    train.train_from_store(model_path, n_estimators=5, session_factory=Session)
+    artifact = joblib.load(model_path)
+    frames = []
+
+    def predict(frame):
+        frames.append(frame)
+        return artifact["model"].predict(artifact["scaler"].transform(frame[artifact["features"]].to_numpy()))
+
+    async def scenario():
+        try:
+            results = await predict_matches(["m5", "m11"], predict=predict, persist=False,
+                                            session_factory=Session, features=artifact["features"])
+            async with Session() as session:
+                expected = {match_id: feature_rows(await get_feature_vectors(session, players, start + datetime.timedelta(days=n)), players)
+                            for match_id, n in [("m5", 5), ("m11", 11)]}
+        finally:
+            await engine.dispose()
+        return results, expected
+
+    results, expected = asyncio.run(scenario())
+    assert artifact["features"] == FEATURE_COLUMNS
+    assert all("players" in result and len(result["players"]) == 22 for result in results)
+    frame, = frames
+    assert list(frame.columns) == FEATURE_COLUMNS
+    # Each match sees only its own history, as single-match prediction does
+    rows = frame.values.tolist()
+    assert sorted(rows[:22]) == sorted(expected["m5"]) and sorted(rows[22:]) == sorted(expected["m11"])
+    assert expected["m5"] != expected["m11"]
@@ -0,0 +1,68 @@
+import asyncio
+import random
+
+from benchmark import Benchmark, SkipBenchmark, compare, make_history, make_lineups, make_slate, run_benchmark
+
+
+def test_generators_are_seeded_and_sized():
+    slate = make_slate(random.Random(1), 5)
+    assert slate == make_slate(random.Random(1), 5)
+    assert all(22 <= len(match["squad"]) <= 30 for match in slate)
+
+    lineups = make_lineups(random.Random(1), slate[0]["squad"], 100)
+    assert len(lineups) == 100 and all(len(set(lineup["players"])) == 11 for lineup in lineups)
+
+    players, matches, performances = make_history(random.Random(1), 2200)
+    assert len(matches) == 100 and len(performances) == 2200
+
+
+def test_skipped_benchmarks_are_reported():
+    def setup(ctx):
+        raise SkipBenchmark("model module unavailable")
+
+    result = asyncio.run(run_benchmark(Benchmark("skip", setup), ctx=None))
+    assert result == {"status": "skipped", "reason": "model module unavailable"}
+
+    timed = asyncio.run(run_benchmark(Benchmark("sum", lambda ctx: (lambda: sum(range(1000)), 1000), repeat=3), ctx=None))
+    assert timed["status"] == "ok" and timed["runs"] == 3
+
+
+def test_compare_flags_only_real_slowdowns():
+    def report(**medians):
+        return {"results": {name: {"status": "ok", "median_s": value} for name, value in medians.items()}}
+
+    baseline = report(fast=0.0001, steady=1.0, slow=1.0)
+    current = report(fast=0.0003, steady=1.05, slow=1.5)
+    current["results"]["missing"] = {"status": "skipped", "reason": "x"}
+    flagged = {row["name"]: row["regression"] for row in compare(current, baseline, threshold=0.1)}
+    assert flagged == {"fast": False, "steady": False, "slow": True}
+
+
+def test_compare_flags_benchmarks_that_stopped_running():
+    ok = {"status": "ok", "median_s": 1.0}
+    baseline = {"results": {"broken": ok, "skipped": ok, "still_broken": {"status": "error", "reason": "x"}}}
+    current = {"results": {
+        "broken": {"status": "error", "reason": "ValueError: bad"},
+        "skipped": {"status": "skipped", "reason": "no model"},
+        "still_broken": {"status": "error", "reason": "x"},
+    }}
+    rows = {row["name"]: row for row in compare(current, baseline)}
+    assert set(rows) == {"broken", "skipped"}
+    assert all(row["regression"] and row["current_s"] is None for row in rows.values())
+    assert rows["broken"]["status"] == "error" and rows["skipped"]["reason"] == "no model"
+
+
+def test_cli_exits_non_zero_when_a_benchmark_errors(tmp_path, monkeypatch):
+    import json
+
+    import benchmark
+
+    async def run_suite(*args, **kwargs):
+        return {"meta": {"scale": "quick"}, "results": {"db.squad": {"status": "error", "reason": "OperationalError: x"}}}
+
+    monkeypatch.setattr(benchmark, "run_suite", run_suite)
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"meta": {"scale": "quick"}, "results": {"db.squad": {"status": "ok", "median_s": 0.01}}}))
+    code = benchmark.main(["--scale", "quick", "--baseline", str(baseline), "--output", str(tmp_path / "out.json")])
+    assert code == 1
+    assert json.loads((tmp_path / "out.json").read_text())["comparison"][0]["status"] == "error"
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from database import ENGINE_PROFILES, Base, Prediction, create_engine_for_profile
+
+
+async def _pragmas(engine, names):
+    async with engine.connect() as conn:
+        return {name: (await conn.execute(text(f"PRAGMA {name}"))).scalar() for name in names}
+
+
+def test_production_profile_uses_wal_and_a_single_writer(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'prod.db'}"
+
+    async def scenario():
+        writer = create_engine_for_profile(url, "production", echo=False)
+        reader = create_engine_for_profile(url, "production", read_only=True, echo=False)
+        try:
+            written = await _pragmas(writer, ["journal_mode", "synchronous", "foreign_keys", "temp_store", "query_only"])
+            async with writer.begin() as conn:
+                await conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+            # Predictions carry upstream ids with no players row
+            async with writer.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.execute(Prediction.__table__.insert().values(player_id="api-123", predicted_score=1.0))
+            read = await _pragmas(reader, ["journal_mode", "query_only"])
+            with pytest.raises(OperationalError):
+                async with reader.begin() as conn:
+                    await conn.execute(text("INSERT INTO t VALUES (1)"))
+            return written, read, writer.pool.size(), reader.pool.size()
+        finally:
+            await writer.dispose()
+            await reader.dispose()
+
+    written, read, write_pool, read_pool = asyncio.run(scenario())
+    # synchronous=NORMAL is 1, temp_store=MEMORY is 2
+    assert written == {"journal_mode": "wal", "synchronous": 1, "foreign_keys": 0, "temp_store": 2, "query_only": 0}
+    assert read == {"journal_mode": "wal", "query_only": 1}
+    assert write_pool == 1
+    assert read_pool == ENGINE_PROFILES["production"]["read_pool_size"]
+
+
+def test_development_profile_and_unknown_profiles(tmp_path):
+    async def scenario():
+        engine = create_engine_for_profile(f"sqlite+aiosqlite:///{tmp_path / 'dev.db'}", "development", echo=False)
+        try:
+            return await _pragmas(engine, ["journal_mode", "foreign_keys"]), engine.pool.size()
+        finally:
+            await engine.dispose()
+
+    pragmas, pool_size = asyncio.run(scenario())
+    assert pragmas == {"journal_mode": "delete", "foreign_keys": 0}
+    assert pool_size == 5
+    with pytest.raises(ValueError):
+        create_engine_for_profile("sqlite+aiosqlite:///x.db", "staging")
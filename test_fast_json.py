@@ -0,0 +1,82 @@
+import orjson
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fast_json import CompressionMiddleware, FastJSONResponse, choose_encoding, pack_players, pack_teams
+
+PLAYERS = [
+    {"id": str(n), "name": f"P{n}", "team": "A" if n < 11 else "B", "role": "BAT", "fantasy_points": n * 1.5, "confidence": 0.8}
+    for n in range(22)
+]
+TEAMS = [
+    {"players": [f"P{n}" for n in range(start, start + 11)], "captain": f"P{start}", "vice_captain": f"P{start + 1}", "total_points": 100.0}
+    for start in range(10)
+]
+
+
+def test_pack_teams_uses_shared_player_table():
+    payload = pack_teams(TEAMS, PLAYERS)
+    rows = payload["players"]["rows"]
+    assert len(rows) == 22
+
+    name = payload["players"]["fields"].index("name")
+    players, captain, vice_captain, _ = payload["lineups"][3]
+    assert [rows[i][name] for i in players] == TEAMS[3]["players"]
+    assert rows[captain][name] == "P3" and rows[vice_captain][name] == "P4"
+
+
+def test_pack_players_keeps_namesakes_apart():
+    players = [{"id": "1", "name": "R Sharma"}, {"id": "2", "name": "R Sharma"}, {"id": "1", "name": "R Sharma"},
+               {"name": "No Id"}, {"name": "No Id"}]
+    table, index = pack_players(players, fields=("id", "name"))
+    assert table["rows"] == [["1", "R Sharma"], ["2", "R Sharma"], [None, "No Id"]]
+    assert index == {"R Sharma": 0, "No Id": 2}
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("identity") is None
+
+
+def test_compressed_response_reports_sizes():
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/teams")
+    def teams():
+        return FastJSONResponse(pack_teams(TEAMS * 20, PLAYERS))
+
+    app.add_middleware(CompressionMiddleware)
+    client = TestClient(app)
+
+    plain = client.get("/teams", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert int(plain.headers["x-body-bytes"]) == len(plain.content)
+    assert float(plain.headers["x-serialize-ms"]) >= 0
+
+    compressed = client.get("/teams", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    # The client decodes the body transparently
+    assert orjson.loads(compressed.content) == orjson.loads(plain.content)
+    assert int(compressed.headers["content-length"]) < int(compressed.headers["x-body-bytes"])
+
+
+def test_head_keeps_the_get_content_length():
+    from response_cache import BodyCache, CacheRule, ResponseCacheMiddleware
+
+    app = FastAPI()
+
+    @app.api_route("/teams", methods=["GET", "HEAD"])
+    def teams():
+        return FastJSONResponse(pack_teams(TEAMS * 20, PLAYERS))
+
+    # The cache answers HEAD with the full length and an empty body, as it is meant to
+    app.add_middleware(ResponseCacheMiddleware, rules=[CacheRule("/teams", "no-cache")], cache=BodyCache())
+    app.add_middleware(CompressionMiddleware)
+    client = TestClient(app)
+
+    body = client.get("/teams", headers={"Accept-Encoding": "identity"}).content
+    head = client.head("/teams", headers={"Accept-Encoding": "gzip"})
+    assert head.status_code == 200
+    assert int(head.headers["content-length"]) == len(body) > 0
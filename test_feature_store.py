@@ -0,0 +1,141 @@
+import asyncio
+import datetime
+
+import joblib
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import feature_store
+from database import Base, Match, Player
+from feature_store import FEATURE_COLUMNS, PlayerFeature, feature_rows, get_feature_vectors, get_training_rows
+from performances import record_performances
+
+DAY = datetime.timedelta(days=1)
+START = datetime.date(2024, 1, 1)
+
+
+def _performance(n, player):
+    return {"match_id": f"m{n}", "player_id": player,
+            "runs_scored": (n * 13 + len(player) * 7) % 70, "wickets_taken": n % 3, "catches": (n + 1) % 2}
+
+
+async def _setup(tmp_path, name):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    async with Session() as session:
+        session.add_all([Player(id=p, name=p, team="A") for p in ("p1", "p22")])
+        session.add_all([Match(id=f"m{n}", team1="A", team2="B", date=START + n * DAY * 3) for n in range(10)])
+        await session.commit()
+    return engine, Session
+
+
+async def _stored_rows(session):
+    rows = (await session.execute(select(PlayerFeature).order_by(PlayerFeature.player_id, PlayerFeature.as_of_date))).scalars()
+    return [
+        (row.player_id, row.as_of_date, row.matches_played, *[round(getattr(row, col), 9) for col in FEATURE_COLUMNS])
+        for row in rows
+    ]
+
+
+def test_incremental_refresh_matches_full_rebuild(tmp_path):
+    async def scenario():
+        engine, Session = await _setup(tmp_path, "incremental.db")
+        async with Session() as session:
+            # Late-arriving history: match 2 is recorded after the later ones
+            for n in [0, 1, 3, 4, 5, 2, 6, 7, 8, 9]:
+                await record_performances(session, [_performance(n, "p1"), _performance(n, "p22")])
+            await session.commit()
+            incremental = await _stored_rows(session)
+
+            await feature_store.rebuild_all(session)
+            await session.commit()
+            rebuilt = await _stored_rows(session)
+        await engine.dispose()
+        return incremental, rebuilt
+
+    incremental, rebuilt = asyncio.run(scenario())
+    assert len(rebuilt) == 20
+    assert incremental == rebuilt
+
+
+def test_refresh_reads_only_the_rolling_window_of_history(tmp_path):
+    async def scenario():
+        engine, Session = await _setup(tmp_path, "windowed.db")
+        async with Session() as session:
+            for n in range(9):
+                await record_performances(session, [_performance(n, "p1")])
+            await session.commit()
+
+            statements = []
+            listener = lambda conn, cursor, statement, params, context, many: statements.append((statement, params))
+            event.listen(engine.sync_engine, "before_cursor_execute", listener)
+            await record_performances(session, [_performance(9, "p1")])
+            event.remove(engine.sync_engine, "before_cursor_execute", listener)
+            await session.commit()
+            refreshed = await _stored_rows(session)
+            await feature_store.rebuild_all(session)
+            rebuilt = await _stored_rows(session)
+        await engine.dispose()
+        return statements, refreshed, rebuilt
+
+    statements, refreshed, rebuilt = asyncio.run(scenario())
+    assert refreshed == rebuilt
+    reads = [params for statement, params in statements
+             if "FROM match_performances JOIN matches" in statement and "GROUP BY" in statement]
+    # Only m5-m8, the four days before m9 in the rolling window, and m9 itself
+    assert len(reads) == 1 and str(START + 15 * DAY) in map(str, reads[0])
+
+
+def test_vectors_are_point_in_time_and_match_training_rows(tmp_path):
+    async def scenario():
+        engine, Session = await _setup(tmp_path, "pit.db")
+        async with Session() as session:
+            await record_performances(session, [_performance(n, "p1") for n in range(4)])
+            await session.commit()
+            match_dates = {f"m{n}": START + n * DAY * 3 for n in range(4)}
+
+            on_first_day = await get_feature_vectors(session, ["p1"], match_dates["m0"])
+            before_m2 = await get_feature_vectors(session, ["p1", "unknown"], match_dates["m2"])
+            day_after_m1 = await get_feature_vectors(session, ["p1"], match_dates["m1"] + DAY)
+            training = await get_training_rows(session)
+        await engine.dispose()
+        return on_first_day, before_m2, day_after_m1, training
+
+    on_first_day, before_m2, day_after_m1, training = asyncio.run(scenario())
+    # Nothing on or after the as-of date is visible
+    assert on_first_day == {}
+    assert before_m2 == day_after_m1
+    assert before_m2["p1"]["matches_played"] == 2
+
+    # Training pairs each performance with exactly what inference serves as of that match
+    m2 = next(row for row in training if row["match_id"] == "m2")
+    assert [m2[col] for col in FEATURE_COLUMNS] == feature_rows(before_m2, ["p1"])[0]
+    m0 = next(row for row in training if row["match_id"] == "m0")
+    assert [m0[col] for col in FEATURE_COLUMNS] == feature_rows(before_m2, ["unknown"])[0] == [0.0] * len(FEATURE_COLUMNS)
+
+
+def test_train_from_store_records_the_store_schema(tmp_path):
+    import train
+
+    async def seed():
+        engine, Session = await _setup(tmp_path, "train.db")
+        async with Session() as session:
+            session.add_all([Player(id=f"q{i}", name=f"q{i}", team="B") for i in range(6)])
+            await session.flush()
+            for n in range(10):
+                await record_performances(session, [_performance(n, p) for p in ["p1", "p22"] + [f"q{i}" for i in range(6)]])
+            await session.commit()
+        # Pooled connections belong to this event loop; training runs its own
+        await engine.dispose()
+        return engine, Session
+
+    engine, Session = asyncio.run(seed())
+    model_path = str(tmp_path / "model.pkl")
+    artifact = train.train_from_store(model_path, n_estimators=5, session_factory=Session)
+    asyncio.run(engine.dispose())
+
+    assert artifact["features"] == FEATURE_COLUMNS
+    assert artifact["rows_trained"] == 80
+    assert joblib.load(model_path)["features"] == FEATURE_COLUMNS
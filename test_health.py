@@ -0,0 +1,44 @@
+import asyncio
+
+from health import HealthCheck, HealthMonitor
+
+
+def test_readiness_reflects_critical_checks_only():
+    async def slow_database():
+        await asyncio.sleep(5)
+        return {"ok": True}
+
+    monitor = HealthMonitor([
+        HealthCheck("database", slow_database),
+        HealthCheck("cache", lambda: {"ok": False}, critical=False),
+    ], interval=10, timeout=0.05)
+
+    assert monitor.readiness()["status"] == "not_ready"
+    snapshot = asyncio.run(monitor.refresh())
+
+    assert snapshot["status"] == "not_ready"
+    assert snapshot["checks"]["database"]["error"] == "timeout"
+
+    monitor.checks[0] = HealthCheck("database", lambda: {"ok": True})
+    asyncio.run(monitor.refresh())
+    assert monitor.is_ready()
+    assert monitor.is_database_ok()
+
+
+def test_stale_snapshot_is_not_ready():
+    monitor = HealthMonitor([HealthCheck("database", lambda: {"ok": True})], interval=10)
+    asyncio.run(monitor.refresh())
+    monitor._refreshed_at -= 60
+    readiness = monitor.readiness()
+    assert readiness["status"] == "not_ready"
+    assert "old" in readiness["reason"]
+
+
+def test_failing_check_is_reported():
+    def broken():
+        raise RuntimeError("boom")
+
+    monitor = HealthMonitor([HealthCheck("model", broken)])
+    snapshot = asyncio.run(monitor.refresh())
+    assert snapshot["checks"]["model"] == {"ok": False, "error": "boom", "critical": True,
+                                           "duration_ms": snapshot["checks"]["model"]["duration_ms"]}
@@ -0,0 +1,147 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import Base
+from jobs import DONE, FAILED, RUNNING, Job, JobManager, JobResult, _generate_team_chunk, input_hash
+from lineups import LineupBatch
+
+PARAMS = {
+    "ranked_players": [{"player": f"{team}{n}", "score": float(n)} for team in "AB" for n in range(11)],
+    "winner_team": "A",
+    "team1": "A",
+    "team2": "B",
+    "team1_players": [f"A{n}" for n in range(11)],
+    "team2_players": [f"B{n}" for n in range(11)],
+    "max_combinations": 450,
+    "seed": 7,
+}
+
+
+async def _run_jobs(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    manager = JobManager(async_sessionmaker(engine, expire_on_commit=False), workers=2)
+
+    # Submitted before the workers start, like jobs left queued at shutdown
+    job_id, deduplicated = await manager.submit("generate_teams", PARAMS)
+    again, again_deduplicated = await manager.submit("generate_teams", PARAMS)
+
+    await manager.start()
+    try:
+        lines = [line async for line in manager.stream_results(job_id)]
+        status = await manager.get(job_id)
+        page = await manager.results_page(job_id, offset=400, limit=100)
+    finally:
+        await manager.stop()
+        await engine.dispose()
+    return job_id, deduplicated, again, again_deduplicated, lines, status, page
+
+
+def test_job_is_deduplicated_persisted_and_streamed(tmp_path):
+    job_id, deduplicated, again, again_deduplicated, lines, status, page = asyncio.run(_run_jobs(tmp_path))
+
+    assert not deduplicated
+    assert again == job_id and again_deduplicated
+
+    assert status["status"] == DONE
+    assert status["progress"] == status["total"] == 450
+    assert len(lines) == 450
+
+    assert len(page["items"]) == 50
+    assert page["next_offset"] is None
+    assert all(len(team["players"]) == 11 for team in page["items"])
+
+
+def test_team_chunks_are_seeded_lineup_batches():
+    batch = _generate_team_chunk(PARAMS, (200, 50))
+    assert isinstance(batch, LineupBatch) and len(batch) == 50
+    assert batch.validate().all()
+    assert list(batch) == list(_generate_team_chunk(PARAMS, (200, 50)))
+    assert list(batch) != list(_generate_team_chunk(PARAMS, (0, 50)))
+    assert all(set(team["players"]) & {f"B{n}" for n in range(11)} for team in batch)
+
+
+async def _session_factory(tmp_path, name):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+
+def _job(job_id, status, **values):
+    params = {**PARAMS, "max_combinations": 20, "seed": job_id}
+    return Job(id=job_id, kind="generate_teams", input_hash=input_hash("generate_teams", params),
+               params=json.dumps(params), status=status, **values)
+
+
+async def _reclaim(tmp_path):
+    engine, Session = await _session_factory(tmp_path, "leases.db")
+    now = datetime.utcnow()
+    async with Session() as session:
+        session.add_all([
+            _job("dead", RUNNING, owner="gone:1", lease_expires_at=now - timedelta(seconds=5)),
+            _job("alive", RUNNING, owner="busy:2", lease_expires_at=now + timedelta(minutes=5)),
+            JobResult(job_id="dead", seq=0, payload="{}"),
+        ])
+        await session.commit()
+
+    manager = JobManager(Session, workers=1)
+    await manager.start()
+    try:
+        for _ in range(200):
+            if (await manager.get("dead"))["status"] == DONE:
+                break
+            await asyncio.sleep(0.05)
+        dead, alive = await manager.get("dead"), await manager.get("alive")
+        async with Session() as session:
+            owners = dict((await session.execute(select(Job.id, Job.owner))).all())
+            results = (await session.execute(
+                select(func.count()).select_from(JobResult).where(JobResult.job_id == "dead")
+            )).scalar_one()
+    finally:
+        await manager.stop()
+        await engine.dispose()
+    return manager.owner_id, dead, alive, owners, results
+
+
+def test_only_jobs_with_expired_leases_are_reclaimed(tmp_path):
+    owner_id, dead, alive, owners, results = asyncio.run(_reclaim(tmp_path))
+    assert dead["status"] == DONE and owners["dead"] == owner_id
+    # The stale partial result was discarded before the job ran again
+    assert results == dead["result_count"] == 20
+    # Another worker's live job is left alone
+    assert alive["status"] == RUNNING and owners["alive"] == "busy:2"
+
+
+async def _purge(tmp_path):
+    engine, Session = await _session_factory(tmp_path, "retention.db")
+    old = datetime.utcnow() - timedelta(days=30)
+    async with Session() as session:
+        session.add_all([
+            _job("old-done", DONE, updated_at=old),
+            _job("old-failed", FAILED, updated_at=old),
+            _job("old-running", RUNNING, updated_at=old),
+            _job("new-done", DONE),
+            *[JobResult(job_id=job_id, seq=0, payload="{}") for job_id in ("old-done", "new-done")],
+        ])
+        await session.commit()
+
+    manager = JobManager(Session, retention_hours=24)
+    purged = await manager.purge_finished()
+    async with Session() as session:
+        jobs = set((await session.execute(select(Job.id))).scalars())
+        results = set((await session.execute(select(JobResult.job_id))).scalars())
+    await engine.dispose()
+    return purged, jobs, results
+
+
+def test_finished_jobs_are_purged_after_retention(tmp_path):
+    purged, jobs, results = asyncio.run(_purge(tmp_path))
+    assert purged == 2
+    assert jobs == {"old-running", "new-done"}
+    assert results == {"new-done"}
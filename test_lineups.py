@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+import pytest
+
+from benchmark import make_squad
+from fast_json import pack_teams
+from lineups import InvalidLineupsError, LineupBatch, generate_lineups
+from memory import BUDGETS, track
+from scoring import lineup_points
+from team_generator import generate_team
+
+
+def _inputs(seed=1):
+    rng = random.Random(seed)
+    squad = make_squad(rng, "A", "B", 26)
+    ranked = sorted(({"player": p["name"], "score": rng.random()} for p in squad), key=lambda p: -p["score"])
+    team1 = [p["name"] for p in squad if p["team"] == "A"]
+    team2 = [p["name"] for p in squad if p["team"] == "B"]
+    return squad, ranked, team1, team2
+
+
+def test_round_trip_and_scoring_match_dict_lineups():
+    squad, ranked, team1, team2 = _inputs()
+    teams = generate_team(ranked, "A", "A", "B", team1, team2, max_combinations=200)
+    batch = LineupBatch.from_lineups(teams, squad)
+
+    assert batch.matrix.dtype == np.uint8 and batch.matrix.shape == (200, 11)
+    assert batch[0] == teams[0] and list(batch[:5].iter_dicts()) == teams[:5]
+    assert batch.validate().all()
+
+    points = {p["name"]: float(n) for n, p in enumerate(squad)}
+    totals = batch.score(points)
+    expected = [lineup_points(t["players"], t["captain"], t["vice_captain"], points) for t in teams]
+    assert np.allclose(totals, expected)
+    best = batch.top(3)
+    assert best.scores["total_points"].tolist() == sorted(totals.tolist(), reverse=True)[:3]
+    assert best.names == batch.names
+
+    assert batch.to_packed() == pack_teams([batch[i] for i in range(len(batch))], squad)
+
+
+def test_vectorized_validation_flags_bad_rows():
+    squad, *_ = _inputs()
+    names = [p["name"] for p in squad]
+    good = {"players": names[:11], "captain": names[0], "vice_captain": names[1]}
+    batch = LineupBatch.from_lineups([
+        good,
+        {**good, "players": names[:10] + [names[0]]},
+        {**good, "vice_captain": names[0]},
+        {**good, "captain": names[20]},
+    ])
+    assert batch.validate().tolist() == [True, False, False, False]
+    with pytest.raises(InvalidLineupsError):
+        batch.ensure_valid()
+    batch[batch.validate()].ensure_valid()
+
+
+def test_teams_are_built_only_when_serialized():
+    squad, ranked, team1, team2 = _inputs()
+    built = []
+
+    def factory(**fields):
+        built.append(fields)
+        return fields
+
+    batch = generate_lineups(ranked, "A", "A", "B", team1, team2, 1000, seed=3)
+    teams = batch.to_teams(factory)
+    assert built == []
+    first = next(teams)
+    assert len(built) == 1 and first["captain"] == first["players"][0]
+
+
+def test_generated_batch_follows_generator_rules_within_budget():
+    squad, ranked, team1, team2 = _inputs()
+    count = 100_000
+    with track("generate_lineups", budget=BUDGETS["generate_lineups"].for_items(count)):
+        batch = generate_lineups(ranked, "A", "A", "B", team1, team2, count, seed=7)
+
+    assert len(batch) == count and batch.validate().all()
+    assert batch.nbytes == count * 13
+    teams = np.array([[batch.names[i] in team1 for i in row] for row in batch.matrix[:500]])
+    assert (teams.sum(axis=1) == 8).all()
+    scores = np.array([p["fantasy_points"] for p in batch.players])[batch.matrix[:500]]
+    assert (np.diff(scores, axis=1) <= 0).all()
@@ -0,0 +1,130 @@
+import asyncio
+
+import orjson
+
+from live_updates import LiveHub
+
+
+def _data(event: bytes):
+    fields = dict(line.split(": ", 1) for line in event.decode().strip().split("\n"))
+    return fields["event"], orjson.loads(fields["data"])
+
+
+async def _next(stream):
+    return await asyncio.wait_for(stream.__anext__(), timeout=1)
+
+
+def test_deltas_contain_only_changed_players():
+    async def scenario():
+        hub = LiveHub()
+        hub.publish("m1", {"p1": {"fantasy_points": 10.0}, "p2": {"fantasy_points": 20.0}})
+        streams = [hub.stream("m1") for _ in range(3)]
+        snapshots = [await _next(s) for s in streams]
+
+        assert hub.publish("m1", {"p1": {"fantasy_points": 10.0}, "p2": {"fantasy_points": 20.0}}) is None
+        hub.publish("m1", {"p1": {"fantasy_points": 10.0}, "p2": {"fantasy_points": 25.0}})
+        deltas = [await _next(s) for s in streams]
+        for s in streams:
+            await s.aclose()
+        return hub, snapshots, deltas
+
+    hub, snapshots, deltas = asyncio.run(scenario())
+    event, snapshot = _data(snapshots[0])
+    assert event == "snapshot" and set(snapshot["players"]) == {"p1", "p2"}
+
+    # Serialized once, shared by every subscriber
+    assert deltas[0] is deltas[1] is deltas[2]
+    event, delta = _data(deltas[0])
+    assert event == "delta"
+    assert delta["changed"] == {"p2": {"fantasy_points": 25.0}}
+    assert hub.subscriber_count == 0
+
+
+def test_slow_subscriber_is_resynced_then_dropped():
+    async def scenario():
+        hub = LiveHub(queue_size=2)
+        stream = hub.stream("m1")
+        await _next(stream)
+
+        for n in range(3):
+            hub.publish("m1", {"p1": {"fantasy_points": float(n)}})
+        # Backlog replaced by one snapshot of the latest state
+        event, payload = _data(await _next(stream))
+        assert event == "snapshot" and payload["players"]["p1"]["fantasy_points"] == 2.0
+
+        for n in range(20):
+            hub.publish("m1", {"p1": {"fantasy_points": float(100 + n)}})
+        remaining = [chunk async for chunk in stream]
+        return hub, remaining
+
+    hub, remaining = asyncio.run(scenario())
+    assert hub.stats["dropped"] == 1
+    assert hub.subscriber_count == 0
+    assert len(remaining) <= 2
+
+
+def test_snapshot_is_serialized_once_per_version():
+    hub = LiveHub()
+    hub.publish("m1", {"p1": {"fantasy_points": 1.0}})
+    channel = hub.channels["m1"]
+    first = channel.snapshot()
+    assert channel.snapshot() is first
+
+    hub.publish("m1", {"p1": {"fantasy_points": 2.0}})
+    assert channel.snapshot() is not first
+    assert _data(channel.snapshot())[1]["players"]["p1"]["fantasy_points"] == 2.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_idle_channels_are_evicted_and_versions_never_repeat():
+    async def scenario():
+        clock = FakeClock()
+        hub = LiveHub(idle_seconds=600, clock=clock, evict_interval=60)
+        hub.publish("m1", {"p1": {"fantasy_points": 1.0}})
+        stream = hub.stream("m1")
+        old_version = _data(await _next(stream))[1]["version"]
+        await stream.aclose()
+
+        # Kept while a reconnect could still resume, then forgotten
+        clock.now += 300
+        hub.publish("m2", {"p1": {"fantasy_points": 1.0}})
+        kept = "m1" in hub.channels
+        clock.now += 400
+        hub.publish("m2", {"p1": {"fantasy_points": 2.0}})
+        evicted = "m1" not in hub.channels
+
+        new_version = hub.publish("m1", {"p1": {"fantasy_points": 1.0}})
+        return hub, kept, evicted, old_version, new_version
+
+    hub, kept, evicted, old_version, new_version = asyncio.run(scenario())
+    assert kept and evicted
+    assert hub.stats["evicted"] == 1
+    assert new_version > old_version
+
+
+def test_only_this_hubs_event_ids_skip_the_snapshot():
+    async def scenario():
+        hub, other = LiveHub(instance="w1"), LiveHub(instance="w2")
+        version = hub.publish("m1", {"p1": {"fantasy_points": 1.0}})
+        # Another worker's sequence can reach the same number
+        other.publish("m1", {"p9": {"fantasy_points": 9.0}})
+        first = {}
+        for name, last_event_id in [("current", f"w1-{version}"), ("other_worker", f"w2-{version}"),
+                                    ("bare", str(version)), ("stale", "w1-0")]:
+            stream = hub.stream("m1", last_event_id, heartbeat=0.05)
+            first[name] = await _next(stream)
+            await stream.aclose()
+        return version, first
+
+    version, first = asyncio.run(scenario())
+    assert first["current"] == b": keep-alive\n\n"
+    for name in ("other_worker", "bare", "stale"):
+        event_id = first[name].decode().split("\n")[0]
+        assert event_id == f"id: w1-{version}" and _data(first[name])[0] == "snapshot"
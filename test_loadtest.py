@@ -0,0 +1,65 @@
+import asyncio
+import random
+
+import httpx
+import pytest
+
+from loadtest import CricketAPIStub, RouteStats, _prepare_state, compare, drive, parse_mix, percentile
+
+
+def test_percentiles_use_nearest_rank():
+    values = [float(n) for n in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_route_latencies_are_a_bounded_uniform_sample():
+    stats = RouteStats(limit=1000)
+    # A run that slows down: a biased sample would miss the slow tail
+    for n in range(20_000):
+        stats.record("200", n / 1000, ok=True)
+    summary = stats.summary(elapsed=1.0)
+    assert len(stats.latencies) == 1000 and stats.requests == 20_000
+    assert summary["max_ms"] == 19_999.0
+    assert abs(summary["p50_ms"] - 10_000) < 1_000
+    assert abs(summary["p95_ms"] - 19_000) < 500
+
+
+def test_export_scenario_aborts_when_the_job_fails():
+    def handler(request):
+        if request.method == "POST":
+            return httpx.Response(202, json={"job_id": "j1"})
+        return httpx.Response(200, json={"job_id": "j1", "status": "failed", "error": "model not loaded"})
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://app") as client:
+            await _prepare_state(client, random.Random(0), ["m1"], {"export": 1})
+
+    with pytest.raises(RuntimeError, match="failed: model not loaded"):
+        asyncio.run(scenario())
+
+
+def test_mix_parsing():
+    assert parse_mix("matches=3, prediction=1") == {"matches": 3.0, "prediction": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("nope=1")
+
+
+def test_drive_reports_per_route_stats():
+    # The stub answers every GET, so it can stand in for the matches route
+    with CricketAPIStub() as stub:
+        info = httpx.get(f"{stub.url}/match_info", params={"id": "m1"}).json()
+        assert info["data"]["teams"] and info == stub.match_info("m1")
+
+        report = asyncio.run(drive(stub.url, {"matches": 1}, concurrency=4, duration=0.5,
+                                   warmup=0.1, rate=None, match_ids=["m1"]))
+    matches = report["routes"]["matches"]
+    assert matches["requests"] > 0 and matches["error_rate"] == 0
+    assert matches["statuses"] == {"200": matches["requests"]}
+    assert matches["p50_ms"] <= matches["p95_ms"] <= matches["p99_ms"] <= matches["max_ms"]
+
+    slower = {"routes": {"matches": {**matches, "p95_ms": matches["p95_ms"] * 2}}}
+    assert compare(slower, report)[0]["regression"]
+    assert not compare(report, report)[0]["regression"]
@@ -0,0 +1,58 @@
+import logging
+import queue
+
+from logging_config import DroppingQueueHandler, SamplingFilter
+
+
+def _record(name="hot.path", level=logging.INFO):
+    return logging.LogRecord(name, level, __file__, 1, "value %s", (1,), None)
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=3))
+    for _ in range(10):
+        handler.handle(_record())
+    assert handler.queue.qsize() == 3
+    assert handler.dropped == 7
+
+
+def test_sampling_limits_info_but_keeps_errors():
+    sampler = SamplingFilter(rate=0.001, burst=5)
+    kept = sum(sampler.filter(_record()) for _ in range(100))
+    assert kept == 5
+    assert sampler.suppressed[("hot.path", logging.INFO)] == 95
+
+    assert all(sampler.filter(_record(level=logging.ERROR)) for _ in range(100))
+    assert all(sampler.filter(_record(name="other")) for _ in range(5))
+
+
+def test_per_logger_override_disables_sampling():
+    sampler = SamplingFilter(rate=0.001, burst=1, overrides={"audit": 0})
+    assert all(sampler.filter(_record(name="audit")) for _ in range(50))
+
+
+def test_shutdown_puts_the_real_handlers_back(tmp_path, monkeypatch):
+    import logging_config
+
+    monkeypatch.chdir(tmp_path)
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    try:
+        logging_config.setup_logging()
+        assert any(isinstance(h, DroppingQueueHandler) for h in root.handlers)
+        logging.getLogger("before").warning("queued record")
+
+        logging_config.shutdown_logging()
+        assert not any(isinstance(h, DroppingQueueHandler) for h in root.handlers)
+        logging.getLogger("after").warning("direct record")
+        for handler in root.handlers:
+            handler.flush()
+        log = (tmp_path / "logs" / "app.log").read_text()
+        assert "queued record" in log and "direct record" in log
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
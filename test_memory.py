@@ -0,0 +1,113 @@
+import asyncio
+import datetime
+import os
+import random
+
+import numpy as np
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import memory
+from batch_predictions import predict_matches
+from benchmark import make_lineups, make_squad
+from database import Base, Match, Player
+from export_csv import export_team_csv
+from memory import BUDGETS, MemoryBudgetExceeded, track
+from team_generator import generate_team
+
+
+def test_track_reports_peak_retained_and_sites():
+    with track("alloc") as report:
+        kept = [bytearray(1024) for _ in range(1000)]
+        temporary = bytearray(4 * 1024 * 1024)
+        del temporary
+    assert report.peak_bytes >= 4 * 1024 * 1024 + 1000 * 1024
+    assert 1000 * 1024 <= report.retained_bytes < 2 * 1024 * 1024
+    assert "test_memory.py" in report.top_sites[0]["site"]
+    assert memory.recent_reports()[0]["name"] == "alloc"
+
+    with pytest.raises(MemoryBudgetExceeded):
+        with track("over", budget=1024):
+            kept.append(bytearray(64 * 1024))
+
+
+def test_pipelines_are_tracked_when_enabled(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(memory, "MEMORY_TRACKING", True)
+    squad = make_squad(random.Random(2), "A", "B", 26)
+    ranked = [{"player": p["name"], "score": 1.0} for p in squad]
+    team1 = [p["name"] for p in squad if p["team"] == "A"]
+    team2 = [p["name"] for p in squad if p["team"] == "B"]
+    export_team_csv(generate_team(ranked, "A", "A", "B", team1, team2, max_combinations=50), "tracked")
+    names = [report["name"] for report in memory.recent_reports()[:2]]
+    assert names == ["export_team_csv", "generate_team"]
+
+
+class _Model:
+    def __init__(self, size):
+        self.weights = bytes(size)
+
+
+def test_model_sizes_are_cached_per_live_object():
+    small, large = _Model(1000), _Model(100_000)
+    assert memory.model_size_bytes(small) < 2000 < memory.model_size_bytes(large)
+    small.weights = bytes(50_000)
+    # Cached for the object's lifetime, and forgotten with it
+    assert memory.model_size_bytes(small) < 2000
+    del small
+    assert len(memory._model_sizes) == 1
+    assert memory.model_size_bytes([1, 2, 3]) > 0
+
+
+def test_memory_stats_report_worker_rss():
+    stats = memory.memory_stats()
+    assert stats["pid"] == os.getpid()
+    assert stats["rss_bytes"] is None or stats["rss_bytes"] > 0
+
+
+@pytest.mark.parametrize("lineups", [1_000, 20_000])
+def test_generate_team_budget(lineups):
+    rng = random.Random(1)
+    squad = make_squad(rng, "A", "B", 26)
+    ranked = [{"player": p["name"], "score": rng.random()} for p in squad]
+    team1 = [p["name"] for p in squad if p["team"] == "A"]
+    team2 = [p["name"] for p in squad if p["team"] == "B"]
+    with track("generate_team", budget=BUDGETS["generate_team"].for_items(lineups)):
+        teams = generate_team(ranked, "A", "A", "B", team1, team2, max_combinations=lineups)
+    assert len(teams) == lineups
+
+
+def test_export_budget(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    lineups = make_lineups(random.Random(1), make_squad(random.Random(2), "A", "B", 26), 20_000)
+    with track("export_team_csv", budget=BUDGETS["export_team_csv"].for_items(len(lineups))):
+        export_team_csv(lineups, "budget")
+
+
+def test_predict_matches_budget(tmp_path):
+    teams = [f"T{n}" for n in range(10)]
+    match_ids = [f"m{n}" for n in range(50)]
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'memory.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+        async with Session() as session:
+            session.add_all([Player(id=f"{t}-{n}", name=f"{t} {n}", team=t, batting_average=20.0, bowling_average=30.0)
+                             for t in teams for n in range(13)])
+            session.add_all([Match(id=match_id, team1=teams[n % 10], team2=teams[(n + 1) % 10],
+                                   date=datetime.date(2024, 1, 1) + datetime.timedelta(days=n))
+                             for n, match_id in enumerate(match_ids)])
+            await session.commit()
+        predict = lambda features: np.ones(len(features))
+        try:
+            # Warm SQLAlchemy's statement caches so they are not charged to the pipeline
+            await predict_matches(match_ids[:2], predict=predict, persist=False, session_factory=Session)
+            with track("predict_matches", budget=BUDGETS["predict_matches"].for_items(len(match_ids) * 26)):
+                return await predict_matches(match_ids, predict=predict, persist=False, session_factory=Session)
+        finally:
+            await engine.dispose()
+
+    results = asyncio.run(run())
+    assert len(results) == 50 and all("players" in result for result in results)
@@ -0,0 +1,148 @@
+import asyncio
+import subprocess
+import sys
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import Base, Player
+from player_identity import PlayerIndex, normalize_name, player_index, stable_player_id
+
+
+def _index():
+    index = PlayerIndex()
+    index.add_many([
+        ("vk", "Virat Kohli", "India"),
+        ("rs", "Rohit Sharma", "India"),
+        ("as", "Abhishek Sharma", "India"),
+        ("ms", "Mitchell Starc", "Australia"),
+        ("md", "M.S. Dhoni", "India"),
+    ])
+    return index
+
+
+def test_names_resolve_through_normal_form_aliases_and_trigrams():
+    index = _index()
+    assert normalize_name(" José  BUTTLER-jr ") == "jose buttler jr"
+    assert normalize_name("MS Dhoni") == normalize_name("m. s. dhoni") == "ms dhoni"
+
+    assert index.resolve("virat  kohli").method == "exact"
+    assert index.resolve("MS Dhoni").player_id == "md"
+    assert [index.resolve(name).player_id for name in ["V Kohli", "Kohli Virat", "Starc"]] == ["vk", "vk", "ms"]
+    fuzzy = index.resolve("Virat Kholi")
+    assert fuzzy.player_id == "vk" and fuzzy.method == "fuzzy" and fuzzy.score < 1
+
+    # "sharma" is two players, and a query's own surname is not an alias for it
+    assert index.resolve("Sharma") is None
+    assert index.resolve("Rahul Kohli") is None
+    assert index.resolve("Nobody Here") is None
+    index.add("ps", "Pat Sharma", "Australia")
+    assert index.resolve("Sharma", team="Australia").player_id == "ps"
+
+
+def test_renamed_players_lose_their_old_name():
+    index = _index()
+    index.add("ts", "Tom Smith", "England")
+    assert index.resolve("Tom Smyth").player_id == "ts"
+    index.add("ts", "John Brown", "Wales")
+    assert [index.resolve(name) for name in ["Tom Smith", "Smith", "T Smith", "Tom Smyth"]] == [None] * 4
+    assert index.resolve("Jon Brown").player_id == "ts"
+    assert index.resolve("Brown", team="Wales").player_id == "ts"
+    assert index.stats()["players"] == 6
+
+
+def test_unmatched_names_get_ids_that_survive_restarts():
+    script = "from player_identity import player_index; print(player_index.resolve_id('Unknown Bowler'))"
+    ids = {subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout.strip()
+           for _ in range(2)}
+    assert ids == {stable_player_id("unknown  bowler")}
+    assert _index().resolve_id("Virat Kohli") == "vk"
+
+
+async def _load_and_insert(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'players.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with Session() as session:
+        session.add(Player(id="jb", name="Jasprit Bumrah", team="India"))
+        await session.commit()
+        await player_index.load(session)
+        loaded = player_index.resolve_id("J Bumrah")
+
+        session.add(Player(id="sg", name="Shubman Gill", team="India"))
+        await session.flush()
+        before_commit = player_index.resolve("Shubman Gill")
+        await session.commit()
+        after_commit = player_index.resolve_id("Shubman Gil")
+
+        session.add(Player(id="xx", name="Rolled Back", team="India"))
+        await session.flush()
+        await session.rollback()
+        rolled_back = player_index.resolve("Rolled Back")
+
+        (await session.get(Player, "sg")).name = "Prince Gill"
+        await session.commit()
+        renamed = player_index.resolve("Shubman Gill"), player_index.resolve_id("Prince Gill")
+    await engine.dispose()
+    player_index.clear()
+    return loaded, before_commit, after_commit, rolled_back, renamed
+
+
+def test_index_loads_from_players_and_follows_committed_inserts(tmp_path):
+    loaded, before_commit, after_commit, rolled_back, renamed = asyncio.run(_load_and_insert(tmp_path))
+    assert loaded == "jb"
+    assert before_commit is None
+    assert after_commit == "sg"
+    assert rolled_back is None
+    assert renamed == (None, "sg")
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _refresh_and_retry(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'refresh.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    clock = _Clock()
+    index = PlayerIndex(refresh_interval=30, reload_interval=3600, clock=clock)
+    attempts = []
+
+    def flaky_sessions():
+        attempts.append(clock.now)
+        if len(attempts) <= 2:
+            raise OSError("database is down")
+        return Session()
+
+    for clock.now in [0, 0.5, 1, 2, 3]:
+        await index.ensure_loaded(flaky_sessions)
+    failed_attempts, loaded_after_retry = list(attempts), index.loaded
+
+    # Inserted by another worker or a bulk load, so no ORM event reaches this index
+    async with engine.begin() as conn:
+        await conn.execute(text("INSERT INTO players (id, name, team) VALUES ('kw', 'Kane Williamson', 'NZ')"))
+    clock.now = 10
+    await index.ensure_loaded(Session)
+    before_refresh = index.resolve("Kane Williamson")
+    clock.now = 40
+    await index.ensure_loaded(Session)
+    after_refresh = index.resolve_id("K Williamson")
+    await engine.dispose()
+    return failed_attempts, loaded_after_retry, before_refresh, after_refresh
+
+
+def test_failed_loads_are_retried_and_new_rows_are_picked_up(tmp_path):
+    attempts, loaded, before_refresh, after_refresh = asyncio.run(_refresh_and_retry(tmp_path))
+    # Backoff of 1s then 2s after the first and second failures
+    assert attempts == [0, 1, 3]
+    assert loaded
+    assert before_refresh is None
+    assert after_refresh == "kw"
@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import prediction_writer as writer_module
+from database import Base, Prediction
+from live_updates import live_hub
+from prediction_writer import PredictionWriteQueue, cache_predictions
+from response_cache import resource_versions
+
+
+def _rows(count, start=0):
+    return [{"player_id": f"p{n}", "predicted_score": float(n), "ownership_percent": None, "mindset": None}
+            for n in range(start, start + count)]
+
+
+async def _database(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'predictions.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def _count(Session):
+    async with Session() as session:
+        return (await session.execute(select(func.count()).select_from(Prediction))).scalar()
+
+
+def test_rows_are_written_in_batches_and_drained_on_stop(tmp_path):
+    async def scenario():
+        engine, Session = await _database(tmp_path)
+        writer = PredictionWriteQueue(Session, batch_size=3, flush_interval=60)
+        await writer.start()
+        await writer.enqueue(_rows(7))
+        await asyncio.sleep(0.05)
+        # Two full batches are written; the last row waits for more or for the interval
+        during = await _count(Session)
+        await writer.stop()
+        after = await _count(Session)
+        await engine.dispose()
+        return writer.stats, during, after
+
+    stats, during, after = asyncio.run(scenario())
+    assert during == 6
+    assert after == 7
+    assert stats == {"enqueued": 7, "written": 7, "batches": 3, "failed": 0}
+
+
+def test_partial_batch_is_flushed_after_the_interval(tmp_path):
+    async def scenario():
+        engine, Session = await _database(tmp_path)
+        writer = PredictionWriteQueue(Session, batch_size=100, flush_interval=0.05)
+        await writer.start()
+        await writer.enqueue(_rows(2))
+        await asyncio.sleep(0.3)
+        written = await _count(Session)
+        await writer.stop()
+        await engine.dispose()
+        return written
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_failed_flushes_are_retried_then_counted(tmp_path):
+    attempts = []
+
+    def broken_session():
+        attempts.append(1)
+        raise RuntimeError("disk full")
+
+    async def scenario():
+        writer = PredictionWriteQueue(broken_session, batch_size=10, flush_interval=0.01)
+        await writer.start()
+        await writer.enqueue(_rows(4))
+        await writer.stop()
+        return writer.stats
+
+    stats = asyncio.run(scenario())
+    assert len(attempts) == writer_module.FLUSH_RETRIES
+    assert stats["failed"] == 4 and stats["written"] == 0
+
+
+def test_cache_predictions_queues_rows_and_invalidates_readers(tmp_path, monkeypatch):
+    players = [SimpleNamespace(id=f"p{n}", name=f"P{n}", team="A", fantasy_points=10.0 + n, confidence=0.8)
+               for n in range(3)]
+
+    async def scenario():
+        engine, Session = await _database(tmp_path)
+        writer = PredictionWriteQueue(Session, batch_size=10, flush_interval=0.01)
+        monkeypatch.setattr(writer_module, "prediction_writer", writer)
+        await writer.start()
+        before = resource_versions.get("predictions:m-writer")
+        queued = await cache_predictions("m-writer", players)
+        after = resource_versions.get("predictions:m-writer")
+        await writer.stop()
+        written = await _count(Session)
+        await engine.dispose()
+        return queued, before, after, written
+
+    queued, before, after, written = asyncio.run(scenario())
+    assert queued == written == 3
+    assert before != after
+    channel = live_hub.channels.pop("m-writer")
+    assert channel.players["p2"]["fantasy_points"] == 12.0
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import profiling
+from profiling import Profiler, ProfilingMiddleware, router
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+def make_client(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "profiler", Profiler(keep=2, interval_ms=1))
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        deadline = time.perf_counter() + 0.03
+        while time.perf_counter() < deadline:
+            pass
+        await asyncio.sleep(0.03)
+        return {"ok": True}
+
+    app.include_router(router, prefix="/admin/profiles")
+    app.add_middleware(ProfilingMiddleware, profiler=profiling.profiler)
+    return TestClient(app)
+
+
+def test_only_triggered_requests_are_profiled(monkeypatch):
+    client = make_client(monkeypatch)
+
+    assert "x-profile-id" not in client.get("/slow").headers
+    assert "x-profile-id" not in client.get("/slow", headers={"X-Profile": "wrong"}).headers
+
+    response = client.get("/slow", headers={"X-Profile": "secret", "X-Request-ID": "req-1"})
+    profile_id = response.headers["x-profile-id"]
+
+    collapsed = client.get(f"/admin/profiles/{profile_id}", headers=ADMIN).text
+    lines = collapsed.splitlines()
+    assert lines and all(line.startswith("GET /slow;") for line in lines)
+    assert any("[running]" in line and "slow (" in line for line in lines)
+    assert any("[waiting]" in line and "sleep (" in line for line in lines)
+
+    summary = client.get(f"/admin/profiles/{profile_id}?format=json", headers=ADMIN).json()
+    assert summary["label"] == "req-1"
+    assert summary["status"] == 200 and summary["samples"] == sum(int(l.rsplit(" ", 1)[1]) for l in lines)
+
+
+def test_admin_arming_and_access(monkeypatch):
+    client = make_client(monkeypatch)
+
+    assert client.get("/admin/profiles").status_code == 403
+    client.post("/admin/profiles/arm?path_prefix=/slow&count=1", headers=ADMIN)
+    assert "x-profile-id" in client.get("/slow").headers
+    assert "x-profile-id" not in client.get("/slow").headers
+
+    listing = client.get("/admin/profiles", headers=ADMIN).json()
+    assert listing["armed"] == 0 and len(listing["profiles"]) == 1
+
+
+def test_profile_ids_come_from_the_server(monkeypatch):
+    client = make_client(monkeypatch)
+    trigger = {"X-Profile": "secret", "X-Request-ID": "same"}
+    ids = [client.get("/slow", headers=trigger).headers["x-profile-id"] for _ in range(2)]
+
+    # A reused or guessed request id neither overwrites nor names another profile
+    assert len(set(ids)) == 2 and "same" not in ids
+    assert client.get("/admin/profiles/same", headers=ADMIN).status_code == 404
+    listing = client.get("/admin/profiles", headers=ADMIN).json()
+    assert [p["label"] for p in listing["profiles"]] == ["same", "same"]
+
+
+def test_task_factory_is_installed_once(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    profiler = Profiler()
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        profiler.install()
+        factory = loop.get_task_factory()
+        profiler.install()
+        profiler.start("GET", "/")
+        return factory, loop.get_task_factory()
+
+    installed, after_start = asyncio.run(scenario())
+    assert installed is not None and after_start is installed
@@ -0,0 +1,88 @@
+import asyncio
+import datetime
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import Base, Match, Player
+from performances import record_performances
+from queries import decode_cursor, encode_cursor, get_match_squad, list_matches
+
+DAY = datetime.timedelta(days=1)
+START = datetime.date(2024, 1, 1)
+
+
+async def _setup(tmp_path, name):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    async with Session() as session:
+        # Two matches a day, so pages split between rows that share a date
+        session.add_all([
+            Match(id=f"m{n:02d}", team1="A" if n % 3 else "C", team2="B", date=START + (n // 2) * DAY)
+            for n in range(12)
+        ])
+        session.add_all([Player(id=f"{team}{i}", name=f"{team} player {i}", team=team)
+                         for team in "ABC" for i in range(2)])
+        await session.commit()
+    return engine, Session
+
+
+async def _pages(session, **kwargs):
+    pages, cursor = [], None
+    while True:
+        page = await list_matches(session, limit=5, cursor=cursor, **kwargs)
+        pages.append([item["id"] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_keyset_pages_cover_every_match_once(tmp_path):
+    async def scenario():
+        engine, Session = await _setup(tmp_path, "pages.db")
+        async with Session() as session:
+            ascending = await _pages(session)
+            descending = await _pages(session, descending=True)
+            team_c = await _pages(session, team="C")
+            with pytest.raises(ValueError):
+                await list_matches(session, cursor="not a cursor")
+        await engine.dispose()
+        return ascending, descending, team_c
+
+    ascending, descending, team_c = asyncio.run(scenario())
+    everything = [f"m{n:02d}" for n in range(12)]
+    assert ascending == [everything[:5], everything[5:10], everything[10:]]
+    assert sum(descending, []) == everything[::-1]
+    assert team_c == [["m00", "m03", "m06", "m09"]]
+    assert decode_cursor(encode_cursor(START, "m01")) == (START, "m01")
+
+
+def test_match_squad_has_recent_performances_before_the_match(tmp_path):
+    async def scenario():
+        engine, Session = await _setup(tmp_path, "squad.db")
+        async with Session() as session:
+            await record_performances(session, [
+                {"match_id": f"m{n:02d}", "player_id": "A0", "runs_scored": n, "wickets_taken": 0, "catches": 0}
+                for n in range(12)
+            ])
+            await session.commit()
+            squad = await get_match_squad(session, "m08", recent=3)
+            no_history = await get_match_squad(session, "m08", recent=0)
+            missing = await get_match_squad(session, "nope")
+        await engine.dispose()
+        return squad, no_history, missing
+
+    squad, no_history, missing = asyncio.run(scenario())
+    assert squad["match"] == {"id": "m08", "team1": "A", "team2": "B", "date": START + 4 * DAY}
+    assert sorted(squad["squads"]) == ["A", "B"]
+    assert [p["id"] for p in squad["squads"]["A"] + squad["squads"]["B"]] == ["A0", "A1", "B0", "B1"]
+
+    # m07 and m06 are on the day before; m08's same-day partner m09 is not earlier
+    recent = squad["squads"]["A"][0]["recent"]
+    assert [r["match_id"] for r in recent] == ["m07", "m06", "m05"]
+    assert [r["date"] for r in recent] == [START + 3 * DAY, START + 3 * DAY, START + 2 * DAY]
+    assert squad["squads"]["A"][1]["recent"] == []
+    assert all(p["recent"] == [] for team in no_history["squads"].values() for p in team)
+    assert missing is None
@@ -0,0 +1,81 @@
+from rate_limit import MemoryRateLimiter, RateLimit, RouteLimits, SQLiteRateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_limit_and_sliding_recovery():
+    clock = FakeClock()
+    limiter = MemoryRateLimiter(RouteLimits(RateLimit(10, 60)), clock=clock)
+
+    assert all(limiter.hit("1.1.1.1").allowed for _ in range(10))
+    denied = limiter.hit("1.1.1.1")
+    assert not denied.allowed and denied.retry_after > 0
+    assert limiter.hit("2.2.2.2").allowed
+
+    # Halfway through the next window half of the old requests still count
+    clock.now += 90
+    allowed = sum(limiter.hit("1.1.1.1").allowed for _ in range(10))
+    assert allowed == 5
+
+
+def test_per_route_limits():
+    limits = RouteLimits(RateLimit(100, 60), {"/api/v1/predictions": RateLimit(2, 60)})
+    limiter = MemoryRateLimiter(limits, clock=FakeClock())
+
+    assert [limiter.hit("c", "/api/v1/predictions/m1").allowed for _ in range(3)] == [True, True, False]
+    assert limiter.hit("c", "/api/v1/matches").allowed
+
+
+def test_idle_clients_are_evicted():
+    clock = FakeClock()
+    limiter = MemoryRateLimiter(RouteLimits(RateLimit(5, 60)), clock=clock, evict_interval=60)
+    for n in range(1000):
+        limiter.hit(f"10.0.{n // 256}.{n % 256}")
+    assert len(limiter) == 1000
+
+    clock.now += 180
+    limiter.hit("active")
+    assert len(limiter) == 1
+
+
+def test_sqlite_limiter_shares_quota_between_workers(tmp_path):
+    clock = FakeClock(1_700_000_000.0)
+    limits = RouteLimits(RateLimit(4, 60))
+    path = str(tmp_path / "limits.db")
+    workers = [SQLiteRateLimiter(limits, path, clock=clock) for _ in range(2)]
+
+    results = [workers[n % 2].hit("c").allowed for n in range(6)]
+    assert results == [True] * 4 + [False] * 2
+
+
+def test_route_limits_from_env_string():
+    limits = RouteLimits.from_env("/api/v1/predictions=30, /api/v1/stats=120/10")
+    assert limits.resolve("/api/v1/stats/players/top") == ("/api/v1/stats", RateLimit(120, 10.0))
+    assert limits.resolve("/api/v1/predictions/x")[1].limit == 30
+    assert limits.resolve("/health")[0] == "*"
+
+
+def test_sqlite_check_runs_off_the_event_loop(tmp_path):
+    import asyncio
+    import threading
+
+    class RecordingLimiter(SQLiteRateLimiter):
+        def hit(self, client, path="/"):
+            threads.add(threading.get_ident())
+            return super().hit(client, path)
+
+    threads = set()
+    limiter = RecordingLimiter(RouteLimits(RateLimit(3, 60)), str(tmp_path / "limits.db"),
+                               clock=FakeClock(1_700_000_000.0))
+
+    async def scenario():
+        return [(await limiter.check("c")).allowed for _ in range(4)]
+
+    assert asyncio.run(scenario()) == [True, True, True, False]
+    assert threads and threading.get_ident() not in threads
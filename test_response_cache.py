@@ -0,0 +1,135 @@
+import asyncio
+import os
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from response_cache import BodyCache, CachedResponse, CacheRule, ResourceVersions, ResponseCacheMiddleware
+
+
+def make_client():
+    versions = ResourceVersions()
+    calls = {"versioned": 0, "hashed": 0}
+    app = FastAPI()
+
+    @app.get("/versioned/{item}")
+    def versioned(item: str):
+        calls["versioned"] += 1
+        return {"item": item, "version": versions.get("items")}
+
+    @app.get("/hashed")
+    def hashed():
+        calls["hashed"] += 1
+        return {"value": 42}
+
+    rules = [
+        CacheRule("/versioned", "private, no-cache", lambda path: versions.get_async("items")),
+        CacheRule("/hashed", "public, max-age=30"),
+    ]
+    app.add_middleware(ResponseCacheMiddleware, rules=rules, cache=BodyCache())
+    return TestClient(app), versions, calls
+
+
+def test_versioned_route_skips_endpoint_until_bumped():
+    client, versions, calls = make_client()
+
+    first = client.get("/versioned/a")
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    assert client.get("/versioned/a").json() == first.json()
+    assert client.get("/versioned/a", headers={"If-None-Match": etag}).status_code == 304
+    assert calls["versioned"] == 1
+
+    versions.bump("items")
+    changed = client.get("/versioned/a", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert calls["versioned"] == 2
+
+
+def test_body_hash_etag_returns_304():
+    client, _, calls = make_client()
+
+    first = client.get("/hashed")
+    assert first.headers["cache-control"] == "public, max-age=30"
+    second = client.get("/hashed", headers={"If-None-Match": f'W/{first.headers["etag"]}'})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert calls["hashed"] == 2
+
+
+def test_body_cache_is_bounded():
+    cache = BodyCache(max_bytes=100)
+    for n in range(5):
+        cache.put((f"/x/{n}", "v"), CachedResponse(200, [], b"x" * 40, '"e"', float("inf")))
+    assert cache.size <= 100
+    assert cache.get(("/x/0", "v")) is None
+    assert cache.get(("/x/4", "v")) is not None
+
+
+def test_not_modified_needs_a_live_entry_and_keys_include_the_caller():
+    versions = ResourceVersions()
+    calls = []
+    app = FastAPI()
+
+    @app.get("/mine")
+    def mine(request: Request):
+        calls.append(request.headers.get("x-api-key"))
+        return {"caller": request.headers.get("x-api-key")}
+
+    cache = BodyCache()
+    app.add_middleware(ResponseCacheMiddleware, cache=cache,
+                       rules=[CacheRule("/mine", "private, no-cache", lambda path: versions.get("items"), ttl=60)])
+    client = TestClient(app)
+
+    alice = client.get("/mine", headers={"X-API-Key": "alice"})
+    bob = client.get("/mine", headers={"X-API-Key": "bob"})
+    assert bob.json() == {"caller": "bob"} and bob.headers["etag"] != alice.headers["etag"]
+    assert client.get("/mine", headers={"X-API-Key": "alice"}).json() == {"caller": "alice"}
+    assert calls == ["alice", "bob"]
+
+    # Another caller's ETag proves nothing about this caller's body
+    stolen = client.get("/mine", headers={"X-API-Key": "bob", "If-None-Match": alice.headers["etag"]})
+    assert stolen.status_code == 200 and stolen.json() == {"caller": "bob"}
+
+    # With the stored body gone the endpoint runs again before a 304 is sent
+    cache.clear()
+    revalidated = client.get("/mine", headers={"X-API-Key": "alice", "If-None-Match": alice.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert calls == ["alice", "bob", "alice"]
+
+
+def test_shared_versions_are_seen_by_every_worker(tmp_path):
+    path = str(tmp_path / "versions.db")
+    worker_a, worker_b = ResourceVersions(path), ResourceVersions(path)
+
+    before = worker_b.get("stats")
+    assert worker_a.bump("stats") == 1
+    assert worker_b.get("stats") != before
+    assert worker_b.get("stats") == worker_a.get("stats")
+
+    # A recreated file starts a new epoch, so old ETags never match again
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    assert ResourceVersions(path).get("stats") != before
+
+
+def test_shared_versions_are_read_and_bumped_off_the_event_loop(tmp_path):
+    versions = ResourceVersions(str(tmp_path / "async.db"))
+
+    async def scenario():
+        before = await versions.get_async("stats")
+        bumped = await versions.bump_async("stats")
+        # From a session hook: scheduled on the executor, not run inline
+        versions.bump_later("stats")
+        for _ in range(100):
+            if (await versions.get_async("stats")).endswith(".2"):
+                break
+            await asyncio.sleep(0.01)
+        return before, bumped, await versions.get_async("stats")
+
+    before, bumped, after = asyncio.run(scenario())
+    assert before.endswith(".0") and bumped == 1 and after.endswith(".2")
+    assert after == versions.get("stats")
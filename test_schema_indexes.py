@@ -0,0 +1,74 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from schema_indexes import (
+    apply_index_plan, check_query_plans, existing_indexes,
+    find_redundant_indexes, sqlite3_executor,
+)
+
+LIVE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gl_genie.db")
+
+PLAYER_FEATURES_DDL = """
+CREATE TABLE player_features (
+    player_id VARCHAR NOT NULL,
+    as_of_date DATE NOT NULL,
+    matches_played INTEGER NOT NULL,
+    runs_avg_5 FLOAT NOT NULL,
+    wickets_avg_5 FLOAT NOT NULL,
+    catches_avg_5 FLOAT NOT NULL,
+    runs_ewm FLOAT NOT NULL,
+    wickets_ewm FLOAT NOT NULL,
+    catches_ewm FLOAT NOT NULL,
+    decay_weight FLOAT NOT NULL,
+    PRIMARY KEY (player_id, as_of_date)
+)
+"""
+
+
+@pytest.fixture
+def db(tmp_path):
+    # Work on a copy of the live schema, including its duplicate indexes
+    path = tmp_path / "gl_genie.db"
+    shutil.copy(LIVE_DB, path)
+    # No statement cache: EXPLAIN must see indexes dropped mid-test
+    conn = sqlite3.connect(path, cached_statements=0)
+    conn.execute(PLAYER_FEATURES_DDL)
+    # As migrate_db leaves it
+    conn.execute("ALTER TABLE match_performances ADD COLUMN match_date DATE")
+    yield conn
+    conn.close()
+
+
+def test_live_schema_redundant_indexes_are_found(db):
+    redundant = {name for _, name, _ in find_redundant_indexes(sqlite3_executor(db))}
+    assert "idx_predictions_player_id" in redundant
+    assert "ix_predictions_player_id" not in redundant
+    assert {"ix_matches_id", "ix_players_id", "ix_match_performances_id", "ix_predictions_id"} <= redundant
+
+
+def test_apply_index_plan_fixes_live_schema(db):
+    execute = sqlite3_executor(db)
+    report = apply_index_plan(execute)
+
+    assert report["plans"], "no hot queries were checked"
+    assert all(problem is None for problem in report["plans"].values()), report["plans"]
+    assert find_redundant_indexes(execute) == []
+
+    prediction_indexes = existing_indexes(execute, "predictions")
+    assert "ix_predictions_player_id" in prediction_indexes
+    assert "idx_predictions_player_id" not in prediction_indexes
+    # ix_matches_date is a prefix of the (date, id) keyset index
+    assert "ix_matches_date" not in existing_indexes(execute, "matches")
+
+
+def test_dropped_index_fails_as_full_scan(db):
+    execute = sqlite3_executor(db)
+    apply_index_plan(execute)
+    execute("DROP INDEX ix_players_team")
+
+    plans = check_query_plans(execute)
+    assert plans["squad_players"] is not None
+    assert "full table scan" in plans["squad_players"]
@@ -0,0 +1,25 @@
+import asyncio
+import sys
+
+import startup
+
+
+def test_lazy_import_defers_and_times_the_import():
+    sys.modules.pop("xml.dom.minidom", None)
+    minidom = startup.lazy_import("xml.dom.minidom")
+    assert "xml.dom.minidom" not in sys.modules
+
+    assert minidom.parseString("<a/>").documentElement.tagName == "a"
+    phases = {phase["name"] for phase in startup.startup_report()["phases"]}
+    assert "import xml.dom.minidom" in phases
+
+
+def test_warm_up_reports_failed_phases_without_raising(monkeypatch):
+    monkeypatch.setattr(startup, "WARM_IMPORTS", ["json", "module_that_does_not_exist"])
+    report = asyncio.run(startup.warm_up(prewarm=True))
+
+    assert report["warmed"]
+    by_name = {phase["name"]: phase for phase in report["phases"]}
+    assert by_name["import json"]["ok"]
+    assert not by_name["import module_that_does_not_exist"]["ok"]
+    assert "load model" in by_name
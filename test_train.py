@@ -0,0 +1,87 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.dummy import DummyClassifier
+
+import train
+
+
+def _row(n):
+    return f"p{n},{n % 50},{100 + n},{20 + n % 30},{15 + n % 20},{(n % 10) / 10},{n % 2}"
+
+
+def _write_history(path, rows=40):
+    lines = ["player,bat_avg,bat_sr,bowl_avg,bowl_sr,death_overs_pct,is_top_performer"]
+    lines += [_row(n) for n in range(rows)]
+    path.write_text("\n".join(lines) + "\n")
+
+
+def _append_history(path, rows, partial=""):
+    with open(path, "a") as f:
+        f.write("".join(_row(n) + "\n" for n in rows) + partial)
+
+
+def test_schema_mismatch_is_an_error_not_a_silent_fallback(tmp_path):
+    bare = tmp_path / "bare.pkl"
+    joblib.dump(DummyClassifier(), bare)
+    assert train.load_artifact(str(bare)) is None
+    assert train.load_artifact(str(tmp_path / "missing.pkl")) is None
+
+    other = tmp_path / "other.pkl"
+    train.save_artifact(DummyClassifier(), None, 10, str(other), features=["runs_avg_5"])
+    with pytest.raises(train.ArtifactSchemaError):
+        train.load_artifact(str(other))
+    assert train.check_artifact(joblib.load(other), ["runs_avg_5"])["rows_trained"] == 10
+
+
+def test_training_replaces_an_artifact_with_another_schema(tmp_path):
+    data = tmp_path / "history.csv"
+    _write_history(data)
+    model_path = str(tmp_path / "model.pkl")
+    train.save_artifact(DummyClassifier(), None, 10, model_path, features=["runs_avg_5"])
+
+    artifact = train.train_model(str(data), model_path, str(tmp_path / "cache"), n_estimators=5)
+    assert artifact["features"] == train.REQUIRED_FEATURES
+    assert train.load_artifact(model_path)["rows_trained"] == 40
+
+
+def test_feature_cache_appends_only_new_rows_and_waits_for_complete_lines(tmp_path, monkeypatch):
+    data, cache = tmp_path / "history.csv", str(tmp_path / "cache")
+    _write_history(data)
+    X, y, first_new = train.update_feature_cache(str(data), cache)
+    assert (len(X), first_new) == (40, 0)
+
+    appended = []
+    append_npy = train._append_npy
+    monkeypatch.setattr(train, "_append_npy", lambda path, rows: (appended.append(len(rows)), append_npy(path, rows)))
+
+    # A writer is midway through row 50
+    full_row = _row(50)
+    _append_history(data, range(40, 50), partial=full_row[:7])
+    X, y, first_new = train.update_feature_cache(str(data), cache)
+    assert (len(X), first_new) == (50, 40)
+    assert appended == [10, 10]
+
+    with open(data, "a") as f:
+        f.write(full_row[7:] + "\n")
+    X, y, first_new = train.update_feature_cache(str(data), cache)
+    assert (len(X), first_new) == (51, 50)
+    assert appended == [10, 10, 1, 1]
+    assert X[50].tolist() == pytest.approx([0, 150, 40, 25, 0.0])
+    assert X[10].tolist() == pytest.approx([10, 110, 30, 25, 0.0])
+    assert y.tolist() == [n % 2 for n in range(51)]
+
+
+def test_warm_start_adds_trees_to_the_existing_forest(tmp_path):
+    data, cache, model_path = tmp_path / "history.csv", str(tmp_path / "cache"), str(tmp_path / "model.pkl")
+    _write_history(data)
+    first = train.train_model(str(data), model_path, cache, n_estimators=5)
+    first_tree = first["model"].estimators_[0].tree_.threshold.copy()
+
+    _append_history(data, range(40, 60))
+    updated = train.train_model(str(data), model_path, cache, n_estimators=5, trees_per_update=3)
+    model = train.load_artifact(model_path)["model"]
+    assert updated["rows_trained"] == 60
+    assert len(model.estimators_) == 8
+    # The original trees are kept, not refitted
+    assert np.array_equal(model.estimators_[0].tree_.threshold, first_tree)
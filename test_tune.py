@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+import tune
+
+
+def test_folds_expand_over_time_and_degenerate_ones_are_dropped():
+    folds = tune.time_series_folds(100, n_splits=3, min_train_fraction=0.4)
+    assert folds == [(40, 60), (60, 80), (80, 100)]
+
+    y = np.array([0, 1] * 30 + [1] * 20 + [0, 1] * 10)
+    assert tune.usable_folds(y, folds, "roc_auc") == [(40, 60), (80, 100)]
+    # Accuracy is defined on any fold
+    assert tune.usable_folds(y, folds, "accuracy") == folds
+    with pytest.raises(ValueError):
+        tune.usable_folds(np.ones(100), folds, "roc_auc")
+
+
+def test_every_fold_is_scored_with_the_search_metric(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(120, 5)).astype(np.float32)
+    y = (X[:, 0] + rng.normal(scale=0.5, size=120) > 0).astype(np.int8)
+    np.save(tmp_path / "X.npy", X)
+    np.save(tmp_path / "y.npy", y)
+    tune._init_worker(str(tmp_path / "X.npy"), str(tmp_path / "y.npy"))
+
+    folds = tune.usable_folds(y, tune.time_series_folds(len(y), n_splits=3))
+    record = tune.evaluate_config({"n_estimators": 10, "max_depth": 3}, folds, metric="roc_auc")
+    assert record["metric"] == "roc_auc"
+    assert len(record["scores"]) == len(folds)
+    assert 0.5 < record["mean_score"] <= 1.0
+
+    params = {"n_estimators": 10}
+    assert tune._config_key(params, 120, folds, "roc_auc") != tune._config_key(params, 120, folds, "accuracy")
@@ -1,37 +1,360 @@
+import io
+import json
+import os
+from datetime import datetime
+
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 import joblib
 
+from feature_schema import REQUIRED_FEATURES
+
+DATA_PATH = "data/historical_player_stats.csv"
+MODEL_PATH = "ml/gl_model.pkl"
+CACHE_DIR = "ml/cache"
+TARGET_COL = 'is_top_performer'
+
+# Rows parsed per pandas chunk when reading the history CSV
+CHUNK_SIZE = 100_000
+
+# Forest size for a full refit, and trees added per warm-start update
+INITIAL_TREES = 100
+TREES_PER_UPDATE = 20
+
+# New trees are fit on at least this many of the most recent rows
+WARM_START_MIN_ROWS = 5_000
+
+# Fixed .npy header size, so the shape can be rewritten in place on append
+NPY_HEADER_BYTES = 128
+
+# Share of each match's players labelled top performers when training from the feature store
+TOP_PERFORMER_SHARE = 0.25
+
 # Preprocess data and get the features
 def get_features(df):
-    feature_cols = ['bat_avg', 'bat_sr', 'bowl_avg', 'bowl_sr', 'death_overs_pct']
+    feature_cols = REQUIRED_FEATURES
     return df[feature_cols].fillna(0)
 
-# Train the model
-def train_model(data_path="data/historical_player_stats.csv"):
-    df = pd.read_csv(data_path)
-    
-    # Ensure the CSV contains the correct columns
-    if df.empty:
-        print("Error: Data is empty!")
+
+# --- Memory-mapped feature cache ---
+def _write_npy_header(f, dtype, shape):
+    """Write a version 1.0 .npy header padded to NPY_HEADER_BYTES"""
+    header = repr({
+        'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        'fortran_order': False,
+        'shape': tuple(shape),
+    })
+    preamble = np.lib.format.MAGIC_PREFIX + bytes([1, 0])
+    padding = NPY_HEADER_BYTES - len(preamble) - 2 - len(header) - 1
+    if padding < 0:
+        raise ValueError(f"Shape {shape} does not fit in the reserved .npy header")
+    header = header + ' ' * padding + '\n'
+    f.seek(0)
+    f.write(preamble + len(header).to_bytes(2, 'little') + header.encode('latin1'))
+
+
+def _append_npy(path, rows):
+    """Append rows to a C-ordered .npy file, touching only the new bytes and the header"""
+    rows = np.ascontiguousarray(rows)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            _write_npy_header(f, rows.dtype, rows.shape)
+            f.write(rows.tobytes())
         return
 
-    X = get_features(df)
-    y = df['is_top_performer']
-    
-    # Normalize features
+    existing = np.load(path, mmap_mode='r')
+    shape = (existing.shape[0] + rows.shape[0],) + existing.shape[1:]
+    dtype = existing.dtype
+    del existing
+    with open(path, 'r+b') as f:
+        f.seek(0, os.SEEK_END)
+        f.write(rows.astype(dtype, copy=False).tobytes())
+        _write_npy_header(f, dtype, shape)
+
+
+class _BoundedReader(io.RawIOBase):
+    """Read-only view of a file between two byte offsets"""
+
+    def __init__(self, f, end):
+        self._f = f
+        self._end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        remaining = self._end - self._f.tell()
+        if remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:remaining]
+        return self._f.readinto(view)
+
+
+def _complete_lines_end(path):
+    """Offset just past the last newline, so a half-written row is never parsed"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        pos = size
+        while pos > 0:
+            step = min(65536, pos)
+            f.seek(pos - step)
+            block = f.read(step)
+            idx = block.rfind(b'\n')
+            if idx != -1:
+                return pos - step + idx + 1
+            pos -= step
+    return 0
+
+
+def _cache_paths(cache_dir):
+    return (
+        os.path.join(cache_dir, "features.npy"),
+        os.path.join(cache_dir, "target.npy"),
+        os.path.join(cache_dir, "meta.json"),
+    )
+
+
+def update_feature_cache(data_path=DATA_PATH, cache_dir=CACHE_DIR, chunksize=CHUNK_SIZE):
+    """
+    Parse rows appended to the history CSV since the last call into the cache.
+
+    Returns (X, y, first_new_row) where X and y are read-only memory maps over
+    the whole history and first_new_row is the index of the first row added
+    by this call.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    x_path, y_path, meta_path = _cache_paths(cache_dir)
+
+    with open(data_path, 'rb') as f:
+        header_line = f.readline()
+        header_end = f.tell()
+    columns = header_line.decode('utf-8').strip().split(',')
+
+    meta = None
+    if os.path.exists(meta_path) and os.path.exists(x_path) and os.path.exists(y_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if (meta.get('source') != os.path.abspath(data_path)
+                or meta.get('columns') != columns
+                or meta.get('features') != REQUIRED_FEATURES
+                or os.path.getsize(data_path) < meta.get('source_bytes', 0)):
+            print("⚠️ Source data changed, rebuilding feature cache")
+            meta = None
+
+    if meta is None:
+        for path in (x_path, y_path):
+            if os.path.exists(path):
+                os.remove(path)
+        meta = {
+            'source': os.path.abspath(data_path),
+            'columns': columns,
+            'features': REQUIRED_FEATURES,
+            'source_bytes': header_end,
+            'rows': 0,
+        }
+
+    first_new_row = meta['rows']
+    end = _complete_lines_end(data_path)
+    if end > meta['source_bytes']:
+        with open(data_path, 'rb') as f:
+            f.seek(meta['source_bytes'])
+            reader = io.BufferedReader(_BoundedReader(f, end))
+            for chunk in pd.read_csv(reader, header=None, names=columns, chunksize=chunksize):
+                _append_npy(x_path, get_features(chunk).to_numpy(dtype=np.float32))
+                _append_npy(y_path, chunk[TARGET_COL].fillna(0).to_numpy(dtype=np.int8))
+                meta['rows'] += len(chunk)
+        meta['source_bytes'] = end
+        meta['updated_at'] = datetime.utcnow().isoformat()
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    if meta['rows'] == 0:
+        return None, None, 0
+
+    X = np.load(x_path, mmap_mode='r')
+    y = np.load(y_path, mmap_mode='r')
+    return X, y, first_new_row
+
+
+# --- Model artifact ---
+def save_artifact(model, scaler, rows_trained, model_path=MODEL_PATH, features=REQUIRED_FEATURES, **extra):
+    """Save model, scaler and feature schema together as one artifact"""
+    os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+    artifact = {
+        'model': model,
+        'scaler': scaler,
+        'features': list(features),
+        'target': TARGET_COL,
+        'rows_trained': int(rows_trained),
+        'trained_at': datetime.utcnow().isoformat(),
+        **extra,
+    }
+    tmp_path = f"{model_path}.tmp"
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, model_path)
+    return artifact
+
+
+class ArtifactSchemaError(Exception):
+    """A saved artifact is not usable with the expected feature schema"""
+    pass
+
+
+def check_artifact(artifact, features=REQUIRED_FEATURES):
+    """Return a loaded artifact dict, raising ArtifactSchemaError unless it was trained on `features`"""
+    if 'model' not in artifact:
+        raise ArtifactSchemaError("Artifact has no model")
+    if artifact.get('features') != list(features):
+        raise ArtifactSchemaError(
+            f"Model was trained on features {artifact.get('features')}, expected {list(features)}"
+        )
+    return artifact
+
+
+def load_artifact(model_path=MODEL_PATH, features=REQUIRED_FEATURES):
+    """
+    Load a saved artifact, or None if missing or in the old bare-model format.
+
+    Raises ArtifactSchemaError for an artifact trained on other features.
+    """
+    if not os.path.exists(model_path):
+        return None
+    artifact = joblib.load(model_path)
+    if not isinstance(artifact, dict):
+        return None
+    return check_artifact(artifact, features)
+
+
+def _fit_scaler(X, chunksize=CHUNK_SIZE):
     scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-    
+    for start in range(0, len(X), chunksize):
+        scaler.partial_fit(X[start:start + chunksize])
+    return scaler
+
+
+def _full_refit(X, y, n_estimators, model_path, features=REQUIRED_FEATURES):
+    scaler = _fit_scaler(X)
+    X_scaled = scaler.transform(X)
+
     # Split into training and testing
     X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
-    
+
     # Train Random Forest Classifier
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=42, warm_start=True, n_jobs=-1)
     model.fit(X_train, y_train)
-    
-    # Save the model
-    joblib.dump(model, "ml/gl_model.pkl")
-    print("✅ Model trained and saved as gl_model.pkl")
+    print(f"Holdout accuracy: {model.score(X_test, y_test):.3f}")
+
+    return save_artifact(model, scaler, len(X), model_path, features)
+
+
+def _warm_start(artifact, X, y, trees_per_update, model_path):
+    model = artifact['model']
+    scaler = artifact['scaler']
+    start = artifact['rows_trained']
+
+    # The scaler stays frozen: existing trees split on its scaled values
+    window_start = max(0, min(start, len(X) - WARM_START_MIN_ROWS))
+    X_new = scaler.transform(X[window_start:])
+    y_new = np.asarray(y[window_start:])
+    if not np.array_equal(np.unique(y_new), model.classes_):
+        return None
+
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + trees_per_update)
+    model.fit(X_new, y_new)
+    print(f"Added {trees_per_update} trees on {len(X) - start} new rows ({len(X_new)} rows in window)")
+
+    return save_artifact(model, scaler, len(X), model_path)
+
+
+# Train the model
+def train_model(
+    data_path=DATA_PATH,
+    model_path=MODEL_PATH,
+    cache_dir=CACHE_DIR,
+    warm_start=True,
+    n_estimators=INITIAL_TREES,
+    trees_per_update=TREES_PER_UPDATE,
+):
+    X, y, _ = update_feature_cache(data_path, cache_dir)
+
+    # Ensure the CSV contains the correct columns
+    if X is None:
+        print("Error: Data is empty!")
+        return
+
+    artifact = None
+    if warm_start:
+        try:
+            artifact = load_artifact(model_path)
+        except ArtifactSchemaError as e:
+            print(f"⚠️ {e}; replacing it with a full refit")
+    if artifact is not None and artifact['rows_trained'] <= len(X):
+        if artifact['rows_trained'] == len(X):
+            print("✅ Model already up to date")
+            return artifact
+        updated = _warm_start(artifact, X, y, trees_per_update, model_path)
+        if updated is not None:
+            print(f"✅ Model updated and saved as {model_path}")
+            return updated
+        print("⚠️ New data does not cover every class, falling back to a full refit")
+
+    artifact = _full_refit(X, y, n_estimators, model_path)
+    print(f"✅ Model trained and saved as {model_path}")
+    return artifact
+
+
+# --- Training from the feature store ---
+def store_training_data(rows):
+    """Feature matrix and top-performer labels from feature_store.get_training_rows() output"""
+    from feature_store import FEATURE_COLUMNS
+    from scoring import fantasy_points
+
+    df = pd.DataFrame(rows)
+    df['points'] = [
+        fantasy_points(runs or 0, wickets or 0, catches or 0)
+        for runs, wickets, catches in zip(df['runs_scored'], df['wickets_taken'], df['catches'])
+    ]
+    rank = df.groupby('match_id')['points'].rank(pct=True, ascending=False, method='first')
+    X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+    y = (rank <= TOP_PERFORMER_SHARE).to_numpy(dtype=np.int8)
+    return X, y
+
+
+def train_from_store(model_path=MODEL_PATH, start=None, end=None, n_estimators=INITIAL_TREES, session_factory=None):
+    """
+    Fit the model on point-in-time feature-store vectors.
+
+    Each performance is paired with the player's vector as of the day before
+    the match (get_training_rows), which is what get_feature_vectors serves
+    at inference, and the artifact records FEATURE_COLUMNS as its schema.
+    """
+    import asyncio
+    from feature_store import FEATURE_COLUMNS, get_training_rows
+
+    async def load_rows():
+        factory = session_factory
+        if factory is None:
+            from database import AsyncSessionLocal as factory
+        async with factory() as session:
+            return await get_training_rows(session, start, end)
+
+    rows = asyncio.run(load_rows())
+    if not rows:
+        print("Error: Feature store is empty!")
+        return None
+
+    X, y = store_training_data(rows)
+    artifact = _full_refit(X, y, n_estimators, model_path, features=FEATURE_COLUMNS)
+    print(f"✅ Model trained on {len(X)} feature-store rows and saved as {model_path}")
+    return artifact
+
+
+if __name__ == "__main__":
+    import sys
+    if '--from-store' in sys.argv:
+        train_from_store()
+    else:
+        train_model(warm_start='--full' not in sys.argv)
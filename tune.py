@@ -0,0 +1,229 @@
+"""
+Hyperparameter search for the player model.
+
+Every worker process memory-maps the cached feature matrix written by
+train.update_feature_cache, so the training data is never pickled to workers.
+Folds are time-ordered (train on earlier rows, score on the rows after), and
+each finished configuration is appended to a checkpoint file so an
+interrupted search picks up where it left off.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, roc_auc_score
+
+from train import (
+    CACHE_DIR, DATA_PATH, MODEL_PATH,
+    _cache_paths, _fit_scaler, save_artifact, update_feature_cache,
+)
+
+CHECKPOINT_FILE = "tuning_results.jsonl"
+
+# One metric per search; every fold of every configuration is scored with it
+METRICS = ('roc_auc', 'accuracy')
+DEFAULT_METRIC = 'roc_auc'
+
+PARAM_GRID = {
+    'n_estimators': [100, 200, 400],
+    'max_depth': [None, 8, 16],
+    'min_samples_leaf': [1, 5, 20],
+    'max_features': ['sqrt', 0.5, 1.0],
+}
+
+# Set in each worker by _init_worker
+_X = None
+_y = None
+
+
+def _init_worker(x_path, y_path):
+    global _X, _y
+    _X = np.load(x_path, mmap_mode='r')
+    _y = np.load(y_path, mmap_mode='r')
+
+
+def time_series_folds(n_rows, n_splits=4, min_train_fraction=0.4):
+    """Expanding-window folds over chronologically ordered rows"""
+    first_test = int(n_rows * min_train_fraction)
+    fold_size = (n_rows - first_test) // n_splits
+    if fold_size == 0:
+        raise ValueError(f"Not enough rows ({n_rows}) for {n_splits} folds")
+    folds = []
+    for k in range(n_splits):
+        test_start = first_test + k * fold_size
+        test_end = n_rows if k == n_splits - 1 else test_start + fold_size
+        folds.append((test_start, test_end))
+    return folds
+
+
+def usable_folds(y, folds, metric=DEFAULT_METRIC):
+    """
+    Folds the metric is defined on.
+
+    ROC-AUC needs both classes in the training rows and in the test rows, so
+    folds without them are dropped, for every configuration alike. Raises
+    ValueError when none are left.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of {METRICS}")
+    usable = []
+    for test_start, test_end in folds:
+        if metric == 'roc_auc' and (len(np.unique(y[:test_start])) < 2 or len(np.unique(y[test_start:test_end])) < 2):
+            print(f"⚠️ Skipping fold {test_start}-{test_end}: {metric} needs both classes")
+            continue
+        usable.append((test_start, test_end))
+    if not usable:
+        raise ValueError(f"No fold has both classes, {metric} cannot be computed")
+    return usable
+
+
+def _score(model, X_test, y_test, metric):
+    if metric == 'roc_auc':
+        return roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])
+    return accuracy_score(y_test, model.predict(X_test))
+
+
+def evaluate_config(params, folds, random_state=42, metric=DEFAULT_METRIC):
+    """Cross-validate one configuration against the worker's memory map"""
+    started = time.time()
+    scores = []
+    for test_start, test_end in folds:
+        model = RandomForestClassifier(random_state=random_state, n_jobs=1, **params)
+        model.fit(_X[:test_start], _y[:test_start])
+        scores.append(float(_score(model, _X[test_start:test_end], _y[test_start:test_end], metric)))
+    return {
+        'params': params,
+        'scores': scores,
+        'mean_score': float(np.mean(scores)),
+        'metric': metric,
+        'seconds': round(time.time() - started, 3),
+    }
+
+
+def candidate_params(grid=PARAM_GRID, n_iter=None, seed=42):
+    """Full grid, or a random sample of n_iter points from it"""
+    keys = sorted(grid)
+    points = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    if n_iter is not None and n_iter < len(points):
+        points = random.Random(seed).sample(points, n_iter)
+    return points
+
+
+def _config_key(params, n_rows, folds, metric):
+    return json.dumps({'params': params, 'rows': n_rows, 'folds': folds, 'metric': metric}, sort_keys=True)
+
+
+def _load_checkpoint(path):
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A partially written last line from an interrupted run
+                    continue
+                done[record['key']] = record
+    return done
+
+
+def run_search(
+    data_path=DATA_PATH,
+    cache_dir=CACHE_DIR,
+    n_iter=None,
+    n_splits=4,
+    workers=None,
+    seed=42,
+    grid=PARAM_GRID,
+    metric=DEFAULT_METRIC,
+):
+    """Evaluate candidate configurations in a process pool, resuming from the checkpoint"""
+    X, y, _ = update_feature_cache(data_path, cache_dir)
+    if X is None:
+        raise ValueError("No training data available")
+    n_rows = len(X)
+    folds = usable_folds(y, time_series_folds(n_rows, n_splits), metric)
+    del X, y
+
+    checkpoint_path = os.path.join(cache_dir, CHECKPOINT_FILE)
+    done = _load_checkpoint(checkpoint_path)
+
+    pending = []
+    results = []
+    for params in candidate_params(grid, n_iter, seed):
+        key = _config_key(params, n_rows, folds, metric)
+        if key in done:
+            results.append(done[key])
+        else:
+            pending.append((key, params))
+    print(f"🔎 {len(pending)} configurations to evaluate, {len(results)} restored from checkpoint")
+
+    x_path, y_path, _ = _cache_paths(cache_dir)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(x_path, y_path)) as pool:
+        futures = {pool.submit(evaluate_config, params, folds, seed, metric): key for key, params in pending}
+        with open(checkpoint_path, 'a') as checkpoint:
+            for future in as_completed(futures):
+                record = future.result()
+                record['key'] = futures[future]
+                checkpoint.write(json.dumps(record) + '\n')
+                checkpoint.flush()
+                results.append(record)
+                print(f"  {record['mean_score']:.4f} {record['metric']} {record['params']} ({record['seconds']}s)")
+
+    results.sort(key=lambda r: r['mean_score'], reverse=True)
+    return results
+
+
+def publish_best(best, cache_dir=CACHE_DIR, model_path=MODEL_PATH, seed=42):
+    """Refit the best configuration on all cached rows and save it to the deployment path"""
+    x_path, y_path, _ = _cache_paths(cache_dir)
+    X = np.load(x_path, mmap_mode='r')
+    y = np.load(y_path, mmap_mode='r')
+
+    scaler = _fit_scaler(X)
+    model = RandomForestClassifier(random_state=seed, n_jobs=-1, warm_start=True, **best['params'])
+    model.fit(scaler.transform(X), y)
+    return save_artifact(
+        model, scaler, len(X), model_path,
+        params=best['params'], cv_score=best['mean_score'], cv_metric=best['metric'],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the RandomForest player model")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--n-iter", type=int, default=None, help="Random search size (default: full grid)")
+    parser.add_argument("--splits", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--metric", choices=METRICS, default=DEFAULT_METRIC)
+    parser.add_argument("--no-publish", action="store_true")
+    args = parser.parse_args()
+
+    results = run_search(args.data, args.cache_dir, args.n_iter, args.splits, args.workers, args.seed,
+                         metric=args.metric)
+    if not results:
+        print("❌ No configurations evaluated")
+        return
+
+    best = results[0]
+    print(f"🏆 Best {best['metric']}: {best['mean_score']:.4f} with {best['params']}")
+    if not args.no_publish:
+        publish_best(best, args.cache_dir, args.model_path, args.seed)
+        print(f"✅ Best model saved to {args.model_path}")
+
+
+if __name__ == "__main__":
+    main()